@@ -0,0 +1,103 @@
+"""
+Benchmark per-insert cost of the appointments table as the file grows
+
+Compares the append path used by storage.CSVStorage with the old
+read + concat + rewrite approach. Append cost should stay flat while the
+rewrite cost grows linearly with the number of rows.
+
+Usage:
+    python analysis/benchmark_append.py [--rows 20000] [--step 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from storage import CSVStorage, TABLES
+
+
+def make_appointment(i):
+    return {
+        'appointment_id': f"APT{i:010d}",
+        'patient_id': f"PAT{i % 500:03d}",
+        'doctor_id': f"DOC{i % 20:03d}",
+        'doctor_name': 'Dr. Bench Mark',
+        'specialization': 'Cardiologist',
+        'date': '2025-11-11',
+        'time': '10:30',
+        'reason': 'Routine check, follow-up',
+        'status': 'Scheduled',
+        'diagnosis': '',
+        'prescription': ''
+    }
+
+
+def legacy_insert(path, record):
+    """The previous full-file rewrite used by book_appointment"""
+    if os.path.exists(path):
+        df = pd.read_csv(path, encoding='utf-8')
+    else:
+        df = pd.DataFrame()
+    df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
+    df.to_csv(path, index=False, encoding='utf-8')
+
+
+def bulk_fill(path, start, stop):
+    """Grow the file quickly between measurement points"""
+    rows = pd.DataFrame([make_appointment(i) for i in range(start, stop)],
+                        columns=TABLES['appointments']['columns'])
+    rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False, encoding='utf-8')
+
+
+def measure(insert, path, start, samples):
+    timings = []
+    for i in range(start, start + samples):
+        t0 = time.perf_counter()
+        insert(path, make_appointment(i))
+        timings.append(time.perf_counter() - t0)
+    return sorted(timings)[len(timings) // 2]
+
+
+def run_benchmark(total_rows, step, samples):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = CSVStorage(data_dir=tmp)
+        append_path = storage.path('appointments')
+        legacy_path = os.path.join(tmp, 'legacy_appointments.csv')
+
+        def append_insert(path, record):
+            storage.insert('appointments', record)
+
+        size = 0
+        while size <= total_rows:
+            append_cost = measure(append_insert, append_path, size, samples)
+            legacy_cost = measure(legacy_insert, legacy_path, size, samples)
+            results.append((size, append_cost, legacy_cost))
+
+            next_size = size + step
+            bulk_fill(append_path, size + samples, next_size)
+            bulk_fill(legacy_path, size + samples, next_size)
+            size = next_size
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help='largest file size to measure')
+    parser.add_argument('--step', type=int, default=2000, help='rows added between measurements')
+    parser.add_argument('--samples', type=int, default=5, help='inserts timed per measurement')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'append (ms)':>14} {'rewrite (ms)':>14}")
+    print("-" * 40)
+    for size, append_cost, legacy_cost in run_benchmark(args.rows, args.step, args.samples):
+        print(f"{size:>10} {append_cost * 1000:>14.3f} {legacy_cost * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
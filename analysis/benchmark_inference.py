@@ -0,0 +1,211 @@
+"""
+Latency and throughput benchmark for the disease prediction path
+
+Measures, against the currently served model and encoder:
+    - cold start: fresh-process import + model load + first prediction
+    - warm single prediction (predict_from_symptoms) p50/p99
+    - batch throughput (predict_batch) across batch sizes
+    - precaution lookup (get_precautions) p50/p99
+
+Symptom sets are synthesized from DiseaseAndSymptoms.csv: a random case's
+symptoms, randomly subsampled, occasionally with an unrelated symptom added.
+Results are written as JSON; pass --compare with an earlier results file to
+flag regressions between model/encoder versions.
+
+Usage:
+    python analysis/benchmark_inference.py [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+BATCH_SIZES = [1, 8, 64, 512, 4096]
+
+
+def synthetic_symptom_sets(n, seed=42, noise=0.1):
+    """Random symptom lists drawn from real cases in the dataset"""
+    from training import load_symptom_matrix
+    X, _, vocabulary = load_symptom_matrix()
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(n):
+        row = X[rng.randrange(X.shape[0])]
+        symptoms = [vocabulary[i] for i in row.indices]
+        k = rng.randint(1, len(symptoms)) if symptoms else 0
+        chosen = rng.sample(symptoms, k)
+        if rng.random() < noise:
+            chosen.append(rng.choice(vocabulary))
+        sets.append(chosen)
+    return sets
+
+
+def percentiles(timings_s):
+    ms = np.array(timings_s) * 1000
+    return {
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'mean_ms': float(ms.mean()),
+    }
+
+
+def cold_start_probe():
+    """Run in a fresh process: time import, model load and first prediction"""
+    start = time.perf_counter()
+    import model_utils
+    imported = time.perf_counter()
+    model, encoder_data = model_utils.load_or_train_model()
+    loaded = time.perf_counter()
+    model_utils.predict_from_symptoms(model, encoder_data, ['itching'])
+    predicted = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'load_ms': (loaded - imported) * 1000,
+        'first_prediction_ms': (predicted - loaded) * 1000,
+        'total_ms': (predicted - start) * 1000,
+    }))
+
+
+def measure_cold_start(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--cold-start-probe'],
+                                cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+        samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {key: float(np.median([s[key] for s in samples])) for key in samples[0]}
+
+
+def artifact_info(model, encoder_data):
+    """Identify the model/encoder version being measured"""
+    columns = '\n'.join(encoder_data['columns']).encode('utf-8')
+    info = {
+        'model_type': type(model).__name__,
+        'n_features': len(encoder_data['columns']),
+        'encoder_sha256': hashlib.sha256(columns).hexdigest()[:16],
+    }
+    manifest = getattr(model, 'manifest', None)
+    if manifest:
+        info['format_version'] = manifest.get('format_version')
+        info['n_trees'] = manifest.get('n_trees')
+        info['created'] = manifest.get('created')
+    return info
+
+
+def run_benchmark(n_single=1000, n_batch_sets=8192, cold_runs=3):
+    from model_utils import load_or_train_model, predict_from_symptoms, predict_batch, get_precautions
+
+    model, encoder_data = load_or_train_model()
+    if model is None:
+        raise RuntimeError("No model available - run analysis/save_model.py first")
+
+    results = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'artifact': artifact_info(model, encoder_data),
+        'cold_start': measure_cold_start(cold_runs),
+    }
+
+    sets = synthetic_symptom_sets(max(n_single, n_batch_sets))
+
+    # Warm-up so lazy initialization isn't counted
+    for symptoms in sets[:20]:
+        predict_from_symptoms(model, encoder_data, symptoms)
+
+    timings = []
+    for symptoms in sets[:n_single]:
+        start = time.perf_counter()
+        predict_from_symptoms(model, encoder_data, symptoms)
+        timings.append(time.perf_counter() - start)
+    results['single_prediction'] = percentiles(timings)
+
+    throughput = {}
+    for size in BATCH_SIZES:
+        batches = [sets[i:i + size] for i in range(0, len(sets), size)]
+        start = time.perf_counter()
+        rows = 0
+        for batch in batches:
+            predict_batch(model, encoder_data, batch)
+            rows += len(batch)
+        elapsed = time.perf_counter() - start
+        throughput[str(size)] = {'rows_per_second': rows / elapsed, 'ms_per_batch': elapsed / len(batches) * 1000}
+    results['batch_throughput'] = throughput
+
+    diseases = list(model.classes_)
+    timings = []
+    for i in range(n_single):
+        disease = diseases[i % len(diseases)]
+        start = time.perf_counter()
+        get_precautions(disease)
+        timings.append(time.perf_counter() - start)
+    results['precaution_lookup'] = percentiles(timings)
+
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """List metrics that got worse than baseline by more than tolerance (fraction)"""
+    regressions = []
+
+    def check(name, new, old, higher_is_better=False):
+        if old is None or new is None or old == 0:
+            return
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{name}: {old:.3f} -> {new:.3f} ({change * 100:+.1f}% worse)")
+
+    check('cold_start.total_ms', current['cold_start']['total_ms'], baseline.get('cold_start', {}).get('total_ms'))
+    for section in ['single_prediction', 'precaution_lookup']:
+        for key in ['p50_ms', 'p99_ms']:
+            check(f"{section}.{key}", current[section][key], baseline.get(section, {}).get(key))
+    for size, stats in current['batch_throughput'].items():
+        old = baseline.get('batch_throughput', {}).get(size, {}).get('rows_per_second')
+        check(f"batch_throughput[{size}].rows_per_second", stats['rows_per_second'], old, higher_is_better=True)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', '-o', help="write JSON results to this file (default: stdout)")
+    parser.add_argument('--compare', help="baseline JSON results to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before flagging (fraction)")
+    parser.add_argument('--single', type=int, default=1000, help="single predictions to time")
+    parser.add_argument('--cold-runs', type=int, default=3, help="fresh processes for cold start")
+    parser.add_argument('--cold-start-probe', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)
+    if args.cold_start_probe:
+        cold_start_probe()
+        return 0
+
+    results = run_benchmark(n_single=args.single, cold_runs=args.cold_runs)
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        results['regressions'] = compare(results, baseline, args.tolerance)
+        for line in results['regressions']:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        status = 1 if results['regressions'] else 0
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Results saved to: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
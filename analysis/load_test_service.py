@@ -0,0 +1,118 @@
+"""
+Load test for the Medicore HTTP service (src/server.py)
+
+Logs in as a patient, then runs concurrent clients against a running
+service, each on its own keep-alive connection, issuing a mix of
+predictions and appointment-history reads. Reports requests per second and
+p50/p99 latency per endpoint as JSON.
+
+Usage:
+    python src/server.py &
+    python analysis/load_test_service.py [--clients 32] [--requests 50] [--output results.json]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+SYMPTOM_SETS = [
+    'itching, skin rash, nodal skin eruptions',
+    'stomach ache, acidity, vomitting',
+    'fever, headache, chills, muscle pain',
+    'cough, high fever, breathlessness',
+    'tiredness, weight loss, excessive hunger',
+]
+
+
+def request(conn, method, path, body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def run_client(host, port, token, n_requests, predict_ratio, seed, timings, lock):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    errors = 0
+    for _ in range(n_requests):
+        if rng.random() < predict_ratio:
+            name, method, path, body = 'predict', 'POST', '/predict', {'symptoms': rng.choice(SYMPTOM_SETS)}
+        else:
+            name, method, path, body = 'history', 'GET', '/appointments', None
+        start = time.perf_counter()
+        status, _ = request(conn, method, path, body, token)
+        elapsed = time.perf_counter() - start
+        with lock:
+            timings.setdefault(name, []).append(elapsed)
+        if status >= 400:
+            errors += 1
+    conn.close()
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--username', default='john_doe')
+    parser.add_argument('--password', default='pat123')
+    parser.add_argument('--clients', type=int, default=32, help="concurrent connections")
+    parser.add_argument('--requests', type=int, default=50, help="requests per client")
+    parser.add_argument('--predict-ratio', type=float, default=0.5, help="fraction of requests that are predictions")
+    parser.add_argument('--output', '-o', help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    conn = http.client.HTTPConnection(args.host, args.port, timeout=30)
+    status, user = request(conn, 'POST', '/login', {'role': 'patient', 'username': args.username,
+                                                     'password': args.password})
+    conn.close()
+    if status != 200:
+        print(f"Error: login failed: {user.get('error')}", file=sys.stderr)
+        return 1
+
+    timings, lock = {}, threading.Lock()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        errors = sum(pool.map(lambda i: run_client(args.host, args.port, user['token'], args.requests,
+                                                   args.predict_ratio, i, timings, lock),
+                              range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(t) for t in timings.values())
+    results = {
+        'clients': args.clients,
+        'requests': total,
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_second': total / elapsed,
+        'endpoints': {
+            name: {
+                'count': len(t),
+                'p50_ms': float(np.percentile(t, 50) * 1000),
+                'p99_ms': float(np.percentile(t, 99) * 1000),
+            }
+            for name, t in timings.items()
+        },
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Results saved to: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,15 @@
-import pandas as pd
 import os
-import re
 from datetime import datetime
+import services
+import reports
+import profiler
+from aggregates import get_aggregate_store
+from analytics import get_analytics, export_series, AnalyticsError
+from services import ServiceError
+from storage import get_repository
+
+# Trailing window for predicted disease trends
+TREND_WINDOW_DAYS = 7
 
 def admin_menu():
     """Display admin menu and handle admin operations"""
@@ -12,7 +20,8 @@ def admin_menu():
         print("1. Add Doctor")
         print("2. Generate Reports")
         print("3. Generate Data Profile")
-        print("4. Logout")
+        print("4. Trend Analytics")
+        print("5. Logout")
         print("-"*50)
         
         try:
@@ -25,6 +34,8 @@ def admin_menu():
             elif choice == '3':
                 generate_data_profile()
             elif choice == '4':
+                generate_trends()
+            elif choice == '5':
                 print("Logging out...")
                 break
             else:
@@ -42,23 +53,7 @@ def add_doctor():
     print("-"*50)
     
     try:
-        doctors_df = pd.read_csv("data/doctors.csv", encoding='utf-8')
-        
-        # Generate next consecutive doctor ID
-        max_num = 0
-        
-        # Extract numbers from existing doctor IDs (e.g., DOC001 -> 1, DOC006 -> 6)
-        for existing_id in doctors_df['doctor_id'].values:
-            # Extract numeric part from ID (e.g., "DOC006" -> "006" -> 6)
-            match = re.search(r'\d+', str(existing_id))
-            if match:
-                num = int(match.group())
-                if num > max_num:
-                    max_num = num
-        
-        # Generate next ID
-        next_num = max_num + 1
-        doctor_id = f"DOC{next_num:03d}"  # Format as DOC001, DOC002, etc.
+        doctor_id = services.next_doctor_id()
         
         # Display generated doctor ID
         print(f"\nGenerated Doctor ID: {doctor_id}")
@@ -74,33 +69,22 @@ def add_doctor():
         username = input("Username: ").strip()
         
         # Check if username already exists
-        if username in doctors_df['username'].values:
+        if services.username_taken('doctor', username):
             print(f"Error: Username {username} already exists!")
             return
         
         password = input("Password: ").strip()
         
-        # Create new doctor record
-        new_doctor = {
-            'doctor_id': doctor_id,
-            'username': username,
-            'password': password,
-            'name': name,
-            'specialization': specialization,
-            'availability': availability,
-            'contact': contact,
-            'email': email
-        }
-        
-        # Add to dataframe
-        doctors_df = pd.concat([doctors_df, pd.DataFrame([new_doctor])], ignore_index=True)
-        doctors_df.to_csv("data/doctors.csv", index=False, encoding='utf-8')
+        doctor = services.add_doctor(name, specialization, availability, contact, email,
+                                     username, password, doctor_id=doctor_id)
         
         print(f"\n✓ Doctor added successfully!")
-        print(f"  Doctor ID: {doctor_id}")
-        print(f"  Name: {name}")
-        print(f"  Specialization: {specialization}")
+        print(f"  Doctor ID: {doctor['doctor_id']}")
+        print(f"  Name: {doctor['name']}")
+        print(f"  Specialization: {doctor['specialization']}")
         
+    except ServiceError as e:
+        print(f"Error: {e}")
     except Exception as e:
         print(f"Error adding doctor: {e}")
 
@@ -125,101 +109,27 @@ def generate_reports():
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
+        # Materialized counters (data/aggregates.json), kept current on every write
+        stats = get_aggregate_store().get()
+        appointments = stats['appointments'] if get_repository('appointments').exists() else None
+        
         if choice == '1' or choice == '4':
             # Appointment Summary
-            if os.path.exists("data/appointments.csv"):
-                appointments_df = pd.read_csv("data/appointments.csv", encoding='utf-8')
-                
-                report = f"\n{'='*60}\n"
-                report += f" APPOINTMENT SUMMARY REPORT\n"
-                report += f" Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                report += f"{'='*60}\n\n"
-                
-                report += f"Total Appointments: {len(appointments_df)}\n"
-                report += f"Scheduled: {len(appointments_df[appointments_df['status'] == 'Scheduled'])}\n"
-                report += f"Completed: {len(appointments_df[appointments_df['status'] == 'Completed'])}\n\n"
-                
-                if not appointments_df.empty:
-                    report += f"Appointments by Doctor:\n"
-                    report += f"{'-'*60}\n"
-                    doctor_counts = appointments_df['doctor_id'].value_counts()
-                    for doctor_id, count in doctor_counts.items():
-                        report += f"{doctor_id}: {count} appointments\n"
-                
-                print(report)
-                
-                # Save to file
-                report_file = f"{reports_dir}/appointment_summary_{timestamp}.txt"
-                with open(report_file, 'w') as f:
-                    f.write(report)
-                print(f"Report saved to: {report_file}\n")
+            if appointments is not None:
+                save_report(reports.render_appointment_summary(appointments),
+                            f"{reports_dir}/appointment_summary_{timestamp}.txt")
             else:
                 print("No appointment data available.")
         
         if choice == '2' or choice == '4':
             # Doctor Performance
-            doctors_df = pd.read_csv("data/doctors.csv", encoding='utf-8')
-            
-            report = f"\n{'='*60}\n"
-            report += f" DOCTOR PERFORMANCE REPORT\n"
-            report += f" Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            report += f"{'='*60}\n\n"
-            
-            if os.path.exists("data/appointments.csv"):
-                appointments_df = pd.read_csv("data/appointments.csv", encoding='utf-8')
-                
-                for _, doctor in doctors_df.iterrows():
-                    doctor_appts = appointments_df[appointments_df['doctor_id'] == doctor['doctor_id']]
-                    completed = doctor_appts[doctor_appts['status'] == 'Completed']
-                    
-                    report += f"Doctor: {doctor['name']}\n"
-                    report += f"  Specialization: {doctor['specialization']}\n"
-                    report += f"  Total Appointments: {len(doctor_appts)}\n"
-                    report += f"  Completed: {len(completed)}\n"
-                    report += f"{'-'*60}\n"
-            else:
-                report += "No appointment data available.\n"
-            
-            print(report)
-            
-            # Save to file
-            report_file = f"{reports_dir}/doctor_performance_{timestamp}.txt"
-            with open(report_file, 'w') as f:
-                f.write(report)
-            print(f"Report saved to: {report_file}\n")
+            save_report(reports.render_doctor_performance(stats['doctors'], appointments),
+                        f"{reports_dir}/doctor_performance_{timestamp}.txt")
         
         if choice == '3' or choice == '4':
             # Patient Statistics
-            patients_df = pd.read_csv("data/patients.csv", encoding='utf-8')
-            
-            report = f"\n{'='*60}\n"
-            report += f" PATIENT STATISTICS REPORT\n"
-            report += f" Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            report += f"{'='*60}\n\n"
-            
-            report += f"Total Patients: {len(patients_df)}\n"
-            report += f"Gender Distribution:\n"
-            gender_counts = patients_df['gender'].value_counts()
-            for gender, count in gender_counts.items():
-                report += f"  {gender}: {count}\n"
-            
-            report += f"\nAge Statistics:\n"
-            report += f"  Average Age: {patients_df['age'].mean():.1f}\n"
-            report += f"  Min Age: {patients_df['age'].min()}\n"
-            report += f"  Max Age: {patients_df['age'].max()}\n"
-            
-            if os.path.exists("data/appointments.csv"):
-                appointments_df = pd.read_csv("data/appointments.csv", encoding='utf-8')
-                unique_patients = appointments_df['patient_id'].nunique()
-                report += f"\nPatients with Appointments: {unique_patients}\n"
-            
-            print(report)
-            
-            # Save to file
-            report_file = f"{reports_dir}/patient_statistics_{timestamp}.txt"
-            with open(report_file, 'w') as f:
-                f.write(report)
-            print(f"Report saved to: {report_file}\n")
+            save_report(reports.render_patient_statistics(stats['patients'], appointments),
+                        f"{reports_dir}/patient_statistics_{timestamp}.txt")
         
         if choice not in ['1', '2', '3', '4']:
             print("Invalid choice!")
@@ -227,6 +137,13 @@ def generate_reports():
     except Exception as e:
         print(f"Error generating reports: {e}")
 
+def save_report(report, report_file):
+    """Print a report and save it to a file"""
+    print(report)
+    with open(report_file, 'w') as f:
+        f.write(report)
+    print(f"Report saved to: {report_file}\n")
+
 def generate_data_profile():
     """Generate data profile/statistics for all datasets"""
     print("\n" + "-"*50)
@@ -241,60 +158,8 @@ def generate_data_profile():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         profile_file = f"{profile_dir}/data_profile_{timestamp}.txt"
         
-        profile = f"\n{'='*70}\n"
-        profile += f" DATA PROFILE REPORT\n"
-        profile += f" Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        profile += f"{'='*70}\n\n"
-        
-        # Doctors Profile
-        if os.path.exists("data/doctors.csv"):
-            doctors_df = pd.read_csv("data/doctors.csv", encoding='utf-8')
-            profile += f"DOCTORS DATASET\n"
-            profile += f"{'-'*70}\n"
-            profile += f"Total Records: {len(doctors_df)}\n"
-            profile += f"Columns: {', '.join(doctors_df.columns.tolist())}\n"
-            profile += f"Specializations: {', '.join(doctors_df['specialization'].unique())}\n"
-            profile += f"\n{doctors_df.describe().to_string() if not doctors_df.select_dtypes(include=['number']).empty else 'No numeric columns'}\n\n"
-        
-        # Patients Profile
-        if os.path.exists("data/patients.csv"):
-            patients_df = pd.read_csv("data/patients.csv", encoding='utf-8')
-            profile += f"PATIENTS DATASET\n"
-            profile += f"{'-'*70}\n"
-            profile += f"Total Records: {len(patients_df)}\n"
-            profile += f"Columns: {', '.join(patients_df.columns.tolist())}\n"
-            profile += f"Age Range: {patients_df['age'].min()} - {patients_df['age'].max()} years\n"
-            profile += f"Gender Distribution: {patients_df['gender'].value_counts().to_dict()}\n"
-            profile += f"\n{patients_df.describe().to_string()}\n\n"
-        
-        # Admins Profile
-        if os.path.exists("data/admins.csv"):
-            admins_df = pd.read_csv("data/admins.csv", encoding='utf-8')
-            profile += f"ADMINS DATASET\n"
-            profile += f"{'-'*70}\n"
-            profile += f"Total Records: {len(admins_df)}\n"
-            profile += f"Columns: {', '.join(admins_df.columns.tolist())}\n\n"
-        
-        # Appointments Profile
-        if os.path.exists("data/appointments.csv"):
-            appointments_df = pd.read_csv("data/appointments.csv", encoding='utf-8')
-            profile += f"APPOINTMENTS DATASET\n"
-            profile += f"{'-'*70}\n"
-            profile += f"Total Records: {len(appointments_df)}\n"
-            profile += f"Columns: {', '.join(appointments_df.columns.tolist())}\n"
-            profile += f"Status Distribution: {appointments_df['status'].value_counts().to_dict()}\n\n"
-        else:
-            profile += f"APPOINTMENTS DATASET\n"
-            profile += f"{'-'*70}\n"
-            profile += f"No appointment records yet.\n\n"
-        
-        # Disease Predictions Profile
-        if os.path.exists("data/disease_predictions.csv"):
-            predictions_df = pd.read_csv("data/disease_predictions.csv", encoding='utf-8')
-            profile += f"DISEASE PREDICTIONS DATASET\n"
-            profile += f"{'-'*70}\n"
-            profile += f"Total Records: {len(predictions_df)}\n"
-            profile += f"Columns: {', '.join(predictions_df.columns.tolist())}\n\n"
+        # Tables are streamed in chunks and profiled in parallel processes
+        profile = profiler.render_profile(profiler.profile_tables())
         
         print(profile)
         
@@ -306,3 +171,65 @@ def generate_data_profile():
     except Exception as e:
         print(f"Error generating data profile: {e}")
 
+def generate_trends():
+    """Appointment volume and predicted disease trends over a date range"""
+    print("\n" + "-"*50)
+    print(" TREND ANALYTICS")
+    print("-"*50)
+    
+    try:
+        print("\nSelect series:")
+        print("1. Appointment Volume by Specialization")
+        print("2. Appointment Volume by Doctor")
+        print(f"3. Predicted Disease Trends (rolling {TREND_WINDOW_DAYS} days)")
+        
+        choice = input("\nEnter your choice: ").strip()
+        dimension = {'1': 'specialization', '2': 'doctor', '3': 'disease'}.get(choice)
+        if dimension is None:
+            print("Invalid choice!")
+            return
+        
+        cube = get_analytics().cube(dimension)
+        if not cube.keys:
+            print("No data available.")
+            return
+        
+        date_from = input("From date (YYYY-MM-DD, Enter for earliest): ").strip() or None
+        date_to = input("To date (YYYY-MM-DD, Enter for latest): ").strip() or None
+        
+        if dimension == 'disease':
+            frame = cube.rolling(TREND_WINDOW_DAYS, date_from, date_to)
+        else:
+            freq = 'D' if input("Group by (D)ay or (W)eek [W]: ").strip().upper() == 'D' else 'W'
+            frame = cube.series(date_from, date_to, freq)
+        totals = cube.totals(date_from, date_to)
+        first, last = cube.span(date_from, date_to)
+        
+        print(f"\nTotals from {first} to {last}:")
+        print("-"*50)
+        for key, count in totals.head(10).items():
+            print(f"{key}: {count}")
+        
+        if dimension == 'disease' and len(frame) > TREND_WINDOW_DAYS:
+            # Outbreak check: latest window against the one before it
+            latest, previous = frame.iloc[-1], frame.iloc[-1 - TREND_WINDOW_DAYS]
+            print(f"\nLast {TREND_WINDOW_DAYS} days to {frame.index[-1]} (change vs previous {TREND_WINDOW_DAYS} days):")
+            print("-"*50)
+            for disease in latest.sort_values(ascending=False).index[:10]:
+                print(f"{disease}: {latest[disease]} ({latest[disease] - previous[disease]:+d})")
+        
+        print(f"\nMost recent periods:")
+        print(frame[totals.index[:5]].tail(10).to_string())
+        
+        reports_dir = "analysis"
+        if not os.path.exists(reports_dir):
+            os.makedirs(reports_dir)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        for extension in ('csv', 'json'):
+            saved = export_series(frame, f"{reports_dir}/{dimension}_trends_{timestamp}.{extension}")
+            print(f"\nSeries saved to: {saved}")
+        
+    except AnalyticsError as e:
+        print(f"✗ {e}")
+    except Exception as e:
+        print(f"Error generating trends: {e}")
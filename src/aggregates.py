@@ -0,0 +1,241 @@
+"""
+Materialized report aggregates
+
+The counters behind the admin reports (appointments per doctor, status,
+specialization and day, patients with appointments, patient demographics,
+the doctor list and predictions per disease and day) are kept in a small
+JSON sidecar, data/aggregates.json, so reports are answered without reading
+the tables at all.
+
+Writes made through services.py update the sidecar incrementally: the
+service opens AggregateStore.updating(table), makes its write, applies the
+matching record_*() delta and the store saves the counters together with the
+table's new version() token, all under one inter-process lock. A table whose
+version no longer matches (edited by hand, written by another tool, or no
+sidecar yet) has its section rebuilt from source with reports.compute_stats()
+the next time the store is read (AggregateStore.get(), the report path), so
+the counters never drift from the data. Writes never wait for a rebuild:
+while a section is stale they skip its delta.
+
+Usage:
+    python src/aggregates.py    # rebuild data/aggregates.json from the tables
+"""
+import json
+import os
+import sys
+from contextlib import contextmanager
+import numpy as np
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from storage import DATA_DIR, get_repository, file_lock
+from sketches import HyperLogLog
+import reports
+
+AGGREGATES_PATH = os.path.join(DATA_DIR, "aggregates.json")
+# Bumped when the sidecar layout changes; older files are rebuilt
+FORMAT_VERSION = 3
+
+# Sidecar section -> table it is computed from
+SECTIONS = {
+    'appointments': 'appointments',
+    'doctors': 'doctors',
+    'patients': 'patients',
+    'predictions': 'predictions',
+}
+
+
+class AggregateStore:
+    """Report counters persisted in a JSON sidecar, kept in step with the tables"""
+
+    def __init__(self, path=AGGREGATES_PATH):
+        self.path = path
+
+    def get(self):
+        """
+        Current aggregates, rebuilding any section whose table changed
+
+        The rebuild scans the tables without holding the store's lock, so
+        writers keep going meanwhile; only the rebuilt sections are merged
+        back, into whatever the file holds by then.
+        """
+        with file_lock(self.path):
+            data = self._load() or {'versions': {}}
+        stale = self._stale(data)
+        if not stale:
+            return data
+        rebuilt = {'versions': {}}
+        self._rebuild(rebuilt, stale)
+        with file_lock(self.path):
+            data = self._load() or {'versions': {}}
+            for section in stale:
+                data[section] = rebuilt[section]
+                data['versions'][SECTIONS[section]] = rebuilt['versions'][SECTIONS[section]]
+            self._save(data)
+        return data
+
+    @contextmanager
+    def updating(self, table):
+        """
+        Make a write to table and update the aggregates, atomically
+
+        Yields the current aggregates; the caller writes the table and
+        applies the delta (record_*()) to them. They are saved with the
+        table's new version when the block exits without an exception.
+        Nothing is rebuilt here: if the table's section is already stale
+        the delta goes to a scratch copy and the section stays stale, to be
+        rebuilt by the next get().
+        """
+        with file_lock(self.path):
+            data = self._load() or {'versions': {}}
+            if any(SECTIONS[section] == table for section in self._stale(data)):
+                yield _empty()
+                return
+            yield data
+            data['versions'][table] = _version_token(table)
+            self._save(data)
+
+    def rebuild(self, sections=None):
+        """Recompute sections (all by default) from the tables and save"""
+        with file_lock(self.path):
+            data = self._load() or {'versions': {}}
+            self._rebuild(data, list(sections or SECTIONS))
+            self._save(data)
+            return data
+
+    def _stale(self, data):
+        """Sections missing from data or computed from an older table version"""
+        return [section for section, table in SECTIONS.items()
+                if section not in data or data['versions'].get(table) != _version_token(table)]
+
+    def _rebuild(self, data, sections):
+        # Versions are taken first: a write during the scan leaves them stale,
+        # so the section is simply rebuilt again next time
+        for section in sections:
+            data['versions'][SECTIONS[section]] = _version_token(SECTIONS[section])
+        stats = reports.compute_stats(appointments='appointments' in sections,
+                                      doctors='doctors' in sections,
+                                      patients='patients' in sections,
+                                      predictions='predictions' in sections,
+                                      keep_patient_sketch=True)
+        if 'appointments' in stats and stats['appointments'] is None:
+            stats['appointments'] = reports.appointment_stats([], keep_patient_sketch=True)
+        data.update(stats)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"Error reading {self.path}, rebuilding: {e}")
+            return None
+        return data if data.get('format') == FORMAT_VERSION else None
+
+    def _save(self, data):
+        data['format'] = FORMAT_VERSION
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+
+def _version_token(table):
+    """Table version as stored in JSON (tuples become lists)"""
+    version = get_repository(table).version()
+    return list(version) if isinstance(version, tuple) else version
+
+
+def _empty():
+    """Aggregates of empty tables, for deltas that won't be kept"""
+    return {'versions': {},
+            'appointments': reports.appointment_stats([], keep_patient_sketch=True),
+            'doctors': [],
+            'patients': reports.patient_stats([]),
+            'predictions': reports.prediction_stats([])}
+
+
+def _bump(counts, key, delta=1):
+    counts[key] = counts.get(key, 0) + delta
+    if counts[key] == 0:
+        del counts[key]
+
+
+def record_appointment(data, appointment):
+    """Count a newly booked appointment"""
+    stats = data['appointments']
+    status = appointment.get('status') or reports.UNKNOWN
+    stats['total'] += 1
+    _bump(stats['by_status'], status)
+    doctor = stats['by_doctor'].setdefault(str(appointment['doctor_id']), {'total': 0, 'by_status': {}})
+    doctor['total'] += 1
+    _bump(doctor['by_status'], status)
+    _bump(stats['by_specialization'], appointment.get('specialization') or reports.UNKNOWN)
+    _bump(stats['by_day'], appointment.get('date') or reports.UNKNOWN)
+
+    # Distinct patients as a fixed-size sketch, so the sidecar doesn't grow
+    # with the number of patients. A sketch that changes proves the patient
+    # is new, so an exact count from the last rebuild stays exact; one that
+    # doesn't can't tell, and the count becomes the sketch's estimate.
+    patients = HyperLogLog.loads(stats['patient_sketch'])
+    before = patients.registers.copy()
+    patients.add([str(appointment['patient_id'])])
+    stats['patient_sketch'] = patients.dumps()
+    if stats['unique_patients_exact'] and not np.array_equal(before, patients.registers):
+        stats['unique_patients'] += 1
+    else:
+        stats['unique_patients'] = patients.estimate()
+        stats['unique_patients_exact'] = False
+
+
+def record_status_change(data, appointment, new_status):
+    """Move an existing appointment from its current status to new_status"""
+    old_status = appointment.get('status') or reports.UNKNOWN
+    if old_status == new_status:
+        return
+    stats = data['appointments']
+    doctor = stats['by_doctor'].setdefault(str(appointment['doctor_id']), {'total': 0, 'by_status': {}})
+    for counts in (stats['by_status'], doctor['by_status']):
+        _bump(counts, old_status, -1)
+        _bump(counts, new_status)
+
+
+def record_doctor(data, doctor):
+    """Add a newly registered doctor"""
+    data['doctors'].append({'doctor_id': doctor['doctor_id'], 'name': doctor['name'],
+                            'specialization': doctor['specialization']})
+
+
+def record_prediction(data, prediction):
+    """Count a saved disease prediction"""
+    stats = data['predictions']
+    stats['total'] += 1
+    _bump(stats['by_disease'], prediction.get('predicted_disease') or reports.UNKNOWN)
+    _bump(stats['by_day'], str(prediction.get('date') or reports.UNKNOWN)[:10])
+
+
+_store = None
+
+
+def get_aggregate_store():
+    """Return the shared AggregateStore"""
+    global _store
+    if _store is None:
+        _store = AggregateStore()
+    return _store
+
+
+def main():
+    data = AggregateStore().rebuild()
+    appointments = data['appointments']
+    print(f"Rebuilt {AGGREGATES_PATH}: {appointments['total']} appointments, "
+          f"{len(data['doctors'])} doctors, {data['patients']['total']} patients, "
+          f"{data['predictions']['total']} predictions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
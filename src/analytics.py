@@ -0,0 +1,349 @@
+"""
+Time-windowed analytics
+
+Appointment volume per doctor and per specialization, and predicted
+diseases, bucketed by day. Each is a SeriesCube: the (key, day, count)
+entries with a nonzero count, sorted by key then day, plus their running
+(cumulative) sum. The count for any key over any date range is two binary
+searches and one subtraction, vectorized over all keys. Daily/weekly series
+and rolling windows are the same lookup at many boundaries at once; nothing
+rescans the tables after the cache is built. Storage grows with the number
+of distinct (key, day) pairs, not with the date span, so a stray 1900 or
+2099 date costs one entry.
+
+The cubes are built by streaming appointments.csv and
+disease_predictions.csv in chunks (only the key and date columns, from the
+columnar snapshot when it is fresh), and saved
+as a compact NumPy cache (data/analytics_cache.npz) together with the
+tables' version() tokens; only the cubes of a table that changed are rebuilt.
+
+Usage:
+    python src/analytics.py specialization --from 2025-11-01 --to 2025-11-30 --freq W -o volume.csv
+    python src/analytics.py disease --window 7 -o disease_trends.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from storage import DATA_DIR, get_repository
+from snapshot import read_chunks
+from scheduling import parse_date, SchedulingError
+
+CACHE_PATH = os.path.join(DATA_DIR, "analytics_cache.npz")
+
+# Dimension -> (table, key column)
+DIMENSIONS = {
+    'doctor': ('appointments', 'doctor_id'),
+    'specialization': ('appointments', 'specialization'),
+    'disease': ('predictions', 'predicted_disease'),
+}
+
+FREQUENCIES = {'D': 'daily', 'W': 'weekly (Monday to Sunday)'}
+
+UNKNOWN = 'Unknown'
+
+# A cube entry's search key is key index << DAY_BITS | day ordinal
+DAY_BITS = 32
+DAY_MASK = (1 << DAY_BITS) - 1
+
+
+class AnalyticsError(ValueError):
+    """Invalid analytics query (unknown dimension, bad date or window)"""
+
+
+class SeriesCube:
+    """Daily counts per key, with cumulative sums for logarithmic-time range sums"""
+
+    def __init__(self, keys, key_codes, days, counts):
+        """
+        Args:
+            keys: Key names
+            key_codes, days, counts: One entry per (key, day) with a nonzero
+                count: the key's index in keys, the day ordinal and the count
+        """
+        self.keys = [str(key) for key in keys]
+        key_codes = np.asarray(key_codes, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        order = np.lexsort((days, key_codes))
+        self.key_codes, self.days = key_codes[order], days[order]
+        self.counts = np.asarray(counts, dtype=np.int64)[order]
+        # One sorted search key per entry, so every key's range is found by
+        # a single searchsorted over all keys at once
+        self._entries = (self.key_codes << DAY_BITS) | self.days
+        self.cumulative = np.zeros(len(self.counts) + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.cumulative[1:])
+        self.first_day = int(self.days.min()) if len(self.days) else 0
+        self.last_day = int(self.days.max()) if len(self.days) else -1
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Build from a Series of counts indexed by (key, day ordinal)"""
+        if counts.empty:
+            return cls([], [], [], [])
+        keys, key_codes = np.unique(counts.index.get_level_values(0).to_numpy(dtype=str), return_inverse=True)
+        days = counts.index.get_level_values(1).to_numpy(dtype=np.int64)
+        return cls(keys, key_codes, days, counts.to_numpy())
+
+    def range_sums(self, starts, ends):
+        """
+        Counts per key over each inclusive day range [starts[i], ends[i]]
+
+        Returns:
+            keys x ranges array
+        """
+        base = (np.arange(len(self.keys), dtype=np.int64) << DAY_BITS)[:, None]
+        starts = np.clip(np.asarray(starts, dtype=np.int64), 0, DAY_MASK)
+        ends = np.clip(np.asarray(ends, dtype=np.int64), -1, DAY_MASK)
+        lo = np.searchsorted(self._entries, base + starts, side='left')
+        hi = np.searchsorted(self._entries, base + ends, side='right')
+        return self.cumulative[np.maximum(hi, lo)] - self.cumulative[lo]
+
+    def bounds(self, date_from=None, date_to=None):
+        """Inclusive (first, last) day ordinals of a query; defaults to the cube's span"""
+        first = _day(date_from, 'from') if date_from else self.first_day
+        last = _day(date_to, 'to') if date_to else self.last_day
+        if last < first:
+            raise AnalyticsError("The end date is before the start date.")
+        return first, last
+
+    def span(self, date_from=None, date_to=None):
+        """Inclusive (first, last) dates of a query"""
+        first, last = self.bounds(date_from, date_to)
+        return date.fromordinal(first), date.fromordinal(last)
+
+    def totals(self, date_from=None, date_to=None):
+        """Counts per key over a date range, largest first"""
+        first, last = self.bounds(date_from, date_to)
+        sums = self.range_sums([first], [last])[:, 0]
+        return pd.Series(sums, index=pd.Index(self.keys, name='key'), name='count').sort_values(
+            ascending=False, kind='stable')
+
+    def series(self, date_from=None, date_to=None, freq='D', keys=None):
+        """
+        Counts per bucket (rows, labelled by bucket start date) and key (columns)
+
+        freq is 'D' (daily) or 'W' (weeks starting on Monday; partial weeks
+        at either end count only the days inside the range).
+        """
+        if freq not in FREQUENCIES:
+            raise AnalyticsError(f"Unknown frequency: {freq} (use one of {', '.join(FREQUENCIES)})")
+        first, last = self.bounds(date_from, date_to)
+        if freq == 'D':
+            starts = np.arange(first, last + 1)
+            ends = starts
+        else:
+            # date.toordinal() % 7 == 1 on Mondays
+            week_start = first - (first - 1) % 7
+            starts = np.arange(week_start, last + 1, 7)
+            ends = np.minimum(starts + 6, last)
+            return self._frame(self.range_sums(np.maximum(starts, first), ends), starts, keys)
+        return self._frame(self.range_sums(starts, ends), starts, keys)
+
+    def rolling(self, window, date_from=None, date_to=None, keys=None):
+        """Trailing window-day counts ending on each day of the range"""
+        try:
+            window = int(window)
+        except (TypeError, ValueError):
+            window = 0
+        if window < 1:
+            raise AnalyticsError("The window must be a positive number of days.")
+        first, last = self.bounds(date_from, date_to)
+        ends = np.arange(first, last + 1)
+        return self._frame(self.range_sums(ends - window + 1, ends), ends, keys)
+
+    def _frame(self, sums, days, keys):
+        index = pd.Index([date.fromordinal(int(day)) for day in days], name='date')
+        frame = pd.DataFrame(sums.T, index=index, columns=self.keys)
+        if keys is not None:
+            frame = frame.reindex(columns=list(keys), fill_value=0)
+        return frame
+
+
+class AnalyticsCache:
+    """The SeriesCube of every dimension, rebuilt when the source tables change"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.cubes = {}
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def cube(self, dimension):
+        """SeriesCube for 'doctor', 'specialization' or 'disease'"""
+        if dimension not in DIMENSIONS:
+            raise AnalyticsError(f"Unknown dimension: {dimension} (use one of {', '.join(DIMENSIONS)})")
+        self.refresh()
+        return self.cubes[dimension]
+
+    def refresh(self):
+        """Load the cache, rebuilding the cubes of any table that changed"""
+        versions = _versions()
+        if versions == self._versions:
+            return
+        with self._lock:
+            if versions == self._versions:
+                return
+            cubes, cached_versions = self._load()
+            stale = [table for table in versions if cached_versions.get(table) != versions[table]]
+            if stale:
+                cubes.update(build_cubes(stale))
+                self._save(cubes, versions)
+            self.cubes = cubes
+            self._versions = versions
+
+    def _load(self):
+        """(cubes, versions) from the cache file, or ({}, {}) if unreadable"""
+        try:
+            with np.load(self.path, allow_pickle=False) as cache:
+                cubes = {
+                    dimension: SeriesCube(cache[f'{dimension}_keys'].tolist(),
+                                          cache[f'{dimension}_key_codes'],
+                                          cache[f'{dimension}_days'],
+                                          cache[f'{dimension}_counts'])
+                    for dimension in DIMENSIONS
+                }
+                return cubes, json.loads(str(cache['versions']))
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return {}, {}
+
+    def _save(self, cubes, versions):
+        arrays = {'versions': np.array(json.dumps(versions))}
+        for dimension, cube in cubes.items():
+            arrays[f'{dimension}_keys'] = np.array(cube.keys, dtype=str)
+            arrays[f'{dimension}_key_codes'] = cube.key_codes.astype(np.int32)
+            arrays[f'{dimension}_days'] = cube.days.astype(np.int32)
+            arrays[f'{dimension}_counts'] = cube.counts.astype(_count_dtype(cube.counts))
+        try:
+            temp_path = self.path + '.tmp.npz'
+            np.savez_compressed(temp_path, **arrays)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error saving analytics cache: {e}")
+
+
+def build_cubes(tables=None):
+    """Stream each table once and bucket it into the SeriesCubes of its dimensions"""
+    cubes = {}
+    for table in tables or _tables():
+        dimensions = {dimension: column for dimension, (source, column) in DIMENSIONS.items() if source == table}
+        partials = {dimension: [] for dimension in dimensions}
+        repo = get_repository(table)
+        if repo.exists():
+            for chunk in read_chunks(table, list(dimensions.values()) + ['date']):
+                days = _day_ordinals(chunk['date'])
+                valid = days >= 0
+                for dimension, column in dimensions.items():
+                    frame = pd.DataFrame({'key': chunk[column].astype(object).fillna(UNKNOWN).astype(str).to_numpy()[valid],
+                                          'day': days[valid]})
+                    partials[dimension].append(frame.groupby(['key', 'day'], sort=False).size())
+        for dimension, parts in partials.items():
+            counts = (pd.concat(parts).groupby(level=[0, 1]).sum() if parts
+                      else pd.Series(dtype='int64'))
+            cubes[dimension] = SeriesCube.from_counts(counts)
+    return cubes
+
+
+def export_series(frame, path):
+    """Write a series frame to .csv or .json (records with ISO dates)"""
+    if path.lower().endswith('.json'):
+        records = frame.reset_index()
+        records['date'] = records['date'].astype(str)
+        records.to_json(path, orient='records', indent=2)
+    elif path.lower().endswith('.csv'):
+        frame.to_csv(path, encoding='utf-8')
+    else:
+        raise AnalyticsError("Export path must end in .csv or .json")
+    return path
+
+
+def _tables():
+    return sorted({table for table, _ in DIMENSIONS.values()})
+
+
+def _versions():
+    return {table: _json_version(get_repository(table).version()) for table in _tables()}
+
+
+def _json_version(version):
+    return list(version) if isinstance(version, tuple) else version
+
+
+def _day_ordinals(dates):
+    """Day ordinals of 'YYYY-MM-DD[ HH:MM:SS]' values; -1 where missing or invalid"""
+    # Parse each distinct day once
+    codes, uniques = pd.factorize(dates.astype(str).str[:10])
+    parsed = pd.to_datetime(pd.Series(uniques), format='%Y-%m-%d', errors='coerce')
+    ordinals = np.array([day.toordinal() if not pd.isna(day) else -1 for day in parsed], dtype=np.int64)
+    return ordinals[codes]
+
+
+def _day(value, name):
+    try:
+        return parse_date(value).toordinal()
+    except SchedulingError:
+        raise AnalyticsError(f"Invalid {name} date: {value} (use YYYY-MM-DD)")
+
+
+def _count_dtype(counts):
+    """Smallest unsigned dtype that holds the counts, to keep the cache compact"""
+    peak = int(counts.max()) if counts.size else 0
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if peak <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_analytics():
+    """Return the shared AnalyticsCache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalyticsCache()
+        return _cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Appointment volume and disease trend series")
+    parser.add_argument('dimension', choices=list(DIMENSIONS))
+    parser.add_argument('--from', dest='date_from', help="first day, YYYY-MM-DD (default: earliest)")
+    parser.add_argument('--to', dest='date_to', help="last day, YYYY-MM-DD (default: latest)")
+    parser.add_argument('--freq', choices=list(FREQUENCIES), default='D', help="bucket size")
+    parser.add_argument('--window', type=int, help="trailing rolling window in days (instead of --freq)")
+    parser.add_argument('--output', '-o', help="export to .csv or .json (default: print)")
+    args = parser.parse_args(argv)
+
+    try:
+        cube = get_analytics().cube(args.dimension)
+        if not cube.keys:
+            print(f"No {args.dimension} data available.")
+            return 1
+        if args.window:
+            frame = cube.rolling(args.window, args.date_from, args.date_to)
+        else:
+            frame = cube.series(args.date_from, args.date_to, args.freq)
+        if args.output:
+            print(f"Series saved to: {export_series(frame, args.output)}")
+        else:
+            print(frame.to_string())
+    except AnalyticsError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Batch disease prediction over a file of symptom sets
+
+Streams a CSV or JSONL file through model_utils.predict_batch in fixed-size
+chunks, so memory stays bounded by the chunk size however large the input.
+
+Input formats:
+    CSV   - a 'symptoms' column with comma-separated names, or the
+            Symptom_1..Symptom_N columns of DiseaseAndSymptoms.csv
+    JSONL - one object per line with a 'symptoms' list or comma-separated string
+An 'id' (or 'prediction_id' / 'patient_id') field is carried through if present.
+
+Usage:
+    python src/batch_predict.py INPUT [--output OUT] [--format csv|jsonl] [--chunk-size 1000]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from itertools import islice
+import numpy as np
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from model_utils import load_or_train_model, predict_batch, get_encoder
+
+ID_FIELDS = ['id', 'prediction_id', 'patient_id']
+OUTPUT_FIELDS = ['id', 'symptoms', 'predicted_disease', 'confidence', 'unknown_symptoms']
+
+
+def split_symptoms(value):
+    """Turn a list or comma-separated string into a clean list of symptom names"""
+    if isinstance(value, (list, tuple)):
+        items = [item for item in value if not pd.isna(item)]
+    elif pd.isna(value):
+        items = []
+    else:
+        items = str(value).split(',')
+    names = [str(item).strip() for item in items]
+    return [name for name in names if name and name.lower() != 'none']
+
+
+def _row_id(record, fallback):
+    for field in ID_FIELDS:
+        if field in record and record[field] is not None:
+            return record[field]
+    return fallback
+
+
+def read_csv_chunks(path, chunk_size):
+    """Yield lists of (id, symptoms) from a CSV file, chunk_size rows at a time"""
+    offset = 0
+    for chunk in pd.read_csv(path, encoding='utf-8', chunksize=chunk_size):
+        if 'symptoms' in chunk.columns:
+            symptom_lists = [split_symptoms(v) for v in chunk['symptoms']]
+        else:
+            symptom_cols = [col for col in chunk.columns if 'Symptom_' in col]
+            symptom_lists = [split_symptoms(list(row)) for row in
+                             chunk[symptom_cols].itertuples(index=False, name=None)]
+        records = chunk.to_dict('records')
+        yield [(_row_id(record, offset + i), symptoms)
+               for i, (record, symptoms) in enumerate(zip(records, symptom_lists))]
+        offset += len(chunk)
+
+
+def read_jsonl_chunks(path, chunk_size):
+    """Yield lists of (id, symptoms) from a JSONL file, chunk_size lines at a time"""
+    with open(path, encoding='utf-8') as f:
+        lines = (line for line in f if line.strip())
+        offset = 0
+        while True:
+            batch = list(islice(lines, chunk_size))
+            if not batch:
+                break
+            rows = []
+            for i, line in enumerate(batch):
+                record = json.loads(line)
+                rows.append((_row_id(record, offset + i), split_symptoms(record.get('symptoms'))))
+            yield rows
+            offset += len(batch)
+
+
+def run(input_path, output, fmt, chunk_size, model, encoder_data):
+    """Predict every symptom set in input_path and write results to output; returns row count"""
+    reader = read_jsonl_chunks if input_path.endswith(('.jsonl', '.json')) else read_csv_chunks
+    encoder = get_encoder(encoder_data)
+    buffer = np.zeros((chunk_size, encoder.n_features), dtype=np.float32)
+
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(output, fieldnames=OUTPUT_FIELDS, lineterminator='\n')
+        writer.writeheader()
+
+    total = 0
+    for rows in reader(input_path, chunk_size):
+        symptom_lists = [symptoms for _, symptoms in rows]
+        results = predict_batch(model, encoder_data, symptom_lists, buffer=buffer)
+        for (row_id, symptoms), (disease, confidence) in zip(rows, results):
+            result = {
+                'id': row_id,
+                'symptoms': ', '.join(symptoms),
+                'predicted_disease': disease,
+                'confidence': round(confidence, 4),
+                'unknown_symptoms': ', '.join(encoder.unknown(symptoms)),
+            }
+            if writer is not None:
+                writer.writerow(result)
+            else:
+                output.write(json.dumps(result, default=str) + '\n')
+        total += len(rows)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch disease prediction over a CSV/JSONL file")
+    parser.add_argument('input', help="CSV or JSONL file of symptom sets")
+    parser.add_argument('--output', '-o', help="output file (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                        help="output format (default: from --output extension, else csv)")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="rows per prediction batch")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('jsonl' if args.output and args.output.endswith('.jsonl') else 'csv')
+
+    model, encoder_data = load_or_train_model()
+    if model is None:
+        print("Error: Could not load or train model!", file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as out:
+            total = run(args.input, out, fmt, args.chunk_size, model, encoder_data)
+        print(f"✓ {total} predictions written to {args.output}", file=sys.stderr)
+    else:
+        run(args.input, sys.stdout, fmt, args.chunk_size, model, encoder_data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Compact, pickle-free artifact format for the disease prediction forest
+
+export_forest() flattens a fitted RandomForestClassifier (or any sklearn
+forest of decision trees) into plain NumPy arrays:
+
+    feature, threshold, children_left, children_right, leaf_index  (per node)
+    leaf_values                                                    (per leaf)
+    roots                                                          (per tree)
+
+Each export writes its arrays as .npy files into a new directory of its own
+(data/disease_model/v<timestamp>-<id>/) and then atomically switches the
+JSON manifest, which also carries the class labels, feature columns and the
+sha256 of every array, replacing symptom_encoder.pkl. Array files are never
+rewritten, so a re-export can't change the pages of a model that is already
+memory-mapped; the newest few older exports are kept for readers that
+loaded the previous manifest a moment ago. CompactForest reads the arrays with np.load(mmap_mode='r'),
+so loading is nearly instant and several worker processes share the same
+pages. It needs only NumPy and behaves like the sklearn model for
+model_utils.predict_from_symptoms / predict_batch.
+
+Usage (convert the existing pickled model):
+    python src/compact_model.py
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime
+import numpy as np
+
+FORMAT_NAME = 'medicore-forest'
+FORMAT_VERSION = 1
+COMPACT_MODEL_DIR = "data/disease_model"
+MANIFEST_FILE = "manifest.json"
+# Older export directories kept after a re-export
+KEEP_PREVIOUS = 2
+
+ARRAY_NAMES = ['feature', 'threshold', 'children_left', 'children_right',
+               'leaf_index', 'leaf_values', 'roots']
+
+
+def flatten_forest(model):
+    """Return the dict of flat arrays describing every tree in a fitted forest"""
+    features, thresholds, lefts, rights, leaf_indexes, leaf_values, roots = [], [], [], [], [], [], []
+    node_offset = 0
+    leaf_offset = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+
+        # Class distribution at each leaf, normalized the same way sklearn
+        # does before averaging tree probabilities
+        values = tree.value[is_leaf, 0, :].astype(np.float64)
+        totals = values.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        leaf_values.append((values / totals).astype(np.float32))
+
+        leaf_ids = np.full(n_nodes, -1, dtype=np.int32)
+        leaf_ids[is_leaf] = np.arange(is_leaf.sum(), dtype=np.int32) + leaf_offset
+
+        features.append(np.where(is_leaf, -1, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, -1, tree.children_left + node_offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, tree.children_right + node_offset).astype(np.int32))
+        leaf_indexes.append(leaf_ids)
+        roots.append(node_offset)
+
+        node_offset += n_nodes
+        leaf_offset += int(is_leaf.sum())
+
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children_left': np.concatenate(lefts),
+        'children_right': np.concatenate(rights),
+        'leaf_index': np.concatenate(leaf_indexes),
+        'leaf_values': np.concatenate(leaf_values),
+        'roots': np.array(roots, dtype=np.int32),
+    }
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_forest(model, encoder_data, directory=COMPACT_MODEL_DIR, metadata=None):
+    """
+    Write a fitted forest as flat .npy arrays plus a JSON manifest
+
+    metadata (e.g. training parameters and metrics) is stored as-is in the
+    manifest. The arrays go into a fresh directory and the manifest is
+    switched to them last (via rename), so readers never see half-written
+    arrays and already-mapped ones are left untouched.
+
+    Returns:
+        Path of the manifest file
+    """
+    created = datetime.now()
+    version_dir = f"v{created.strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(os.path.join(directory, version_dir))
+    arrays = flatten_forest(model)
+
+    array_info = {}
+    for name in ARRAY_NAMES:
+        file_name = f"{version_dir}/{name}.npy"
+        path = os.path.join(directory, file_name)
+        np.save(path, np.ascontiguousarray(arrays[name]))
+        array_info[name] = {
+            'file': file_name,
+            'dtype': str(arrays[name].dtype),
+            'shape': list(arrays[name].shape),
+            'sha256': _sha256(path),
+        }
+
+    columns = list(encoder_data['columns'])
+    manifest = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'created': created.strftime('%Y-%m-%d %H:%M:%S'),
+        'model_type': type(model).__name__,
+        'n_trees': len(arrays['roots']),
+        'n_nodes': len(arrays['feature']),
+        'n_features': len(columns),
+        'classes': [str(c) for c in model.classes_],
+        'columns': columns,
+        'arrays': array_info,
+        'metadata': metadata or {},
+    }
+
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    _prune_exports(directory, version_dir)
+    return manifest_path
+
+
+def _prune_exports(directory, current):
+    """Remove export directories older than the KEEP_PREVIOUS before current"""
+    exports = sorted(entry for entry in os.listdir(directory)
+                     if entry.startswith('v') and entry != current
+                     and os.path.isdir(os.path.join(directory, entry)))
+    for entry in exports[:max(len(exports) - KEEP_PREVIOUS, 0)]:
+        # Unlinking keeps existing memory maps valid; only new loads are affected
+        shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+class CompactForest:
+    """Pure-NumPy forest inference over the exported flat arrays"""
+
+    def __init__(self, manifest, arrays):
+        self.manifest = manifest
+        self.classes_ = np.array(manifest['classes'], dtype=object)
+        self.n_features_in_ = manifest['n_features']
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        # Longest root-to-leaf path bounds the number of traversal steps
+        self.max_steps = self._max_depth()
+
+    @classmethod
+    def load(cls, directory=COMPACT_MODEL_DIR, mmap=True, verify=True):
+        """
+        Load an exported forest; arrays are memory-mapped by default
+
+        With verify, every array file is checked against the sha256 recorded
+        in the manifest.
+        """
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FORMAT_NAME:
+            raise ValueError(f"Not a {FORMAT_NAME} artifact: {directory}")
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact version {manifest.get('format_version')} "
+                             f"(expected {FORMAT_VERSION})")
+        arrays = {}
+        for name in ARRAY_NAMES:
+            info = manifest['arrays'][name]
+            path = os.path.join(directory, info['file'])
+            if verify and _sha256(path) != info['sha256']:
+                raise ValueError(f"Array {name} does not match the manifest checksum")
+            arrays[name] = np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+            if list(arrays[name].shape) != info['shape']:
+                raise ValueError(f"Array {name} does not match the manifest")
+        return cls(manifest, arrays)
+
+    def encoder_data(self):
+        """Encoder dict compatible with model_utils (replaces symptom_encoder.pkl)"""
+        columns = list(self.manifest['columns'])
+        return {'columns': columns, 'feature_names': columns}
+
+    def _max_depth(self):
+        frontier = np.asarray(self.roots, dtype=np.int64)
+        steps = 0
+        while frontier.size:
+            internal = frontier[self.feature[frontier] >= 0]
+            frontier = np.concatenate([self.children_left[internal], self.children_right[internal]])
+            if frontier.size:
+                steps += 1
+        return steps
+
+    def apply(self, X):
+        """Leaf node reached in every tree: (n_samples, n_trees) node indices"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(np.asarray(self.roots, dtype=np.int64), (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_steps):
+            feature = self.feature[nodes]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, np.where(internal, feature, 0)] <= self.threshold[nodes]
+            next_nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+            nodes = np.where(internal, next_nodes, nodes)
+        return nodes
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over trees, like RandomForestClassifier"""
+        leaves = self.leaf_index[self.apply(X)]
+        return self.leaf_values[leaves].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def main():
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    import pickle
+    from model_utils import MODEL_PATH, ENCODER_PATH
+
+    if not (os.path.exists(MODEL_PATH) and os.path.exists(ENCODER_PATH)):
+        print("Error: Prediction model not found!")
+        print("Run: python analysis/save_model.py")
+        return 1
+    with open(MODEL_PATH, 'rb') as f:
+        model = pickle.load(f)
+    with open(ENCODER_PATH, 'rb') as f:
+        encoder_data = pickle.load(f)
+
+    manifest_path = export_forest(model, encoder_data)
+    print(f"✓ Compact model written to {manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Credential index and password hashing for login
+
+Each role (patient, doctor, admin) gets an in-memory username -> record map
+built once from its repository and rebuilt only when the table changes, so a
+login is a dict lookup plus one password check regardless of user count.
+
+Passwords are stored as salted PBKDF2-SHA256 hashes:
+    pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>
+The work factor is set with MEDICORE_PBKDF2_ITERATIONS. Legacy plaintext
+passwords still verify, but are migrated in one pass rather than on login
+(a login never rewrites a table): `python src/credentials.py` hashes every
+plaintext password with a single rewrite per table, and the SQLite backend
+hashes them while seeding from CSV.
+
+Usage:
+    python src/credentials.py    # hash all plaintext passwords
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import sys
+import threading
+
+import pandas as pd
+
+from storage import get_repository, frame_records
+
+ROLES = ('patient', 'doctor', 'admin')
+
+HASH_ALGORITHM = 'pbkdf2_sha256'
+PBKDF2_ITERATIONS = int(os.environ.get('MEDICORE_PBKDF2_ITERATIONS', 100000))
+SALT_BYTES = 16
+
+
+def hash_password(password, iterations=None, salt=None):
+    """Return the encoded salted hash for a password"""
+    iterations = iterations or PBKDF2_ITERATIONS
+    salt = salt or secrets.token_hex(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'),
+                                 salt.encode('utf-8'), iterations)
+    return f"{HASH_ALGORITHM}${iterations}${salt}${digest.hex()}"
+
+
+def is_hashed(stored):
+    """True if the stored value is an encoded password hash"""
+    return str(stored).startswith(HASH_ALGORITHM + '$')
+
+
+def verify_password(password, stored):
+    """Check a password against a stored hash (or legacy plaintext value)"""
+    stored = str(stored)
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    try:
+        _, iterations, salt, _ = stored.split('$')
+        iterations = int(iterations)
+    except ValueError:
+        return False
+    return hmac.compare_digest(hash_password(password, iterations, salt), stored)
+
+
+def hash_plaintext(stored):
+    """Hash of a stored plaintext password; hashes and empty values are returned as-is"""
+    if stored is None or pd.isna(stored) or is_hashed(stored):
+        return stored
+    return hash_password(str(stored))
+
+
+def migrate_passwords(roles=ROLES):
+    """
+    Hash every plaintext password, one rewrite per table
+
+    Returns:
+        {role: number of passwords hashed}
+    """
+    migrated = {}
+    for role in roles:
+        repo = get_repository(f"{role}s")
+        changes = {}
+        if repo.exists():
+            for chunk in repo.chunks([repo.key, 'password']):
+                for record in frame_records(chunk):
+                    hashed = hash_plaintext(record['password'])
+                    if hashed is not record['password']:
+                        changes[record[repo.key]] = {'password': hashed}
+        if changes:
+            repo.update_many(changes)
+        migrated[role] = len(changes)
+    return migrated
+
+
+_dummy = None
+
+
+def _dummy_hash():
+    global _dummy
+    if _dummy is None:
+        _dummy = hash_password('')
+    return _dummy
+
+
+class CredentialIndex:
+    """Username -> (user_id, stored password) map for one role's table"""
+
+    def __init__(self, repo):
+        self.repo = repo
+        self._users = {}
+        self._version = object()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rebuild the index if the underlying table changed"""
+        version = self.repo.version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            df = self.repo.all()
+            users = {}
+            if not df.empty:
+                for username, user_id, password in zip(df['username'].astype(str),
+                                                       df[self.repo.key],
+                                                       df['password'].astype(str)):
+                    users.setdefault(username, (user_id, password))
+            self._users = users
+            self._version = version
+
+    def authenticate(self, username, password):
+        """Return the user ID for valid credentials, otherwise None"""
+        self.refresh()
+        entry = self._users.get(username)
+        if entry is None:
+            # Spend the same effort as a real check so unknown users aren't
+            # distinguishable by response time
+            verify_password(password, _dummy_hash())
+            return None
+        user_id, stored = entry
+        if not verify_password(password, stored):
+            return None
+        return user_id
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_credential_index(role):
+    """Return the shared credential index for 'patient', 'doctor' or 'admin'"""
+    with _indexes_lock:
+        if role not in _indexes:
+            _indexes[role] = CredentialIndex(get_repository(f"{role}s"))
+        return _indexes[role]
+
+
+def main():
+    migrated = migrate_passwords()
+    for role, count in migrated.items():
+        print(f"{role}s: {count} plaintext password(s) hashed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
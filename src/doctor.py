@@ -1,6 +1,8 @@
-import pandas as pd
-import os
-from datetime import datetime
+import services
+from services import ServiceError
+
+# Patients shown per page of the patient list
+PAGE_SIZE = 20
 
 def doctor_menu(doctor_id):
     """Display doctor menu and handle doctor operations"""
@@ -39,50 +41,60 @@ def view_patient_list(doctor_id):
     
     try:
         # Get doctor info
-        doctors_df = pd.read_csv("data/doctors.csv", encoding='utf-8')
-        doctor = doctors_df[doctors_df['doctor_id'] == doctor_id].iloc[0]
-        print(f"Doctor: {doctor['name']} - {doctor['specialization']}")
-        
-        # Read appointments
-        appointments_file = "data/appointments.csv"
-        if not os.path.exists(appointments_file):
-            print("\nNo appointments found.")
-            return
-        
-        appointments_df = pd.read_csv(appointments_file, encoding='utf-8')
-        doctor_appointments = appointments_df[appointments_df['doctor_id'] == doctor_id]
-        
-        if doctor_appointments.empty:
-            print("\nNo patients assigned yet.")
+        try:
+            doctor = services.get_doctor(doctor_id)
+        except ServiceError:
+            print("Doctor record not found!")
             return
+        print(f"Doctor: {doctor['name']} - {doctor['specialization']}")
         
-        # Get unique patients
-        patients_df = pd.read_csv("data/patients.csv", encoding='utf-8')
-        unique_patient_ids = doctor_appointments['patient_id'].unique()
-        
-        print(f"\nTotal Patients: {len(unique_patient_ids)}")
-        print("-"*50)
-        
-        for patient_id in unique_patient_ids:
-            patient = patients_df[patients_df['patient_id'] == patient_id].iloc[0]
-            patient_appts = doctor_appointments[doctor_appointments['patient_id'] == patient_id]
-            
-            print(f"\nPatient ID: {patient_id}")
-            print(f"  Name: {patient['name']}")
-            print(f"  Age: {patient['age']}, Gender: {patient['gender']}")
-            print(f"  Contact: {patient['contact']}")
-            print(f"  Email: {patient['email']}")
-            print(f"  Total Appointments: {len(patient_appts)}")
+        offset = 0
+        while True:
+            page = services.doctor_patients(doctor_id, offset, PAGE_SIZE)
+            total = page['total']
             
-            # Show upcoming appointments
-            upcoming = patient_appts[patient_appts['status'] == 'Scheduled']
-            if not upcoming.empty:
-                print(f"  Upcoming Appointments: {len(upcoming)}")
-                for _, apt in upcoming.iterrows():
-                    print(f"    - {apt['date']} at {apt['time']} (Reason: {apt.get('reason', 'N/A')})")
+            if not total:
+                print("\nNo patients assigned yet.")
+                return
             
+            last = min(offset + PAGE_SIZE, total)
+            print(f"\nTotal Patients: {total} (showing {offset + 1}-{last})")
             print("-"*50)
             
+            for patient in page['patients']:
+                print(f"\nPatient ID: {patient['patient_id']}")
+                print(f"  Name: {patient['name']}")
+                print(f"  Age: {patient.get('age')}, Gender: {patient.get('gender')}")
+                print(f"  Contact: {patient.get('contact')}")
+                print(f"  Email: {patient.get('email')}")
+                print(f"  Total Appointments: {patient['total_appointments']}")
+                
+                # Show upcoming appointments
+                upcoming = patient['upcoming']
+                if upcoming:
+                    print(f"  Upcoming Appointments: {len(upcoming)}")
+                    for apt in upcoming:
+                        print(f"    - {apt['date']} at {apt['time']} (Reason: {apt.get('reason') or 'N/A'})")
+                
+                print("-"*50)
+            
+            if total <= PAGE_SIZE:
+                return
+            
+            # Page through long patient lists
+            options = []
+            if last < total:
+                options.append("'n' next")
+            if offset > 0:
+                options.append("'p' previous")
+            move = input(f"Enter {', '.join(options)} or 'q' to return: ").strip().lower()
+            if move == 'n' and last < total:
+                offset += PAGE_SIZE
+            elif move == 'p' and offset > 0:
+                offset -= PAGE_SIZE
+            else:
+                return
+            
     except Exception as e:
         print(f"Error viewing patient list: {e}")
 
@@ -93,36 +105,18 @@ def add_diagnosis(doctor_id):
     print("-"*50)
     
     try:
-        # Get doctor info
-        doctors_df = pd.read_csv("data/doctors.csv", encoding='utf-8')
-        doctor = doctors_df[doctors_df['doctor_id'] == doctor_id].iloc[0]
-        
-        # Read appointments
-        appointments_file = "data/appointments.csv"
-        if not os.path.exists(appointments_file):
-            print("No appointments found.")
-            return
-        
-        appointments_df = pd.read_csv(appointments_file, encoding='utf-8')
-        doctor_appointments = appointments_df[appointments_df['doctor_id'] == doctor_id]
-        
-        # Show scheduled appointments
-        scheduled = doctor_appointments[doctor_appointments['status'] == 'Scheduled']
+        scheduled = services.scheduled_appointments(doctor_id)
         
-        if scheduled.empty:
+        if not scheduled:
             print("No scheduled appointments found.")
             return
         
         print("\nScheduled Appointments:")
         print("-"*50)
-        patients_df = pd.read_csv("data/patients.csv", encoding='utf-8')
-        for num, (idx, apt) in enumerate(scheduled.iterrows(), 1):
-            patient_id = apt['patient_id']
-            patient = patients_df[patients_df['patient_id'] == patient_id].iloc[0]
-            
-            print(f"{num}. Patient: {patient['name']} ({patient_id})")
+        for num, apt in enumerate(scheduled, 1):
+            print(f"{num}. Patient: {apt['patient_name']} ({apt['patient_id']})")
             print(f"   Date: {apt['date']} at {apt['time']}")
-            print(f"   Reason: {apt.get('reason', 'N/A')}")
+            print(f"   Reason: {apt.get('reason') or 'N/A'}")
             print(f"   Appointment ID: {apt['appointment_id']}")
         
         # Get appointment selection
@@ -131,29 +125,25 @@ def add_diagnosis(doctor_id):
             return
         
         try:
-            apt_idx = list(scheduled.index)[int(apt_choice) - 1]
-            selected_apt = scheduled.loc[apt_idx]
+            apt_idx = int(apt_choice) - 1
+            if apt_idx < 0:
+                raise IndexError(apt_idx)
+            selected_apt = scheduled[apt_idx]
             
             # Get diagnosis details
             print(f"\nAdding diagnosis for Appointment ID: {selected_apt['appointment_id']}")
             diagnosis = input("Enter diagnosis: ").strip()
             prescription = input("Enter prescription: ").strip()
             
-            # Update appointment
-            appointments_df.loc[appointments_df['appointment_id'] == selected_apt['appointment_id'], 'diagnosis'] = diagnosis
-            appointments_df.loc[appointments_df['appointment_id'] == selected_apt['appointment_id'], 'prescription'] = prescription
-            appointments_df.loc[appointments_df['appointment_id'] == selected_apt['appointment_id'], 'status'] = 'Completed'
-            
-            # Save updated appointments
-            appointments_df.to_csv(appointments_file, index=False, encoding='utf-8')
+            appointment = services.add_diagnosis(doctor_id, selected_apt['appointment_id'],
+                                                 diagnosis, prescription)
             
             print(f"\n✓ Diagnosis added successfully!")
-            print(f"  Diagnosis: {diagnosis}")
-            print(f"  Prescription: {prescription}")
+            print(f"  Diagnosis: {appointment['diagnosis']}")
+            print(f"  Prescription: {appointment['prescription']}")
             
         except (ValueError, IndexError):
             print("Invalid appointment selection!")
             
     except Exception as e:
         print(f"Error adding diagnosis: {e}")
-
@@ -1,4 +1,3 @@
-import pandas as pd
 import os
 import sys
 
@@ -15,9 +14,16 @@ if parent_dir not in sys.path:
 from patient import patient_menu
 from doctor import doctor_menu
 from admin import admin_menu
+import services
+from services import ServiceError
+from storage import get_repository
+from model_utils import model_registry
 
 def main_menu():
     """Display the main menu and handle role selection"""
+    # Load the prediction model in the background so the first prediction is fast
+    model_registry.warm_up()
+    
     while True:
         print("\n" + "="*50)
         print(" " * 10 + "Medicore - Hospital Management System")
@@ -63,41 +69,27 @@ def login_user(role):
     print(f" {role.upper()} PORTAL - LOGIN")
     print("-"*50)
     
-    # Get CSV file path based on role
-    csv_file = f"data/{role}s.csv"
+    # Get repository for the role's table
+    repo = get_repository(f"{role}s")
     
-    # Check if file exists
-    if not os.path.exists(csv_file):
-        print(f"Error: {csv_file} not found!")
+    # Check if data exists
+    if not repo.exists():
+        print(f"Error: {role}s data not found!")
         return None
     
     try:
-        # Read the CSV file with explicit UTF-8 encoding
-        df = pd.read_csv(csv_file, encoding='utf-8')
-        
         # Get credentials from user
         username = input("Enter username: ").strip()
         password = input("Enter password: ").strip()
         
-        # Find user based on role
-        if role == 'patient':
-            user = df[(df['username'] == username) & (df['password'] == password)]
-            user_id_col = 'patient_id'
-        elif role == 'doctor':
-            user = df[(df['username'] == username) & (df['password'] == password)]
-            user_id_col = 'doctor_id'
-        elif role == 'admin':
-            user = df[(df['username'] == username) & (df['password'] == password)]
-            user_id_col = 'admin_id'
-        
-        if not user.empty:
-            user_id = user.iloc[0][user_id_col]
-            print(f"\n✓ Login successful! Welcome, {username}")
-            return user_id
-        else:
-            print("\n✗ Invalid username or password!")
-            return None
+        # Look up user in the credential index and verify the password hash
+        user = services.login(role, username, password)
+        print(f"\n✓ Login successful! Welcome, {username}")
+        return user['user_id']
             
+    except ServiceError as e:
+        print(f"\n✗ {e}")
+        return None
     except Exception as e:
         print(f"Error during login: {e}")
         return None
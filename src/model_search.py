@@ -0,0 +1,215 @@
+"""
+Hyperparameter search and model selection for the disease prediction model
+
+Every candidate (model family x settings in SEARCH_SPACE) is evaluated with
+stratified k-fold cross-validation on a process pool. For each candidate the
+job records mean/std accuracy, fit time, and serving latency measured on the
+compact NumPy engine that will actually answer predictions (single-row p50
+and p99, plus per-row cost in a batch).
+
+The most accurate candidate whose single-row p99 latency fits the budget is
+refit on the full dataset and promoted: saved as the pickles plus the compact
+artifact, with its settings and scores stored in the manifest. Results for
+all candidates are written to analysis/model_search_<timestamp>.json.
+
+Usage:
+    python src/model_search.py [--folds 5] [--latency-budget-ms 5] [--workers N] [--no-promote]
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import numpy as np
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+try:
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+    from sklearn.model_selection import StratifiedKFold
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+from compact_model import CompactForest, flatten_forest
+from training import DATASET_PATH, load_symptom_matrix, save_model_artifacts
+
+# Only tree ensembles are searched so the winner can always be served from
+# the compact NumPy artifact
+MODEL_FAMILIES = {
+    'random_forest': RandomForestClassifier,
+    'extra_trees': ExtraTreesClassifier,
+} if SKLEARN_AVAILABLE else {}
+
+SEARCH_SPACE = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 20, 10],
+        'max_features': ['sqrt', 'log2'],
+    },
+    'extra_trees': {
+        'n_estimators': [100, 200],
+        'max_depth': [None, 20],
+    },
+}
+
+LATENCY_SAMPLES = 200
+BATCH_SIZE = 256
+
+_X = None
+_y = None
+
+
+def _init_worker(path):
+    """Load the dataset once per worker process"""
+    global _X, _y
+    _X, _y, _ = load_symptom_matrix(path)
+
+
+def candidate_grid(search_space=SEARCH_SPACE):
+    """Yield (family, params) for every combination in the search space"""
+    for family, grid in search_space.items():
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            yield family, dict(zip(keys, values))
+
+
+def _serving_latency(model, X):
+    """Single-row p50/p99 and batched per-row latency of the compact engine (ms)"""
+    engine = CompactForest({'classes': [str(c) for c in model.classes_],
+                            'n_features': X.shape[1]},
+                           flatten_forest(model))
+    rows = X[:LATENCY_SAMPLES].toarray()
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        engine.predict_proba(row.reshape(1, -1))
+        timings.append((time.perf_counter() - start) * 1000)
+
+    batch = X[:BATCH_SIZE].toarray()
+    start = time.perf_counter()
+    engine.predict_proba(batch)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'predict_p50_ms': float(np.percentile(timings, 50)),
+        'predict_p99_ms': float(np.percentile(timings, 99)),
+        'batch_ms_per_row': batch_ms / len(batch),
+    }
+
+
+def evaluate_candidate(family, params, folds, random_state=42):
+    """Cross-validate one candidate; runs inside a worker process"""
+    estimator = MODEL_FAMILIES[family]
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+
+    scores, fit_times, latencies = [], [], []
+    for train_idx, test_idx in splitter.split(_X, _y):
+        model = estimator(random_state=random_state, n_jobs=1, **params)
+        start = time.perf_counter()
+        model.fit(_X[train_idx], _y[train_idx])
+        fit_times.append(time.perf_counter() - start)
+        scores.append(model.score(_X[test_idx], _y[test_idx]))
+        latencies.append(_serving_latency(model, _X[test_idx]))
+
+    return {
+        'family': family,
+        'params': params,
+        'accuracy_mean': float(np.mean(scores)),
+        'accuracy_std': float(np.std(scores)),
+        'fit_seconds_mean': float(np.mean(fit_times)),
+        'predict_p50_ms': float(np.median([l['predict_p50_ms'] for l in latencies])),
+        'predict_p99_ms': float(np.max([l['predict_p99_ms'] for l in latencies])),
+        'batch_ms_per_row': float(np.median([l['batch_ms_per_row'] for l in latencies])),
+    }
+
+
+def select_best(results, latency_budget_ms):
+    """Most accurate candidate within the latency budget (ties -> faster), or None"""
+    eligible = [r for r in results if r['predict_p99_ms'] <= latency_budget_ms]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: (round(r['accuracy_mean'], 6), -r['predict_p99_ms']))
+
+
+def run_search(path=DATASET_PATH, folds=5, workers=None, search_space=SEARCH_SPACE, verbose=True):
+    """Evaluate every candidate on a process pool; returns the list of results"""
+    candidates = list(candidate_grid(search_space))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(path,)) as pool:
+        futures = [pool.submit(evaluate_candidate, family, params, folds)
+                   for family, params in candidates]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if verbose:
+                print(f"  [{len(results)}/{len(candidates)}] {result['family']} {result['params']}: "
+                      f"acc {result['accuracy_mean']:.4f}, fit {result['fit_seconds_mean']:.2f}s, "
+                      f"p99 {result['predict_p99_ms']:.2f} ms")
+    return results
+
+
+def promote(best, path=DATASET_PATH, data_dir="data", random_state=42):
+    """Refit the chosen candidate on all data and save it as the served artifact"""
+    X, y, vocabulary = load_symptom_matrix(path)
+    estimator = MODEL_FAMILIES[best['family']]
+    model = estimator(random_state=random_state, n_jobs=-1, **best['params'])
+    model.fit(X, y)
+    encoder_data = {'columns': vocabulary, 'feature_names': vocabulary}
+    metadata = {
+        'model_params': model.get_params(),
+        'selection': best,
+        'promoted': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    return save_model_artifacts(model, encoder_data, data_dir=data_dir, metadata=metadata)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated model search and promotion")
+    parser.add_argument('--data', default=DATASET_PATH, help="symptoms dataset CSV")
+    parser.add_argument('--folds', type=int, default=5, help="stratified k-fold splits")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--latency-budget-ms', type=float, default=5.0,
+                        help="maximum single-prediction p99 latency for promotion")
+    parser.add_argument('--no-promote', action='store_true', help="only report, don't replace the served model")
+    parser.add_argument('--results-dir', default="analysis", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    if not SKLEARN_AVAILABLE:
+        print("Error: scikit-learn is not installed. Please install it first.")
+        print("Run: pip install scikit-learn")
+        return 1
+
+    print(f"Evaluating {len(list(candidate_grid()))} candidates with {args.folds}-fold CV...")
+    results = run_search(args.data, args.folds, args.workers)
+    results.sort(key=lambda r: -r['accuracy_mean'])
+    best = select_best(results, args.latency_budget_ms)
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    results_file = os.path.join(args.results_dir, f"model_search_{timestamp}.json")
+    with open(results_file, 'w', encoding='utf-8') as f:
+        json.dump({'latency_budget_ms': args.latency_budget_ms, 'folds': args.folds,
+                   'best': best, 'candidates': results}, f, indent=2)
+    print(f"\nResults saved to: {results_file}")
+
+    if best is None:
+        print(f"✗ No candidate met the {args.latency_budget_ms} ms latency budget; served model unchanged.")
+        return 1
+
+    print(f"\nBest: {best['family']} {best['params']} "
+          f"(accuracy {best['accuracy_mean']:.4f}, p99 {best['predict_p99_ms']:.2f} ms)")
+    if not args.no_promote:
+        paths = promote(best, args.data)
+        print(f"✓ Promoted to {paths['compact_model']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,8 +3,13 @@ Utility functions for disease prediction model
 """
 import pandas as pd
 import numpy as np
+import hashlib
 import pickle
 import os
+import re
+import threading
+import warnings
+from compact_model import CompactForest, COMPACT_MODEL_DIR, MANIFEST_FILE
 
 # Lazy import sklearn - only import when needed
 try:
@@ -38,38 +43,189 @@ def get_all_symptoms():
         print(f"Error loading symptoms: {e}")
         return []
 
+PRECAUTIONS_PATH = "data/Disease precaution.csv"
+
+def normalize_disease(name):
+    """Canonical disease key: lowercase with whitespace collapsed and trimmed"""
+    return ' '.join(str(name).split()).lower()
+
+class PrecautionIndex:
+    """
+    Disease -> precautions dictionary loaded once from the precautions CSV
+    
+    Keys are normalized disease names, so "Diabetes " and "diabetes" match.
+    The CSV is re-read only when its mtime/size changes.
+    """
+    
+    def __init__(self, path=PRECAUTIONS_PATH):
+        self.path = path
+        self.frame = pd.DataFrame()
+        self.precautions = {}
+        self._stat = None
+        self._lock = threading.Lock()
+    
+    def refresh(self):
+        """Reload the CSV if it changed since the last load"""
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat = None
+        if stat == self._stat:
+            return
+        with self._lock:
+            if stat == self._stat:
+                return
+            if stat is None:
+                frame = pd.DataFrame()
+            else:
+                frame = pd.read_csv(self.path, encoding='utf-8')
+            precautions = {}
+            if 'Disease' in frame.columns:
+                prec_cols = [col for col in frame.columns if 'Precaution' in col]
+                for disease, values in zip(frame['Disease'], frame[prec_cols].itertuples(index=False, name=None)):
+                    precautions.setdefault(normalize_disease(disease),
+                                           [str(v).strip() for v in values if pd.notna(v) and str(v).strip()])
+            self.frame = frame
+            self.precautions = precautions
+            self._stat = stat
+    
+    def get(self, disease):
+        """Precautions for a disease (empty list if unknown)"""
+        self.refresh()
+        return self.precautions.get(normalize_disease(disease), [])
+
+precaution_index = PrecautionIndex()
+
+def get_precautions(disease):
+    """Get the list of recommended precautions for a disease"""
+    try:
+        return precaution_index.get(disease)
+    except Exception as e:
+        print(f"Error loading precautions: {e}")
+        return []
+
 def get_disease_precautions():
-    """Get precautions for diseases"""
+    """Get precautions for diseases (cached DataFrame)"""
     try:
-        precautions_df = pd.read_csv("data/Disease precaution.csv", encoding='utf-8')
-        return precautions_df
+        precaution_index.refresh()
+        return precaution_index.frame
     except Exception as e:
         print(f"Error loading precautions: {e}")
         return pd.DataFrame()
 
-def load_or_train_model():
-    """Load trained model if exists, otherwise train a new one"""
-    if not SKLEARN_AVAILABLE:
-        print("Error: scikit-learn is not installed. Please install it first.")
-        print("Run: pip install scikit-learn")
-        return None, None
+MODEL_PATH = "data/disease_prediction_model.pkl"
+ENCODER_PATH = "data/symptom_encoder.pkl"
+
+def _file_digest(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ModelRegistry:
+    """
+    Process-wide holder for the trained model and its encoder data
+    
+    The compact NumPy artifact (see compact_model.py) is preferred when it
+    exists; otherwise the pickled model and encoder are used. Artifacts are
+    loaded once and reloaded only when a file's mtime/size changes *and* its
+    content hash differs from the loaded copy. A missing artifact is
+    reported, never trained on the spot - run analysis/save_model.py to
+    produce one.
+    """
     
-    model_path = "data/disease_prediction_model.pkl"
-    encoder_path = "data/symptom_encoder.pkl"
+    def __init__(self, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+                 compact_dir=COMPACT_MODEL_DIR):
+        self.pickle_paths = (model_path, encoder_path)
+        self.manifest_path = os.path.join(compact_dir, MANIFEST_FILE)
+        self.compact_dir = compact_dir
+        # (model, encoder_data), replaced in one assignment so a caller never
+        # pairs a newly loaded model with the previous encoder columns
+        self._loaded = (None, None)
+        self._stats = None
+        self._digests = None
+        self._lock = threading.Lock()
+        self._warmup_thread = None
     
-    # Check if model exists
-    if os.path.exists(model_path) and os.path.exists(encoder_path):
+    @property
+    def paths(self):
+        """Files that make up the artifact currently being served"""
+        if os.path.exists(self.manifest_path):
+            return (self.manifest_path,)
+        return self.pickle_paths
+    
+    def _stat(self):
+        paths = self.paths
         try:
-            with open(model_path, 'rb') as f:
-                model = pickle.load(f)
-            with open(encoder_path, 'rb') as f:
-                encoder_data = pickle.load(f)
-            return model, encoder_data
-        except Exception as e:
-            print(f"Error loading model: {e}. Retraining...")
+            return paths, tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, paths))
+        except FileNotFoundError:
+            return None
+    
+    def _load(self, paths):
+        if paths == (self.manifest_path,):
+            # Array files are never rewritten (each export gets its own
+            # directory) and load() checks them against the sha256 in the
+            # manifest, so hashing the manifest covers the whole artifact
+            model = CompactForest.load(self.compact_dir)
+            return model, model.encoder_data()
+        if not SKLEARN_AVAILABLE:
+            raise ImportError("scikit-learn is not installed (pip install scikit-learn)")
+        model_path, encoder_path = paths
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        with open(encoder_path, 'rb') as f:
+            encoder_data = pickle.load(f)
+        return model, encoder_data
+    
+    def get(self):
+        """Return (model, encoder_data), loading or reloading only if needed"""
+        stats = self._stat()
+        if stats is not None and stats == self._stats:
+            return self._loaded
+        
+        with self._lock:
+            stats = self._stat()
+            if stats is None:
+                if self._loaded[0] is None:
+                    print("Error: Prediction model not found!")
+                    print("Run: python analysis/save_model.py")
+                return self._loaded
+            if stats == self._stats:
+                return self._loaded
+            
+            try:
+                paths = stats[0]
+                digests = tuple(_file_digest(path) for path in paths)
+                if digests != self._digests:
+                    self._loaded = self._load(paths)
+                    self._digests = digests
+                self._stats = stats
+            except Exception as e:
+                print(f"Error loading model: {e}")
+        return self._loaded
+    
+    def warm_up(self, background=True):
+        """Load the model ahead of the first prediction, optionally in a daemon thread"""
+        if not background:
+            self.get()
+            return
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(target=self.get, name="model-warmup", daemon=True)
+            self._warmup_thread.start()
+
+model_registry = ModelRegistry()
+
+def load_or_train_model():
+    """
+    Return the cached (model, encoder_data) from the model registry
     
-    # Train new model
-    return train_and_save_model()
+    Kept under its original name for existing callers. The model is no
+    longer trained here when missing; (None, None) is returned instead.
+    """
+    return model_registry.get()
 
 def train_and_save_model():
     """Train the disease prediction model and save it"""
@@ -79,47 +235,16 @@ def train_and_save_model():
         return None, None
     
     try:
-        # Load data
-        symptoms_df = pd.read_csv("data/DiseaseAndSymptoms.csv", encoding='utf-8')
-        
-        # Handle missing values
-        symptom_cols = [col for col in symptoms_df.columns if 'Symptom_' in col]
-        symptoms_df[symptom_cols] = symptoms_df[symptom_cols].fillna('None')
-        
-        # Prepare features and target
-        X = symptoms_df[symptom_cols]
-        y = symptoms_df['Disease']
-        
-        # One-hot encode symptoms
-        X_encoded = pd.get_dummies(X, prefix='', prefix_sep='')
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_encoded, y, test_size=0.2, random_state=42, stratify=y
-        )
-        
-        # Train model
-        model = RandomForestClassifier(random_state=42, n_estimators=100)
-        model.fit(X_train, y_train)
+        from training import train_sparse_model, save_model_artifacts
         
-        # Save model and encoder info
-        model_path = "data/disease_prediction_model.pkl"
-        encoder_path = "data/symptom_encoder.pkl"
+        # Train on the deduplicated sparse symptom matrix (all cores)
+        model, encoder_data, report = train_sparse_model(n_jobs=-1)
         
-        with open(model_path, 'wb') as f:
-            pickle.dump(model, f)
-        
-        # Save encoder info (column names)
-        encoder_data = {
-            'columns': X_encoded.columns.tolist(),
-            'feature_names': X_encoded.columns.tolist()
-        }
-        
-        with open(encoder_path, 'wb') as f:
-            pickle.dump(encoder_data, f)
+        # Save model, encoder info and compact NumPy artifact used for serving
+        save_model_artifacts(model, encoder_data,
+                             metadata={'model_params': model.get_params()})
         
         print(f"Model trained and saved successfully!")
-        print(f"Model accuracy: {model.score(X_test, y_test):.4f}")
         
         return model, encoder_data
         
@@ -127,6 +252,78 @@ def train_and_save_model():
         print(f"Error training model: {e}")
         return None, None
 
+def normalize_symptom(name):
+    """Canonical symptom key: lowercase, trimmed, spaces/underscores collapsed to '_'"""
+    return re.sub(r'[\s_]+', '_', str(name).strip().lower()).strip('_')
+
+class SymptomEncoder:
+    """
+    Compiled symptom -> feature-vector encoder
+    
+    Built once from the model's feature columns. Symptom names are looked up
+    in a normalized-name -> column-indices dict and written straight into a
+    NumPy row buffer. One-hot encoding during training can produce several
+    columns for the same symptom (e.g. " skin_rash" and "skin_rash"), so a
+    name maps to every matching column.
+    """
+    
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.n_features = len(self.columns)
+        
+        index = {}
+        for i, col in enumerate(self.columns):
+            index.setdefault(normalize_symptom(col), []).append(i)
+        self.index = {name: np.array(idx, dtype=np.intp) for name, idx in index.items()}
+    
+    def lookup(self, symptom):
+        """Column indices for a symptom name (empty array if unknown)"""
+        return self.index.get(normalize_symptom(symptom), _NO_COLUMNS)
+    
+    def unknown(self, symptoms):
+        """Symptoms that don't match any feature column"""
+        return [s for s in symptoms if normalize_symptom(s) not in self.index]
+    
+    def encode(self, symptoms, out=None):
+        """Encode one list of symptoms into a (n_features,) float32 row"""
+        if out is None:
+            out = np.zeros(self.n_features, dtype=np.float32)
+        else:
+            out[:] = 0
+        for symptom in symptoms:
+            out[self.lookup(symptom)] = 1
+        return out
+    
+    def encode_batch(self, symptom_lists, out=None):
+        """Encode many symptom lists into an (n, n_features) float32 matrix"""
+        n = len(symptom_lists)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=np.float32)
+        else:
+            out[:n] = 0
+        for row, symptoms in enumerate(symptom_lists):
+            for symptom in symptoms:
+                out[row, self.lookup(symptom)] = 1
+        return out[:n]
+
+_NO_COLUMNS = np.array([], dtype=np.intp)
+_encoder_cache = {}
+
+def get_encoder(encoder_data):
+    """Return the compiled SymptomEncoder for encoder_data, building it once"""
+    columns = encoder_data['columns']
+    cached = _encoder_cache.get(id(columns))
+    if cached is None or cached[0] is not columns:
+        cached = (columns, SymptomEncoder(columns))
+        _encoder_cache[id(columns)] = cached
+    return cached[1]
+
+def _predict_proba(model, X):
+    """predict_proba on a raw NumPy matrix, without the feature-name warning"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        return model.predict_proba(X)
+
 def predict_from_symptoms(model, encoder_data, user_symptoms):
     """
     Predict disease from user symptoms
@@ -140,29 +337,14 @@ def predict_from_symptoms(model, encoder_data, user_symptoms):
         Predicted disease name
     """
     try:
-        # Get all feature columns
-        feature_columns = encoder_data['columns']
+        encoder = get_encoder(encoder_data)
+        input_data = encoder.encode(user_symptoms).reshape(1, -1)
         
-        # Create input DataFrame with all zeros
-        input_data = pd.DataFrame(0, index=[0], columns=feature_columns)
-        
-        # Set user symptoms to 1
-        for symptom in user_symptoms:
-            # Try exact match first
-            if symptom in feature_columns:
-                input_data[symptom] = 1
-            else:
-                # Try case-insensitive match
-                symptom_lower = symptom.lower().strip()
-                for col in feature_columns:
-                    if col.lower().strip() == symptom_lower:
-                        input_data[col] = 1
-                        break
-        
-        # Make prediction
-        prediction = model.predict(input_data)[0]
-        probabilities = model.predict_proba(input_data)[0]
-        confidence = max(probabilities)
+        # Make prediction (predict() is argmax of predict_proba, so call it once)
+        probabilities = _predict_proba(model, input_data)[0]
+        best = int(np.argmax(probabilities))
+        prediction = model.classes_[best]
+        confidence = probabilities[best]
         
         return prediction, confidence
         
@@ -170,3 +352,25 @@ def predict_from_symptoms(model, encoder_data, user_symptoms):
         print(f"Error in prediction: {e}")
         return None, 0.0
 
+def predict_batch(model, encoder_data, symptom_lists, buffer=None):
+    """
+    Predict diseases for many symptom lists with one predict_proba call
+    
+    Args:
+        model: Trained RandomForestClassifier
+        encoder_data: Dictionary with encoder information
+        symptom_lists: List of symptom-name lists
+        buffer: Optional preallocated (n, n_features) float32 array to encode into
+        
+    Returns:
+        List of (predicted disease, confidence) tuples, in input order
+    """
+    if len(symptom_lists) == 0:
+        return []
+    encoder = get_encoder(encoder_data)
+    X = encoder.encode_batch(symptom_lists, out=buffer)
+    probabilities = _predict_proba(model, X)
+    best = probabilities.argmax(axis=1)
+    confidences = probabilities[np.arange(len(best)), best]
+    predictions = model.classes_[best]
+    return list(zip(predictions.tolist(), confidences.tolist()))
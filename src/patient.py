@@ -1,6 +1,5 @@
-import pandas as pd
-import os
-from datetime import datetime
+import services
+from services import ServiceError
 from symptom_checker import interactive_symptom_checker
 
 def patient_menu(patient_id):
@@ -42,67 +41,126 @@ def book_appointment(patient_id):
     print("-"*50)
     
     try:
-        # Read doctors data
-        doctors_df = pd.read_csv("data/doctors.csv", encoding='utf-8')
-        
-        # Display available doctors
-        print("\nAvailable Doctors:")
-        print("-"*50)
-        for idx, doctor in doctors_df.iterrows():
-            print(f"{idx + 1}. {doctor['name']} - {doctor['specialization']}")
-            print(f"   Availability: {doctor['availability']}")
-            print(f"   Contact: {doctor['contact']}")
-        
-        # Get doctor selection
-        doctor_choice = input("\nEnter doctor number (or 'q' to cancel): ").strip()
-        if doctor_choice.lower() == 'q':
+        print("\n1. Find the earliest available slot (by specialization)")
+        print("2. Choose a doctor and time")
+        mode = input("\nEnter your choice (1/2, or 'q' to cancel): ").strip().lower()
+        if mode == 'q':
             return
-        
-        doctor_idx = int(doctor_choice) - 1
-        if 0 <= doctor_idx < len(doctors_df):
-            selected_doctor = doctors_df.iloc[doctor_idx]
-            doctor_id = selected_doctor['doctor_id']
-            
-            # Get appointment details
-            print(f"\nBooking appointment with {selected_doctor['name']}")
-            date = input("Enter appointment date (YYYY-MM-DD): ").strip()
-            time = input("Enter appointment time (HH:MM): ").strip()
-            reason = input("Enter reason for appointment: ").strip()
-            
-            # Create or append to appointments file
-            appointment_data = {
-                'appointment_id': f"APT{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                'patient_id': patient_id,
-                'doctor_id': doctor_id,
-                'doctor_name': selected_doctor['name'],
-                'specialization': selected_doctor['specialization'],
-                'date': date,
-                'time': time,
-                'reason': reason,
-                'status': 'Scheduled',
-                'diagnosis': '',
-                'prescription': ''
-            }
-            
-            appointments_file = "data/appointments.csv"
-            if os.path.exists(appointments_file):
-                appointments_df = pd.read_csv(appointments_file, encoding='utf-8')
-            else:
-                appointments_df = pd.DataFrame()
-            
-            appointments_df = pd.concat([appointments_df, pd.DataFrame([appointment_data])], ignore_index=True)
-            appointments_df.to_csv(appointments_file, index=False, encoding='utf-8')
-            
-            print(f"\n✓ Appointment booked successfully!")
-            print(f"  Appointment ID: {appointment_data['appointment_id']}")
-            print(f"  Doctor: {selected_doctor['name']}")
-            print(f"  Date: {date} at {time}")
+        if mode == '1':
+            find_and_book_slot(patient_id)
         else:
-            print("Invalid doctor selection!")
+            book_with_doctor(patient_id)
             
     except Exception as e:
         print(f"Error booking appointment: {e}")
 
+def book_with_doctor(patient_id):
+    """Pick a doctor from the full list and enter a date and time"""
+    doctors = services.list_doctors()
+    
+    # Display available doctors
+    print("\nAvailable Doctors:")
+    print("-"*50)
+    for num, doctor in enumerate(doctors, 1):
+        print(f"{num}. {doctor['name']} - {doctor['specialization']}")
+        print(f"   Availability: {doctor['availability']}")
+        print(f"   Contact: {doctor['contact']}")
+    
+    # Get doctor selection
+    doctor_choice = input("\nEnter doctor number (or 'q' to cancel): ").strip()
+    if doctor_choice.lower() == 'q':
+        return
+    
+    doctor_idx = int(doctor_choice) - 1
+    if 0 <= doctor_idx < len(doctors):
+        selected_doctor = doctors[doctor_idx]
+        
+        # Get appointment details
+        print(f"\nBooking appointment with {selected_doctor['name']}")
+        date = input("Enter appointment date (YYYY-MM-DD): ").strip()
+        time = input("Enter appointment time (HH:MM): ").strip()
+        reason = input("Enter reason for appointment: ").strip()
+        
+        confirm_booking(patient_id, selected_doctor['doctor_id'], date, time, reason)
+    else:
+        print("Invalid doctor selection!")
+
+def find_and_book_slot(patient_id):
+    """Search the earliest free slots for a specialization and book one"""
+    specializations = services.specializations()
+    print("\nSpecializations:")
+    for num, name in enumerate(specializations, 1):
+        print(f"{num}. {name}")
+    choice = input("\nEnter specialization number (or press Enter for any doctor): ").strip()
+    specialization = None
+    if choice:
+        idx = int(choice) - 1
+        if not 0 <= idx < len(specializations):
+            print("Invalid specialization selection!")
+            return
+        specialization = specializations[idx]
+    
+    date_from = input("Earliest date (YYYY-MM-DD, Enter for today): ").strip() or None
+    date_to = input("Latest date (YYYY-MM-DD, Enter for 30 days later): ").strip() or None
+    try:
+        slots = services.find_available_slots(specialization, date_from, date_to)
+    except ServiceError as e:
+        print(f"\n✗ {e}")
+        return
+    choose_slot(patient_id, slots)
+
+def choose_slot(patient_id, slots):
+    """Show free slots, let the patient pick one and book it"""
+    if not slots:
+        print("\nNo free slots found in that period.")
+        return
+    
+    print("\nEarliest available slots:")
+    print("-"*50)
+    for num, slot in enumerate(slots, 1):
+        print(f"{num}. {slot['date']} at {slot['time']} - {slot['doctor_name']} ({slot['specialization']})")
+    
+    slot_choice = input("\nEnter slot number (or 'q' to cancel): ").strip()
+    if slot_choice.lower() == 'q':
+        return
+    slot_idx = int(slot_choice) - 1
+    if not 0 <= slot_idx < len(slots):
+        print("Invalid slot selection!")
+        return
+    
+    slot = slots[slot_idx]
+    reason = input("Enter reason for appointment: ").strip()
+    confirm_booking(patient_id, slot['doctor_id'], slot['date'], slot['time'], reason)
+
+def confirm_booking(patient_id, doctor_id, date, time, reason):
+    """Book through the service layer and print the result"""
+    try:
+        appointment = services.book_appointment(patient_id, doctor_id, date, time, reason)
+    except ServiceError as e:
+        print(f"\n✗ Could not book: {e}")
+        return None
+    
+    print(f"\n✓ Appointment booked successfully!")
+    print(f"  Appointment ID: {appointment['appointment_id']}")
+    print(f"  Doctor: {appointment['doctor_name']}")
+    print(f"  Date: {appointment['date']} at {appointment['time']}")
+    return appointment
+
+def print_prediction(result):
+    """Print a services.predict_symptoms() result"""
+    print(f"\n{'='*60}")
+    print(" PREDICTION RESULT")
+    print(f"{'='*60}")
+    print(f"\nPredicted Disease: {result['predicted_disease']}")
+    print(f"Confidence Level: {result['confidence']*100:.1f}%")
+    
+    if result['precautions']:
+        print(f"\n{'='*60}")
+        print(" RECOMMENDED PRECAUTIONS")
+        print(f"{'='*60}")
+        for precaution in result['precautions']:
+            print(f"  • {precaution}")
+
 def predict_disease(patient_id):
     """Interactive AI-powered disease prediction based on symptoms"""
     print("\n" + "-"*50)
@@ -111,8 +169,11 @@ def predict_disease(patient_id):
     
     try:
         # Get patient info
-        patients_df = pd.read_csv("data/patients.csv", encoding='utf-8')
-        patient = patients_df[patients_df['patient_id'] == patient_id].iloc[0]
+        try:
+            patient = services.get_patient(patient_id)
+        except ServiceError as e:
+            print(e)
+            return
         
         print(f"\nPatient: {patient['name']}")
         print(f"Age: {patient['age']}, Gender: {patient['gender']}")
@@ -140,64 +201,36 @@ def predict_disease(patient_id):
                 print("No symptoms entered!")
                 return
             
-            # Convert to list and use basic prediction
-            symptom_list = [s.strip().replace(' ', '_') for s in symptoms_input.split(',')]
-            user_symptoms = symptom_list
-            
-            # Try to use ML model if available
             try:
-                from model_utils import load_or_train_model, predict_from_symptoms, get_disease_precautions
-                
-                model, encoder_data = load_or_train_model()
-                if model:
-                    predicted_disease, confidence = predict_from_symptoms(model, encoder_data, user_symptoms)
-                    
-                    if predicted_disease:
-                        print(f"\n{'='*60}")
-                        print(" PREDICTION RESULT")
-                        print(f"{'='*60}")
-                        print(f"\nPredicted Disease: {predicted_disease}")
-                        print(f"Confidence Level: {confidence*100:.1f}%")
-                        
-                        # Get precautions
-                        precautions_df = get_disease_precautions()
-                        if not precautions_df.empty and 'Disease' in precautions_df.columns:
-                            disease_precautions = precautions_df[precautions_df['Disease'] == predicted_disease]
-                            if not disease_precautions.empty:
-                                print(f"\n{'='*60}")
-                                print(" RECOMMENDED PRECAUTIONS")
-                                print(f"{'='*60}")
-                                prec_row = disease_precautions.iloc[0]
-                                prec_cols = [col for col in precautions_df.columns if 'Precaution' in col]
-                                for col in prec_cols:
-                                    if pd.notna(prec_row[col]):
-                                        print(f"  • {prec_row[col]}")
-            except Exception as e:
+                result = services.predict_symptoms(symptoms_input)
+            except ServiceError as e:
+                if e.status != 503:
+                    print(f"\n{e} Please try again with different wording.")
+                    return
+                # No model: keep the raw entries so the visit is still recorded
                 print(f"\n⚠ Model prediction unavailable: {e}")
                 print("Showing basic suggestions...")
                 predicted_disease = "Consultation Recommended"
+                user_symptoms = [s.strip().replace(' ', '_') for s in symptoms_input.split(',') if s.strip()]
+            else:
+                # Show how misspellings and everyday phrasing were interpreted
+                for match in result['matches']:
+                    if match['score'] < 1.0 or match['input'].replace(' ', '_') != match['symptom']:
+                        print(f"  Interpreted '{match['input']}' as: {match['symptom'].replace('_', ' ').title()}")
+                if result['unresolved']:
+                    print(f"  ⚠ Could not recognize: {', '.join(result['unresolved'])}")
+                for entry in result['ambiguous']:
+                    candidates = ', '.join(c.replace('_', ' ').title() for c in entry['candidates'])
+                    print(f"  ⚠ '{entry['input']}' is ambiguous (could be: {candidates}) - not used")
+                
+                predicted_disease = result['predicted_disease']
+                user_symptoms = result['symptoms']
+                if predicted_disease:
+                    print_prediction(result)
         
         # Save prediction record
         if predicted_disease or user_symptoms:
-            prediction_file = "data/disease_predictions.csv"
-            symptoms_str = ', '.join(user_symptoms) if user_symptoms else 'Not specified'
-            
-            prediction_data = {
-                'prediction_id': f"PRED{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                'patient_id': patient_id,
-                'symptoms': symptoms_str,
-                'predicted_disease': predicted_disease if predicted_disease else 'Not predicted',
-                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            if os.path.exists(prediction_file):
-                pred_df = pd.read_csv(prediction_file, encoding='utf-8')
-            else:
-                pred_df = pd.DataFrame()
-            
-            pred_df = pd.concat([pred_df, pd.DataFrame([prediction_data])], ignore_index=True)
-            pred_df.to_csv(prediction_file, index=False, encoding='utf-8')
-            
+            services.save_prediction(patient_id, user_symptoms, predicted_disease)
             print(f"\n✓ Prediction saved to your medical records.")
         
         print(f"\n{'='*60}")
@@ -206,9 +239,24 @@ def predict_disease(patient_id):
         print("Always consult with a qualified healthcare professional.")
         print(f"{'='*60}\n")
         
+        if predicted_disease:
+            offer_specialist_booking(patient_id, predicted_disease, patient.get('age'))
+        
     except Exception as e:
         print(f"Error in disease prediction: {e}")
 
+def offer_specialist_booking(patient_id, disease, age=None):
+    """Offer the soonest appointments with specialists suited to a predicted disease"""
+    suggestion = services.specialist_slots(disease, age)
+    if not suggestion['slots']:
+        return
+    
+    specializations = ', '.join(suggestion['specializations']) or 'any available doctor'
+    print(f"Recommended specialist: {specializations}")
+    answer = input("Would you like to book one of the soonest appointments? (yes/no): ").strip().lower()
+    if answer in ['yes', 'y']:
+        choose_slot(patient_id, suggestion['slots'])
+
 def view_appointment_history(patient_id):
     """Display patient's appointment history"""
     print("\n" + "-"*50)
@@ -216,30 +264,24 @@ def view_appointment_history(patient_id):
     print("-"*50)
     
     try:
-        appointments_file = "data/appointments.csv"
-        if not os.path.exists(appointments_file):
-            print("No appointments found.")
-            return
-        
-        appointments_df = pd.read_csv(appointments_file, encoding='utf-8')
-        patient_appointments = appointments_df[appointments_df['patient_id'] == patient_id]
+        appointments = services.appointment_history(patient_id)
         
-        if patient_appointments.empty:
+        if not appointments:
             print("No appointment history found.")
             return
         
-        print(f"\nTotal Appointments: {len(patient_appointments)}")
+        print(f"\nTotal Appointments: {len(appointments)}")
         print("-"*50)
         
-        for idx, appointment in patient_appointments.iterrows():
-            print(f"\nAppointment {idx + 1}:")
+        for num, appointment in enumerate(appointments, 1):
+            print(f"\nAppointment {num}:")
             print(f"  ID: {appointment['appointment_id']}")
-            print(f"  Doctor: {appointment.get('doctor_name', 'N/A')}")
-            print(f"  Specialization: {appointment.get('specialization', 'N/A')}")
+            print(f"  Doctor: {appointment.get('doctor_name') or 'N/A'}")
+            print(f"  Specialization: {appointment.get('specialization') or 'N/A'}")
             print(f"  Date: {appointment['date']}")
             print(f"  Time: {appointment['time']}")
-            print(f"  Reason: {appointment.get('reason', 'N/A')}")
-            print(f"  Status: {appointment.get('status', 'N/A')}")
+            print(f"  Reason: {appointment.get('reason') or 'N/A'}")
+            print(f"  Status: {appointment.get('status') or 'N/A'}")
             if appointment.get('diagnosis'):
                 print(f"  Diagnosis: {appointment['diagnosis']}")
             if appointment.get('prescription'):
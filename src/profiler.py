@@ -0,0 +1,294 @@
+"""
+Streaming data profiler
+
+Profiles every table in bounded memory: each table is read in chunks
+(snapshot.read_chunks: the columnar snapshot when fresh, else the table) and
+folded into mergeable running statistics per column:
+
+- count of values and nulls
+- mean and variance for numeric columns (Welford/Chan: per-chunk moments
+  merged into running ones, numerically stable and order independent)
+- min and max
+- approximate distinct count (HyperLogLog, ~1% error)
+- top-k most frequent values (space-bounded counters, exact unless a
+  column has more distinct values than the counter capacity)
+
+Because every statistic merges, chunks are profiled in parallel on a process
+pool and the partial profiles combined. Password columns are never profiled.
+
+Usage:
+    python src/profiler.py [--workers 4] [--chunksize 500000]
+"""
+import argparse
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from storage import TABLES, CHUNK_ROWS, get_repository
+from snapshot import read_chunks
+from sketches import HyperLogLog
+
+# Tables in report order, with their report titles
+PROFILE_TABLES = {
+    'doctors': 'DOCTORS DATASET',
+    'patients': 'PATIENTS DATASET',
+    'admins': 'ADMINS DATASET',
+    'appointments': 'APPOINTMENTS DATASET',
+    'predictions': 'DISEASE PREDICTIONS DATASET',
+}
+
+SKIP_COLUMNS = {'password'}
+
+TOP_K = 5
+# Frequent-value counters kept per column
+TOP_CAPACITY = 200
+
+
+class ColumnProfile:
+    """Mergeable running statistics for one column"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        # Numeric values: count, mean, sum of squared deviations
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.num_min = None
+        self.num_max = None
+        self.text_min = None
+        self.text_max = None
+        self.sketch = HyperLogLog()
+        self.counts = {}
+
+    def update(self, series):
+        """Fold one chunk of the column in"""
+        # One hash pass gives the distinct values: min/max, HyperLogLog and
+        # frequent values are all computed on those rather than every row
+        counts = series.value_counts(sort=False)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Categoricals also count the categories absent from this chunk
+            counts = counts[counts > 0]
+        present = int(counts.sum())
+        self.nulls += len(series) - present
+        if not present:
+            return
+        self.count += present
+        uniques = counts.index
+
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            numbers = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            numbers = numbers[~np.isnan(numbers)]
+            mean = numbers.mean()
+            self._merge_moments(len(numbers), mean, float(((numbers - mean) ** 2).sum()))
+            self.num_min = _min(self.num_min, _plain(uniques.min()))
+            self.num_max = _max(self.num_max, _plain(uniques.max()))
+            # Hash as float64 so 3 and 3.0 (a chunk with NaNs) are one value
+            hashes = pd.util.hash_array(uniques.to_numpy(dtype=np.float64))
+        else:
+            text = uniques.astype(str)
+            self.text_min = _min(self.text_min, text.min())
+            self.text_max = _max(self.text_max, text.max())
+            hashes = pd.util.hash_array(text.to_numpy(dtype=object))
+
+        self.sketch.add_hashes(hashes)
+
+        frequent = counts.nlargest(TOP_CAPACITY)
+        self._merge_counts({_plain(value): int(count) for value, count in frequent.items()})
+
+    def merge(self, other):
+        """Combine with a profile of the same column from other chunks"""
+        self.count += other.count
+        self.nulls += other.nulls
+        self._merge_moments(other.n, other.mean, other.m2)
+        self.num_min = _min(self.num_min, other.num_min)
+        self.num_max = _max(self.num_max, other.num_max)
+        self.text_min = _min(self.text_min, other.text_min)
+        self.text_max = _max(self.text_max, other.text_max)
+        self.sketch.merge(other.sketch)
+        self._merge_counts(other.counts)
+
+    def _merge_moments(self, n, mean, m2):
+        if not n:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def _merge_counts(self, counts):
+        for value, count in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > TOP_CAPACITY:
+            kept = sorted(self.counts.items(), key=lambda item: -item[1])[:TOP_CAPACITY]
+            self.counts = dict(kept)
+
+    @property
+    def numeric(self):
+        """True if every value seen was a number"""
+        return self.n > 0 and self.n == self.count
+
+    @property
+    def std(self):
+        """Sample standard deviation of the numeric values"""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float('nan')
+
+    def distinct(self):
+        """HyperLogLog estimate of the number of distinct values"""
+        return min(self.sketch.estimate(), self.count)
+
+    def top(self, k=TOP_K):
+        """[(value, count)] of the k most frequent values"""
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:k]
+
+
+class TableProfile:
+    """Row count and column profiles of one table"""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for column in chunk.columns:
+            if column not in self.columns:
+                self.columns[column] = ColumnProfile(column) if column not in SKIP_COLUMNS else None
+            if self.columns[column] is not None:
+                self.columns[column].update(chunk[column])
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column, profile in other.columns.items():
+            if column not in self.columns:
+                self.columns[column] = profile
+            elif profile is not None:
+                self.columns[column].merge(profile)
+
+
+def profile_chunk(table, chunk):
+    """Profile of a single chunk"""
+    profile = TableProfile(table)
+    profile.update(chunk)
+    return profile
+
+
+def profile_table(table, chunksize=CHUNK_ROWS):
+    """Profile one table chunk by chunk in this process; None if it has no data"""
+    repo = get_repository(table)
+    if not repo.exists():
+        return None
+    profile = TableProfile(table)
+    for chunk in read_chunks(table, chunksize=chunksize):
+        profile.update(chunk)
+    return profile
+
+
+def profile_tables(tables=tuple(PROFILE_TABLES), workers=None, chunksize=CHUNK_ROWS):
+    """
+    Profile tables on a process pool; {table: TableProfile or None}
+
+    Chunks are read here and profiled by the workers, a bounded number in
+    flight at a time, and the partial profiles merged as they complete, so
+    a single large table is spread over every worker too.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return {table: profile_table(table, chunksize) for table in tables}
+
+    profiles = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def collect(future):
+            partial = future.result()
+            profiles[partial.table].merge(partial)
+
+        for table in tables:
+            repo = get_repository(table)
+            if not repo.exists():
+                profiles[table] = None
+                continue
+            profiles[table] = TableProfile(table)
+            for chunk in read_chunks(table, chunksize=chunksize):
+                pending.append(pool.submit(profile_chunk, table, chunk))
+                while len(pending) > 2 * workers:
+                    collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+    return profiles
+
+
+def render_profile(profiles):
+    """Data profile report text"""
+    profile = f"\n{'='*70}\n"
+    profile += f" DATA PROFILE REPORT\n"
+    profile += f" Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+    profile += f"{'='*70}\n\n"
+
+    for table, table_profile in profiles.items():
+        profile += f"{PROFILE_TABLES.get(table, table.upper())}\n"
+        profile += f"{'-'*70}\n"
+        if table_profile is None:
+            profile += f"No {table} records yet.\n\n"
+            continue
+        columns = list(table_profile.columns) or TABLES[table]['columns']
+        profile += f"Total Records: {table_profile.rows}\n"
+        profile += f"Columns: {', '.join(columns)}\n"
+
+        for column in columns:
+            stats = table_profile.columns.get(column)
+            if stats is None:
+                continue
+            profile += f"\n  {column}: {stats.count} values, {stats.nulls} missing, ~{stats.distinct()} distinct\n"
+            if stats.numeric:
+                profile += (f"    mean {stats.mean:.2f}, std {stats.std:.2f}, "
+                            f"min {stats.num_min}, max {stats.num_max}\n")
+            elif stats.count:
+                low = stats.text_min if stats.num_min is None else min(str(stats.num_min), stats.text_min)
+                high = stats.text_max if stats.num_max is None else max(str(stats.num_max), stats.text_max)
+                profile += f"    min {low}, max {high}\n"
+            if stats.count:
+                top = ', '.join(f"{value} ({count})" for value, count in stats.top())
+                profile += f"    top: {top}\n"
+        profile += "\n"
+    return profile
+
+
+def _plain(value):
+    """NumPy scalar -> Python value"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the Medicore tables in bounded memory")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help="rows read at a time")
+    args = parser.parse_args()
+    print(render_profile(profile_tables(workers=args.workers, chunksize=args.chunksize)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Hospital report aggregation
+
+compute_stats() reads each dataset once, streaming it in chunks with only the
+columns the reports need (from the columnar snapshot when it is fresh), and
+folds every chunk into a single groupby: appointments by (doctor_id,
+specialization, status, date) plus the set of distinct patient IDs, patients
+by gender plus running age statistics, and predictions by disease and day.
+Every report metric (counts by status, by doctor, by specialization, by day,
+unique patients, demographics) is derived from those small aggregates, so report
+generation is linear in the number of rows with memory bounded by the chunk
+size and the number of distinct keys (and patients).
+
+The stats are plain JSON-ready dicts (the shape aggregates.py keeps
+materialized); the render_* functions turn them into the text reports
+written by admin.generate_reports().
+"""
+from datetime import datetime
+
+import pandas as pd
+
+from storage import get_repository, frame_records
+from snapshot import read_chunks
+from sketches import HyperLogLog
+
+UNKNOWN = 'Unknown'
+
+APPOINTMENT_KEYS = ['doctor_id', 'specialization', 'status', 'date']
+
+
+def appointment_stats(chunks, keep_patient_sketch=False):
+    """
+    Aggregate appointment chunks in one pass
+
+    Returns:
+        {'total', 'by_status', 'by_doctor': {doctor_id: {'total', 'by_status'}},
+         'by_specialization', 'by_day', 'unique_patients'}, plus the
+        'patient_sketch' (HyperLogLog.dumps() of the patient IDs) if
+        keep_patient_sketch. unique_patients is an exact count here;
+        'unique_patients_exact' turns False once the sidecar advances it
+        from the sketch (aggregates.record_appointment).
+    """
+    partials = []
+    patients = set()
+    for chunk in chunks:
+        partials.append(_group_sizes(_keys(chunk, APPOINTMENT_KEYS)))
+        patients.update(chunk['patient_id'].dropna().astype(str).unique().tolist())
+
+    if partials:
+        counts = pd.concat(partials).groupby(level=APPOINTMENT_KEYS, sort=False).sum()
+    else:
+        counts = pd.Series(dtype='int64', index=pd.MultiIndex.from_tuples([], names=APPOINTMENT_KEYS))
+
+    by_doctor = {}
+    for (doctor_id, status), count in counts.groupby(level=['doctor_id', 'status'], sort=False).sum().items():
+        doctor = by_doctor.setdefault(doctor_id, {'total': 0, 'by_status': {}})
+        doctor['total'] += int(count)
+        doctor['by_status'][status] = int(count)
+
+    stats = {
+        'total': int(counts.sum()),
+        'by_status': _count_dict(counts.groupby(level='status').sum()),
+        'by_doctor': by_doctor,
+        'by_specialization': _count_dict(counts.groupby(level='specialization').sum()),
+        'by_day': {day: int(count) for day, count in counts.groupby(level='date').sum().sort_index().items()},
+        'unique_patients': len(patients),
+        'unique_patients_exact': True,
+    }
+    if keep_patient_sketch:
+        sketch = HyperLogLog()
+        sketch.add(list(patients))
+        stats['patient_sketch'] = sketch.dumps()
+    return stats
+
+
+def patient_stats(chunks):
+    """
+    Aggregate patient chunks in one pass
+
+    Returns:
+        {'total', 'by_gender', 'age': {'count', 'sum', 'min', 'max'}}
+    """
+    total = 0
+    genders = []
+    age = {'count': 0, 'sum': 0.0, 'min': None, 'max': None}
+    for chunk in chunks:
+        total += len(chunk)
+        genders.append(_group_sizes(_keys(chunk.dropna(subset=['gender']), ['gender'])))
+        ages = pd.to_numeric(chunk['age'], errors='coerce').dropna()
+        if not ages.empty:
+            age['count'] += int(ages.size)
+            age['sum'] += float(ages.sum())
+            age['min'] = _plain(ages.min()) if age['min'] is None else min(age['min'], _plain(ages.min()))
+            age['max'] = _plain(ages.max()) if age['max'] is None else max(age['max'], _plain(ages.max()))
+
+    by_gender = pd.concat(genders).groupby(level=0).sum() if genders else pd.Series(dtype='int64')
+    return {'total': total, 'by_gender': _count_dict(by_gender), 'age': age}
+
+
+def prediction_stats(chunks):
+    """
+    Aggregate disease prediction chunks in one pass
+
+    Returns:
+        {'total', 'by_disease', 'by_day'}
+    """
+    partials = []
+    for chunk in chunks:
+        keys = _keys(chunk, ['predicted_disease', 'date'])
+        keys['date'] = keys['date'].astype(str).str[:10]
+        partials.append(_group_sizes(keys))
+
+    if not partials:
+        return {'total': 0, 'by_disease': {}, 'by_day': {}}
+    counts = pd.concat(partials)
+    return {
+        'total': int(counts.sum()),
+        'by_disease': _count_dict(counts.groupby(level='predicted_disease').sum()),
+        'by_day': {day: int(count) for day, count in counts.groupby(level='date').sum().sort_index().items()},
+    }
+
+
+def compute_stats(appointments=True, doctors=True, patients=True, predictions=False,
+                  keep_patient_sketch=False):
+    """
+    Statistics for the selected datasets, each read once
+
+    Returns:
+        {'appointments': appointment_stats() or None if there is no data,
+         'doctors': [{'doctor_id', 'name', 'specialization'}],
+         'patients': patient_stats(),
+         'predictions': prediction_stats()}
+    """
+    stats = {}
+    if appointments:
+        appointments_repo = get_repository('appointments')
+        stats['appointments'] = (appointment_stats(read_chunks('appointments', ['patient_id'] + APPOINTMENT_KEYS),
+                                                   keep_patient_sketch)
+                                 if appointments_repo.exists() else None)
+    if doctors:
+        doctors_repo = get_repository('doctors')
+        stats['doctors'] = ([doctor for chunk in read_chunks('doctors', ['doctor_id', 'name', 'specialization'])
+                             for doctor in frame_records(chunk)]
+                            if doctors_repo.exists() else [])
+    if patients:
+        stats['patients'] = patient_stats(read_chunks('patients', ['gender', 'age']))
+    if predictions:
+        stats['predictions'] = prediction_stats(read_chunks('predictions', ['predicted_disease', 'date']))
+    return stats
+
+
+def _keys(chunk, columns):
+    """Key columns with missing values as UNKNOWN; categorical columns stay categorical"""
+    keys = {}
+    for column in columns:
+        values = chunk[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            if UNKNOWN not in values.cat.categories:
+                values = values.cat.add_categories([UNKNOWN])
+            keys[column] = values.fillna(UNKNOWN)
+        else:
+            keys[column] = values.fillna(UNKNOWN).astype(str)
+    return pd.DataFrame(keys)
+
+
+def _group_sizes(keys):
+    """Row counts per distinct key combination, indexed by plain strings"""
+    columns = list(keys.columns)
+    sizes = keys.groupby(columns, sort=False, observed=True).size()
+    # Plain string labels, so partials from chunks with different categories combine
+    labels = [key if isinstance(key, tuple) else (key,) for key in sizes.index]
+    sizes.index = pd.MultiIndex.from_tuples([tuple(str(part) for part in key) for key in labels], names=columns)
+    return sizes
+
+
+def _count_dict(counts):
+    """Counts as {key: int}, largest first"""
+    return {key: int(count) for key, count in counts.sort_values(ascending=False, kind='stable').items()}
+
+
+def _largest_first(counts):
+    """(key, count) pairs of a count dict, largest first"""
+    return sorted(counts.items(), key=lambda item: -item[1])
+
+
+def _plain(value):
+    """NumPy scalar -> int if integral, else float"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _header(title):
+    report = f"\n{'='*60}\n"
+    report += f" {title}\n"
+    report += f" Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+    report += f"{'='*60}\n\n"
+    return report
+
+
+def render_appointment_summary(appointments):
+    """Appointment Summary report text"""
+    by_status = appointments['by_status']
+    report = _header("APPOINTMENT SUMMARY REPORT")
+    report += f"Total Appointments: {appointments['total']}\n"
+    report += f"Scheduled: {by_status.get('Scheduled', 0)}\n"
+    report += f"Completed: {by_status.get('Completed', 0)}\n\n"
+
+    if appointments['total']:
+        report += f"Appointments by Doctor:\n"
+        report += f"{'-'*60}\n"
+        by_doctor = sorted(appointments['by_doctor'].items(), key=lambda item: -item[1]['total'])
+        for doctor_id, doctor in by_doctor:
+            report += f"{doctor_id}: {doctor['total']} appointments\n"
+
+        report += f"\nAppointments by Specialization:\n"
+        report += f"{'-'*60}\n"
+        for specialization, count in _largest_first(appointments['by_specialization']):
+            report += f"{specialization}: {count} appointments\n"
+    return report
+
+
+def render_doctor_performance(doctors, appointments):
+    """Doctor Performance report text"""
+    report = _header("DOCTOR PERFORMANCE REPORT")
+    if appointments is None:
+        return report + "No appointment data available.\n"
+
+    for doctor in doctors:
+        counts = appointments['by_doctor'].get(str(doctor['doctor_id']), {'total': 0, 'by_status': {}})
+        report += f"Doctor: {doctor['name']}\n"
+        report += f"  Specialization: {doctor['specialization']}\n"
+        report += f"  Total Appointments: {counts['total']}\n"
+        report += f"  Completed: {counts['by_status'].get('Completed', 0)}\n"
+        report += f"{'-'*60}\n"
+    return report
+
+
+def render_patient_statistics(patients, appointments):
+    """Patient Statistics report text"""
+    age = patients['age']
+    report = _header("PATIENT STATISTICS REPORT")
+    report += f"Total Patients: {patients['total']}\n"
+    report += f"Gender Distribution:\n"
+    for gender, count in _largest_first(patients['by_gender']):
+        report += f"  {gender}: {count}\n"
+
+    report += f"\nAge Statistics:\n"
+    report += f"  Average Age: {age['sum'] / age['count'] if age['count'] else float('nan'):.1f}\n"
+    report += f"  Min Age: {age['min']}\n"
+    report += f"  Max Age: {age['max']}\n"
+
+    if appointments is not None:
+        approximate = '' if appointments['unique_patients_exact'] else ' (approximate)'
+        report += f"\nPatients with Appointments: {appointments['unique_patients']}{approximate}\n"
+    return report
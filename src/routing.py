@@ -0,0 +1,184 @@
+"""
+Predicted disease -> specialist routing
+
+DISEASE_SPECIALTIES lists, for every disease in DiseaseAndSymptoms.csv, the
+specialties that usually treat it, most appropriate first. SpecialistRouter
+resolves that table against the specializations doctors.csv actually has,
+precomputing disease -> [available specializations]. When none of a
+disease's specialties is on staff it falls back to a general physician, and
+failing that to any doctor. The resolved table is rebuilt only when the
+doctors table changes.
+
+Doctor lookups use the scheduler's in-memory specialization -> doctors index,
+so routing a prediction to the soonest free appointments never rescans
+doctors.csv.
+"""
+import threading
+
+from model_utils import normalize_disease
+from scheduling import get_scheduler
+
+DISEASE_SPECIALTIES = {
+    '(vertigo) Paroymsal  Positional Vertigo': ['ENT Specialist', 'Neurologist'],
+    'AIDS': ['Infectious Disease Specialist', 'General Physician'],
+    'Acne': ['Dermatologist'],
+    'Alcoholic hepatitis': ['Hepatologist', 'Gastroenterologist'],
+    'Allergy': ['Allergist', 'Dermatologist'],
+    'Arthritis': ['Rheumatologist', 'Orthopedic'],
+    'Bronchial Asthma': ['Pulmonologist'],
+    'Cervical spondylosis': ['Orthopedic', 'Neurologist'],
+    'Chicken pox': ['General Physician', 'Dermatologist'],
+    'Chronic cholestasis': ['Hepatologist', 'Gastroenterologist'],
+    'Common Cold': ['General Physician', 'ENT Specialist'],
+    'Dengue': ['General Physician', 'Infectious Disease Specialist'],
+    'Diabetes': ['Endocrinologist'],
+    'Dimorphic hemmorhoids(piles)': ['Proctologist', 'General Surgeon', 'Gastroenterologist'],
+    'Drug Reaction': ['Dermatologist', 'Allergist'],
+    'Fungal infection': ['Dermatologist'],
+    'GERD': ['Gastroenterologist'],
+    'Gastroenteritis': ['Gastroenterologist'],
+    'Heart attack': ['Cardiologist'],
+    'hepatitis A': ['Hepatologist', 'Gastroenterologist'],
+    'Hepatitis B': ['Hepatologist', 'Gastroenterologist'],
+    'Hepatitis C': ['Hepatologist', 'Gastroenterologist'],
+    'Hepatitis D': ['Hepatologist', 'Gastroenterologist'],
+    'Hepatitis E': ['Hepatologist', 'Gastroenterologist'],
+    'Hypertension': ['Cardiologist'],
+    'Hyperthyroidism': ['Endocrinologist'],
+    'Hypoglycemia': ['Endocrinologist'],
+    'Hypothyroidism': ['Endocrinologist'],
+    'Impetigo': ['Dermatologist'],
+    'Jaundice': ['Hepatologist', 'Gastroenterologist'],
+    'Malaria': ['General Physician', 'Infectious Disease Specialist'],
+    'Migraine': ['Neurologist'],
+    'Osteoarthristis': ['Orthopedic', 'Rheumatologist'],
+    'Paralysis (brain hemorrhage)': ['Neurologist', 'Neurosurgeon'],
+    'Peptic ulcer diseae': ['Gastroenterologist'],
+    'Pneumonia': ['Pulmonologist'],
+    'Psoriasis': ['Dermatologist'],
+    'Tuberculosis': ['Pulmonologist', 'Infectious Disease Specialist'],
+    'Typhoid': ['General Physician', 'Infectious Disease Specialist'],
+    'Urinary tract infection': ['Urologist'],
+    'Varicose veins': ['Vascular Surgeon', 'Cardiologist'],
+}
+
+# Tried after a disease's own specialties
+GENERAL_SPECIALTIES = ['General Physician']
+
+# Patients younger than this see a pediatrician first, if there is one
+PEDIATRIC_AGE = 18
+PEDIATRICS = 'Pediatrician'
+
+# Spellings that name the same specialty
+SPECIALTY_ALIASES = {
+    'orthopaedic': 'orthopedic',
+    'orthopedist': 'orthopedic',
+    'orthopedic surgeon': 'orthopedic',
+    'ent': 'ent specialist',
+    'otolaryngologist': 'ent specialist',
+    'general practitioner': 'general physician',
+    'gp': 'general physician',
+    'family medicine': 'general physician',
+    'internal medicine': 'general physician',
+    'paediatrician': 'pediatrician',
+}
+
+
+def specialty_key(name):
+    """Canonical specialty key: lowercase, aliases folded together"""
+    key = ' '.join(str(name or '').split()).lower()
+    return SPECIALTY_ALIASES.get(key, key)
+
+
+class SpecialistRouter:
+    """Disease -> on-staff specializations, resolved once per doctors table version"""
+
+    def __init__(self, scheduler, table=DISEASE_SPECIALTIES):
+        self.scheduler = scheduler
+        self.table = {normalize_disease(disease): specialties for disease, specialties in table.items()}
+        self.routes = {}
+        self.fallback = []
+        self.staffed = {}
+        self._version = object()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Re-resolve the routing table if the doctors table changed"""
+        version = self.scheduler.doctors.version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self.scheduler.refresh()
+            # Specialty key -> specialization names as written in doctors.csv
+            staffed = {}
+            for doctor in self.scheduler.doctor_records.values():
+                name = doctor.get('specialization')
+                if name:
+                    names = staffed.setdefault(specialty_key(name), [])
+                    if name not in names:
+                        names.append(name)
+
+            def resolve(specialties):
+                found = []
+                for specialty in specialties:
+                    for name in staffed.get(specialty_key(specialty), []):
+                        if name not in found:
+                            found.append(name)
+                return found
+
+            self.fallback = resolve(GENERAL_SPECIALTIES)
+            self.routes = {disease: resolve(specialties) or self.fallback
+                           for disease, specialties in self.table.items()}
+            self.staffed = staffed
+            self._version = version
+
+    def specializations_for(self, disease, age=None):
+        """
+        Specializations (as named in doctors.csv) to see for a disease
+
+        An empty list means no suitable specialist is on staff and any
+        doctor may be booked.
+        """
+        self.refresh()
+        specializations = list(self.routes.get(normalize_disease(disease), self.fallback))
+        if age is not None and _is_child(age):
+            pediatrics = self.staffed.get(specialty_key(PEDIATRICS), [])
+            specializations = pediatrics + [s for s in specializations if s not in pediatrics]
+        return specializations
+
+    def doctors_for(self, disease, age=None):
+        """Doctor IDs for a disease, via the scheduler's specialization index"""
+        specializations = self.specializations_for(disease, age)
+        if not specializations:
+            return self.scheduler.doctors_for(None)
+        doctor_ids = []
+        for specialization in specializations:
+            doctor_ids.extend(self.scheduler.doctors_for(specialization))
+        return doctor_ids
+
+    def soonest_slots(self, disease, age=None, limit=5, date_from=None, date_to=None):
+        """Earliest free appointment slots with doctors suited to a disease"""
+        return self.scheduler.find_free_slots(date_from=date_from, date_to=date_to, limit=limit,
+                                              doctor_ids=self.doctors_for(disease, age))
+
+
+def _is_child(age):
+    try:
+        return float(age) < PEDIATRIC_AGE
+    except (TypeError, ValueError):
+        return False
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return the shared SpecialistRouter"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = SpecialistRouter(get_scheduler())
+        return _router
@@ -0,0 +1,550 @@
+"""
+Appointment scheduling engine
+
+Doctor availability strings such as "Mon-Fri 10AM-4PM" are parsed into
+weekly windows (weekday, start minute, end minute). Every appointment
+occupies SLOT_MINUTES starting at its date and time; times are kept as
+absolute minutes (date ordinal * 1440 + minute of day) so comparisons are
+plain integer arithmetic.
+
+Scheduler keeps, per doctor, a sorted list of booked start minutes. Because
+all appointments have the same length, a new booking at t conflicts exactly
+when some booked start lies in (t - SLOT_MINUTES, t + SLOT_MINUTES), which
+is a single bisect: O(log n) per check.
+
+The index is kept up to date rather than rebuilt: bookings and status
+changes made through the Scheduler insert or remove their single start,
+and rows other processes append are read from where the last sync stopped
+(Repository.appended_since: byte offset for CSV, rowid for SQLite). Only
+a rewrite from elsewhere forces a full re-read. Doctor records and
+availability are re-read on their own when the doctors table changes,
+keeping the booked lists.
+
+Booking is atomic across threads and processes: the check, ID generation
+and insert (and status updates) all happen while holding an exclusive lock file (booking.lock in
+the data directory), and the index is re-synced with the table inside the
+lock before checking. Appointment IDs carry microseconds and are checked
+against every existing ID under the same lock, so two bookings in the same
+second no longer collide.
+
+Free-slot search (Scheduler.find_free_slots) walks each matching doctor's
+availability grid day by day with a moving pointer into the booked list, as
+a lazy ascending generator, and heapq.merge combines the doctors' generators.
+Only as many slots as requested are ever produced, so the cost is roughly
+O(doctors log doctors + limit log doctors) however long the date range is.
+"""
+import heapq
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from datetime import date as Date, datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from storage import DATA_DIR, file_lock, get_repository
+
+SLOT_MINUTES = 30
+MINUTES_PER_DAY = 24 * 60
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Appointment statuses that no longer hold their time slot
+RELEASED_STATUSES = {'Cancelled'}
+
+_TIME = r'(\d{1,2})(?::(\d{2}))?\s*([AaPp][Mm])?'
+_TIME_RANGE = re.compile(_TIME + r'\s*(?:-|–|to)\s*' + _TIME)
+_DAY = r'(mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?'
+_DAY_RANGE = re.compile(_DAY + r'\s*(?:-|–|to)\s*' + _DAY)
+_DAY_NAME = re.compile(_DAY)
+
+
+class SchedulingError(ValueError):
+    """Requested time can't be booked (invalid, outside availability, in the past)"""
+
+
+class SlotConflict(SchedulingError):
+    """Requested time overlaps an existing appointment"""
+
+
+def _minute_of_day(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Invalid hour: {hour}")
+        hour = hour % 12 + (12 if meridiem.lower() == 'pm' else 0)
+    if not (0 <= hour <= 24 and 0 <= minute < 60) or (hour == 24 and minute):
+        raise ValueError(f"Invalid time: {hour}:{minute:02d}")
+    return hour * 60 + minute
+
+
+def _parse_days(text):
+    text = text.strip().lower()
+    if text in ('', 'daily', 'everyday', 'every day', 'all week'):
+        return list(range(7))
+    days = []
+    for part in re.split(r'[,&/]|\band\b', text):
+        part = part.strip()
+        if not part:
+            continue
+        match = _DAY_RANGE.fullmatch(part)
+        if match:
+            first, last = WEEKDAYS.index(match.group(1)), WEEKDAYS.index(match.group(2))
+            # Ranges may wrap around the week, e.g. "Sat-Mon"
+            days.extend((first + i) % 7 for i in range((last - first) % 7 + 1))
+            continue
+        match = _DAY_NAME.fullmatch(part)
+        if not match:
+            raise ValueError(f"Unrecognized days: {part!r}")
+        days.append(WEEKDAYS.index(match.group(1)))
+    return sorted(set(days))
+
+
+def parse_availability(text):
+    """
+    Parse an availability string into weekly windows
+
+    Accepts day ranges or lists followed by a time range, with several
+    segments separated by ';', e.g. "Mon-Fri 10AM-4PM",
+    "Mon, Wed 9:30AM-1PM; Sat 10:00-12:00", "Daily 9AM-5PM".
+
+    Returns:
+        Dict weekday (0 = Monday) -> sorted list of (start_minute, end_minute)
+
+    Raises:
+        ValueError if the string can't be understood
+    """
+    windows = {}
+    segments = [s for s in re.split(r'[;\n]+', str(text)) if s.strip()]
+    if not segments:
+        raise ValueError("Empty availability")
+    for segment in segments:
+        match = _TIME_RANGE.search(segment)
+        if not match:
+            raise ValueError(f"No time range in availability: {segment.strip()!r}")
+        h1, m1, ap1, h2, m2, ap2 = match.groups()
+        # "10-4PM" shares the meridiem; "10AM-4" does too
+        start = _minute_of_day(h1, m1, ap1 or ap2)
+        end = _minute_of_day(h2, m2, ap2 or ap1)
+        if ap1 is None and ap2 is not None and start >= end:
+            start = _minute_of_day(h1, m1, 'am')
+        if ap1 is None and ap2 is None and end <= start < end + 12 * 60:
+            end += 12 * 60  # "9-5" means 9AM-5PM
+        if end <= start:
+            raise ValueError(f"Availability ends before it starts: {segment.strip()!r}")
+        for day in _parse_days(segment[:match.start()]):
+            windows.setdefault(day, []).append((start, end))
+    return {day: _merge_spans(spans) for day, spans in windows.items()}
+
+
+def _merge_spans(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_date(text):
+    """YYYY-MM-DD -> date"""
+    try:
+        return datetime.strptime(str(text).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        raise SchedulingError(f"Invalid date {text!r} (expected YYYY-MM-DD)")
+
+
+def parse_time(text):
+    """'14:30', '2:30PM' or '2 pm' -> minute of day"""
+    match = re.fullmatch(_TIME, str(text).strip())
+    try:
+        if not match:
+            raise ValueError
+        minute = _minute_of_day(*match.groups())
+        if minute >= MINUTES_PER_DAY:
+            raise ValueError
+        return minute
+    except ValueError:
+        raise SchedulingError(f"Invalid time {text!r} (expected HH:MM)")
+
+
+def _as_date(value):
+    return value if isinstance(value, Date) else parse_date(value)
+
+
+def to_minutes(day, minute_of_day):
+    """Absolute minute for a date and minute of day"""
+    return day.toordinal() * MINUTES_PER_DAY + minute_of_day
+
+
+def from_minutes(minutes):
+    """Absolute minute -> (date 'YYYY-MM-DD', time 'HH:MM')"""
+    ordinal, minute = divmod(minutes, MINUTES_PER_DAY)
+    return Date.fromordinal(ordinal).isoformat(), f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _start_minutes(dates, times):
+    """
+    Absolute start minutes for date/time columns (-1 where unparseable)
+
+    Bookings share few distinct dates and times, so each distinct value is
+    parsed once and the results are gathered back by factorized code.
+    """
+    date_codes, date_values = pd.factorize(dates)
+    time_codes, time_values = pd.factorize(times)
+    # The trailing -1 is picked up by the code -1 that factorize gives NaN
+    ordinals = np.array([_parsed_or_missing(parse_date, v, Date.toordinal) for v in date_values] + [-1],
+                        dtype=np.int64)
+    of_day = np.array([_parsed_or_missing(parse_time, v) for v in time_values] + [-1], dtype=np.int64)
+    days, minutes = ordinals[date_codes], of_day[time_codes]
+    return np.where((days >= 0) & (minutes >= 0), days * MINUTES_PER_DAY + minutes, -1)
+
+
+def _parsed_or_missing(parse, value, convert=None):
+    try:
+        parsed = parse(value)
+    except SchedulingError:
+        return -1
+    return convert(parsed) if convert else parsed
+
+
+def _tagged(slots, doctor_id):
+    for slot in slots:
+        yield slot, doctor_id
+
+
+def _specialization_key(name):
+    return str(name or '').strip().lower()
+
+
+class DoctorSchedule:
+    """Weekly availability and sorted booked start minutes for one doctor"""
+
+    def __init__(self, doctor_id, availability):
+        self.doctor_id = doctor_id
+        self.availability = availability
+        try:
+            self.windows = parse_availability(availability)
+        except ValueError:
+            # Unparseable availability: nothing can be booked until it's fixed
+            self.windows = {}
+        self.booked = []
+
+    def within_availability(self, start):
+        """True if [start, start + SLOT_MINUTES) lies inside a weekly window"""
+        ordinal, minute = divmod(start, MINUTES_PER_DAY)
+        weekday = Date.fromordinal(ordinal).weekday()
+        return any(lo <= minute and minute + SLOT_MINUTES <= hi
+                   for lo, hi in self.windows.get(weekday, ()))
+
+    def conflicts(self, start):
+        """True if an existing appointment overlaps [start, start + SLOT_MINUTES)"""
+        i = bisect_left(self.booked, start - SLOT_MINUTES + 1)
+        return i < len(self.booked) and self.booked[i] < start + SLOT_MINUTES
+
+    def add(self, start):
+        insort(self.booked, start)
+
+    def free_slots(self, start, end):
+        """
+        Yield free slot start minutes in [start, end), ascending
+
+        Slots are SLOT_MINUTES long and aligned to the start of each
+        availability window; a slot is free if no booking overlaps it.
+        """
+        booked = self.booked
+        i = bisect_left(booked, start - SLOT_MINUTES + 1)
+        for ordinal in range(start // MINUTES_PER_DAY, (end - 1) // MINUTES_PER_DAY + 1):
+            # date.fromordinal(1) is a Monday
+            spans = self.windows.get((ordinal - 1) % 7)
+            if not spans:
+                continue
+            base = ordinal * MINUTES_PER_DAY
+            for lo, hi in spans:
+                slot = base + lo
+                if slot < start:
+                    # Jump to the first grid slot at or after start
+                    slot += -(-(start - slot) // SLOT_MINUTES) * SLOT_MINUTES
+                last = min(base + hi - SLOT_MINUTES, end - 1)
+                if slot > last:
+                    continue
+                while slot <= last:
+                    # Skip bookings that end before this slot starts
+                    while i < len(booked) and booked[i] <= slot - SLOT_MINUTES:
+                        i += 1
+                    if i < len(booked) and booked[i] < slot + SLOT_MINUTES:
+                        slot += SLOT_MINUTES
+                        continue
+                    yield slot
+                    slot += SLOT_MINUTES
+
+
+class Scheduler:
+    """Per-doctor interval index over the appointments table, with atomic booking"""
+
+    def __init__(self, appointments_repo, doctors_repo, lock_path=None):
+        self.appointments = appointments_repo
+        self.doctors = doctors_repo
+        data_dir = getattr(appointments_repo.storage, 'data_dir', DATA_DIR)
+        self.lock_path = lock_path or os.path.join(data_dir, 'booking')
+        self.schedules = {}
+        self.doctor_records = {}
+        self.by_specialization = {}
+        # doctor_id -> sorted booked starts, shared with that doctor's schedule
+        self.booked = {}
+        self.appointment_ids = set()
+        self._doctors_version = object()
+        self._appointments_version = object()
+        self._position = None
+        self._lock = threading.RLock()
+
+    def refresh(self):
+        """Bring the doctor schedules and the booking index up to date"""
+        doctors_version, appointments_version = self.doctors.version(), self.appointments.version()
+        if (doctors_version, appointments_version) == (self._doctors_version, self._appointments_version):
+            return
+        with self._lock:
+            if doctors_version != self._doctors_version:
+                self._load_doctors()
+                self._doctors_version = doctors_version
+            if appointments_version != self._appointments_version:
+                self._sync_appointments()
+                self._appointments_version = appointments_version
+
+    def _load_doctors(self):
+        """Re-read doctor records and availability; the booked lists are kept"""
+        schedules, records, by_specialization = {}, {}, {}
+        for doctor in self.doctors.records():
+            doctor.pop('password', None)
+            doctor_id = doctor['doctor_id']
+            records[doctor_id] = doctor
+            schedules[doctor_id] = DoctorSchedule(doctor_id, doctor.get('availability'))
+            schedules[doctor_id].booked = self.booked.setdefault(doctor_id, [])
+            key = _specialization_key(doctor.get('specialization'))
+            by_specialization.setdefault(key, []).append(doctor_id)
+        self.schedules = schedules
+        self.doctor_records = records
+        self.by_specialization = by_specialization
+
+    def _sync_appointments(self):
+        """Index rows appended since the last sync, or re-read the table if it was rewritten"""
+        appended = self.appointments.appended_since(self._position) if self._position is not None else None
+        if appended is not None:
+            rows, self._position = appended
+            self._index(rows)
+            return
+        # Taken before reading: rows appended meanwhile come again next sync,
+        # and _index skips IDs it has already seen
+        self._position = self.appointments.position()
+        self.booked = {}
+        self.appointment_ids = set()
+        if self.appointments.exists():
+            self._index(self.appointments.all())
+        for doctor_id, schedule in self.schedules.items():
+            schedule.booked = self.booked.setdefault(doctor_id, [])
+
+    def _index(self, rows):
+        """Add the booked starts of appointment rows that aren't indexed yet"""
+        ids = rows['appointment_id'].astype(str).tolist()
+        # Set lookups per row: Series.isin would copy the whole ID set every sync
+        new = np.array([appointment_id not in self.appointment_ids for appointment_id in ids], dtype=bool)
+        rows = rows[new]
+        self.appointment_ids.update(ids)
+        active = rows[~rows['status'].isin(RELEASED_STATUSES)]
+        starts = _start_minutes(active['date'], active['time'])
+        doctor_codes, doctor_ids = pd.factorize(active['doctor_id'])
+        valid = starts >= 0  # legacy rows with free-form dates don't block slots
+        doctor_codes, starts = doctor_codes[valid], starts[valid]
+        order = np.lexsort((starts, doctor_codes))
+        doctor_codes, starts = doctor_codes[order], starts[order]
+        if not len(starts):
+            return
+        bounds = np.flatnonzero(np.diff(doctor_codes)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(starts)]):
+            booked = self.booked.setdefault(doctor_ids[doctor_codes[lo]], [])
+            if booked:
+                for start in starts[lo:hi].tolist():
+                    insort(booked, start)
+            else:
+                booked.extend(starts[lo:hi].tolist())
+
+    def schedule(self, doctor_id):
+        self.refresh()
+        return self.schedules.get(doctor_id)
+
+    def check(self, doctor_id, day, time, now=None):
+        """
+        Validate a requested appointment time
+
+        Returns:
+            Absolute start minute
+
+        Raises:
+            SchedulingError / SlotConflict explaining why it can't be booked
+        """
+        schedule = self.schedule(doctor_id)
+        if schedule is None:
+            raise SchedulingError(f"Doctor {doctor_id} not found!")
+        start = to_minutes(parse_date(day), parse_time(time))
+        now = now or datetime.now()
+        if start < to_minutes(now.date(), now.hour * 60 + now.minute):
+            raise SchedulingError("Cannot book an appointment in the past")
+        if not schedule.within_availability(start):
+            raise SchedulingError(f"{day} {time} is outside the doctor's availability "
+                                  f"({schedule.availability})")
+        if schedule.conflicts(start):
+            raise SlotConflict(f"{day} {time} is already booked")
+        return start
+
+    def doctors_for(self, specialization=None):
+        """Doctor IDs with a specialization (case-insensitive), or all doctors"""
+        self.refresh()
+        if specialization is None or not str(specialization).strip():
+            return list(self.schedules)
+        return list(self.by_specialization.get(_specialization_key(specialization), []))
+
+    def find_free_slots(self, specialization=None, date_from=None, date_to=None, limit=10,
+                        doctor_ids=None, now=None):
+        """
+        Earliest free slots across all doctors with a specialization
+
+        Args:
+            specialization: Match doctors by specialization (None = any doctor)
+            date_from, date_to: Inclusive date range ('YYYY-MM-DD' or date;
+                default today .. today + 30 days)
+            limit: Maximum number of slots to return
+            doctor_ids: Search only these doctors instead
+
+        Returns:
+            List of {'doctor_id', 'doctor_name', 'specialization', 'date', 'time'}
+            ordered by time (then doctor ID)
+        """
+        now = now or datetime.now()
+        first = _as_date(date_from) if date_from else now.date()
+        last = _as_date(date_to) if date_to else first + timedelta(days=30)
+        if last < first:
+            raise SchedulingError("End date is before start date")
+        start = max(to_minutes(first, 0), to_minutes(now.date(), now.hour * 60 + now.minute))
+        end = to_minutes(last + timedelta(days=1), 0)
+
+        if doctor_ids is None:
+            doctor_ids = self.doctors_for(specialization)
+        else:
+            self.refresh()
+        with self._lock:
+            streams = []
+            for doctor_id in doctor_ids:
+                schedule = self.schedules.get(doctor_id)
+                if schedule is not None and schedule.windows:
+                    streams.append(_tagged(schedule.free_slots(start, end), doctor_id))
+            slots = []
+            for slot, doctor_id in heapq.merge(*streams):
+                if len(slots) >= limit:
+                    break
+                slots.append((slot, doctor_id))
+
+        results = []
+        for slot, doctor_id in slots:
+            doctor = self.doctor_records[doctor_id]
+            day, time = from_minutes(slot)
+            results.append({
+                'doctor_id': doctor_id,
+                'doctor_name': doctor['name'],
+                'specialization': doctor['specialization'],
+                'date': day,
+                'time': time,
+            })
+        return results
+
+    def _new_id(self, now):
+        """APT + timestamp with microseconds, unique among existing IDs"""
+        while True:
+            appointment_id = f"APT{now.strftime('%Y%m%d%H%M%S%f')}"
+            if appointment_id not in self.appointment_ids:
+                return appointment_id
+            now += timedelta(microseconds=1)
+
+    def book(self, patient_id, doctor_id, day, time, reason, now=None):
+        """
+        Atomically check the slot and store a new appointment
+
+        Returns:
+            The stored appointment record
+        """
+        with file_lock(self.lock_path), self._lock:
+            # Another process may have booked since our last look
+            start = self.check(doctor_id, day, time, now)
+            doctor = self.doctor_records[doctor_id]
+            date_text, time_text = from_minutes(start)
+            appointment = {
+                'appointment_id': self._new_id(datetime.now()),
+                'patient_id': patient_id,
+                'doctor_id': doctor_id,
+                'doctor_name': doctor['name'],
+                'specialization': doctor['specialization'],
+                'date': date_text,
+                'time': time_text,
+                'reason': reason,
+                'status': 'Scheduled',
+                'diagnosis': '',
+                'prescription': ''
+            }
+            self.appointments.insert(appointment)
+            self.schedules[doctor_id].add(start)
+            self.appointment_ids.add(appointment['appointment_id'])
+            self._synced()
+        return appointment
+
+    def update(self, appointment, **changes):
+        """
+        Write changes to an appointment and apply them to the index
+
+        Args:
+            appointment: The stored record before the change
+            changes: Columns to set; a status moving into or out of
+                RELEASED_STATUSES frees or takes back its slot
+
+        Returns:
+            True if the appointment was found
+        """
+        with file_lock(self.lock_path), self._lock:
+            self.refresh()
+            if not self.appointments.update(appointment['appointment_id'], **changes):
+                return False
+            was_held = appointment.get('status') not in RELEASED_STATUSES
+            held = changes.get('status', appointment.get('status')) not in RELEASED_STATUSES
+            start = _start_minutes(pd.Series([appointment.get('date')]), pd.Series([appointment.get('time')]))[0]
+            if was_held != held and start >= 0:
+                booked = self.booked.setdefault(appointment['doctor_id'], [])
+                if held:
+                    insort(booked, int(start))
+                else:
+                    i = bisect_left(booked, start)
+                    if i < len(booked) and booked[i] == start:
+                        del booked[i]
+            self._synced()
+        return True
+
+    def _synced(self):
+        """
+        Record that the index matches the table after one of our own writes
+
+        Only called under the booking lock, which every appointment write
+        takes, so nothing else can have changed the table in between.
+        """
+        self._position = self.appointments.position()
+        self._appointments_version = self.appointments.version()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the shared Scheduler for the configured storage backend"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(get_repository('appointments'), get_repository('doctors'))
+        return _scheduler
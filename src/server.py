@@ -0,0 +1,344 @@
+"""
+Local HTTP/JSON service for Medicore
+
+A small asyncio HTTP/1.1 server (standard library only) exposing the
+operations in services.py:
+
+    POST /login                            {role, username, password} -> {token, role, user_id, expires_in}
+    POST /logout                           ends the session of the bearer token
+    GET  /appointments                     patient's appointment history
+    POST /appointments                     {doctor_id, date, time, reason} -> appointment
+    POST /appointments/<id>/diagnosis      {diagnosis, prescription} (doctor) -> appointment
+    GET  /patients?offset=&limit=          one page of the doctor's patient list
+    POST /predict                          {symptoms} (patient) -> prediction
+    GET  /slots?specialization=&from=&to=&limit=   earliest free appointment slots
+    GET  /health
+
+Authenticated endpoints take the login token as "Authorization: Bearer <token>".
+Tokens expire SESSION_TTL seconds after login (--session-ttl); expired
+sessions are dropped when next used and swept periodically on login.
+The event loop only parses requests and writes responses: storage calls and
+password checks run on a thread pool, and the model itself runs on a
+separate inference pool (threads by default, or worker processes with
+--inference-processes, each loading the memory-mapped model once), so one
+process serves many concurrent clients.
+
+Usage:
+    python src/server.py [--host 127.0.0.1] [--port 8080] [--inference-workers 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+import services
+from services import ServiceError
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+# Session lifetime in seconds, and how often expired sessions are swept
+SESSION_TTL = int(os.environ.get('MEDICORE_SESSION_TTL', 8 * 3600))
+SESSION_SWEEP_INTERVAL = 60
+
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 401: 'Unauthorized',
+           403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def _warm_inference_worker():
+    """Load the model once in each inference worker process"""
+    from model_utils import model_registry
+    model_registry.get()
+
+
+class MedicoreServer:
+    """Routes JSON requests to services.py, keeping blocking work off the event loop"""
+
+    def __init__(self, io_workers=16, inference_workers=4, inference_processes=False,
+                 session_ttl=SESSION_TTL):
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.session_ttl = session_ttl
+        self._last_sweep = time.monotonic()
+        self.io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='io')
+        if inference_processes:
+            self.inference_executor = ProcessPoolExecutor(max_workers=inference_workers,
+                                                          initializer=_warm_inference_worker)
+        else:
+            self.inference_executor = ThreadPoolExecutor(max_workers=inference_workers,
+                                                         thread_name_prefix='inference')
+        self.routes = [
+            ('POST', ('login',), self.login),
+            ('POST', ('logout',), self.logout),
+            ('GET', ('appointments',), self.list_appointments),
+            ('POST', ('appointments',), self.book_appointment),
+            ('POST', ('appointments', ':appointment_id', 'diagnosis'), self.add_diagnosis),
+            ('GET', ('patients',), self.list_patients),
+            ('POST', ('predict',), self.predict),
+            ('GET', ('slots',), self.find_slots),
+            ('GET', ('health',), self.health),
+        ]
+
+    async def run_io(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, func, *args)
+
+    async def run_inference(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.inference_executor, func, *args)
+
+    def shutdown(self):
+        self.io_executor.shutdown(wait=False)
+        self.inference_executor.shutdown(wait=False)
+
+    # Sessions
+
+    def session(self, headers, role=None):
+        """User id for the request's bearer token; the session must belong to role (if given)"""
+        session = self._session(_bearer_token(headers))
+        if session is None:
+            raise ServiceError("Login required", status=401)
+        if role is not None and session['role'] != role:
+            raise ServiceError(f"Only {role}s can do this", status=403)
+        return session['user_id']
+
+    def _session(self, token):
+        """Live session for a token, or None; an expired one is removed"""
+        now = time.monotonic()
+        with self.sessions_lock:
+            session = self.sessions.get(token)
+            if session is not None and now - session['issued'] >= self.session_ttl:
+                del self.sessions[token]
+                session = None
+        return session
+
+    def _sweep_sessions(self, now):
+        """Drop expired sessions; called with sessions_lock held"""
+        if now - self._last_sweep < SESSION_SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        expired = [token for token, session in self.sessions.items()
+                   if now - session['issued'] >= self.session_ttl]
+        for token in expired:
+            del self.sessions[token]
+
+    # Handlers: (headers, JSON body, query-string and path params) -> (status, payload)
+
+    async def login(self, headers, body, params):
+        user = await self.run_io(services.login, _field(body, 'role'),
+                                 _field(body, 'username'), _field(body, 'password'))
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self.sessions_lock:
+            self._sweep_sessions(now)
+            self.sessions[token] = dict(user, issued=now)
+        return 200, dict(user, token=token, expires_in=self.session_ttl)
+
+    async def logout(self, headers, body, params):
+        self.session(headers)
+        with self.sessions_lock:
+            self.sessions.pop(_bearer_token(headers), None)
+        return 200, {'status': 'logged out'}
+
+    async def list_appointments(self, headers, body, params):
+        patient_id = self.session(headers, 'patient')
+        return 200, await self.run_io(services.appointment_history, patient_id)
+
+    async def book_appointment(self, headers, body, params):
+        patient_id = self.session(headers, 'patient')
+        appointment = await self.run_io(services.book_appointment, patient_id,
+                                        _field(body, 'doctor_id'), _field(body, 'date'),
+                                        _field(body, 'time'), _field(body, 'reason', default=''))
+        return 201, appointment
+
+    async def add_diagnosis(self, headers, body, params):
+        doctor_id = self.session(headers, 'doctor')
+        appointment = await self.run_io(services.add_diagnosis, doctor_id, params['appointment_id'],
+                                        _field(body, 'diagnosis'), _field(body, 'prescription', default=''))
+        return 200, appointment
+
+    async def list_patients(self, headers, body, params):
+        doctor_id = self.session(headers, 'doctor')
+        return 200, await self.run_io(services.doctor_patients, doctor_id,
+                                      params.get('offset', 0), params.get('limit', 50))
+
+    async def predict(self, headers, body, params):
+        patient_id = self.session(headers, 'patient')
+        symptoms = _field(body, 'symptoms', (str, list))
+        if isinstance(symptoms, list) and not all(isinstance(symptom, str) for symptom in symptoms):
+            raise ServiceError("Invalid field: symptoms")
+        # Only the model runs on the inference pool; the patient lookup, the
+        # prediction insert and the slot search are storage work
+        patient = await self.run_io(services.get_patient, patient_id)
+        result = await self.run_inference(services.predict_symptoms, symptoms)
+        record = await self.run_io(services.save_prediction, patient_id,
+                                   result['symptoms'], result['predicted_disease'])
+        result['prediction_id'] = record['prediction_id']
+        if result['predicted_disease']:
+            result.update(await self.run_io(services.specialist_slots,
+                                            result['predicted_disease'], patient.get('age')))
+        return 200, result
+
+    async def find_slots(self, headers, body, params):
+        slots = await self.run_io(services.find_available_slots, params.get('specialization'),
+                                  params.get('from'), params.get('to'), params.get('limit', 10))
+        return 200, slots
+
+    async def health(self, headers, body, params):
+        return 200, {'status': 'ok'}
+
+    # HTTP
+
+    def route(self, method, path):
+        """(handler, {name: value} of the ':name' path segments) for a request, or raise 404/405"""
+        parts = tuple(part for part in path.split('?', 1)[0].split('/') if part)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            if len(pattern) != len(parts):
+                continue
+            if all(p.startswith(':') or p == part for p, part in zip(pattern, parts)):
+                if route_method == method:
+                    params = {p[1:]: part for p, part in zip(pattern, parts) if p.startswith(':')}
+                    return handler, params
+                allowed = True
+        if allowed:
+            raise ServiceError("Method not allowed", status=405)
+        raise ServiceError("Not found", status=404)
+
+    async def handle_request(self, method, path, headers, raw_body):
+        try:
+            handler, path_params = self.route(method, path)
+            params = {key: values[-1] for key, values in parse_qs(urlsplit(path).query).items()}
+            params.update(path_params)
+            body = {}
+            if raw_body:
+                try:
+                    payload = json.loads(raw_body)
+                except ValueError:
+                    raise ServiceError("Request body must be JSON")
+                if not isinstance(payload, dict):
+                    raise ServiceError("Request body must be a JSON object")
+                body = payload
+            return await handler(headers, body, params)
+        except ServiceError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            print(f"Error handling {method} {path}: {e}", file=sys.stderr)
+            return 500, {'error': 'Internal server error'}
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until it closes (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 413, {'error': 'Headers too large'}, keep_alive=False)
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'Malformed request line'}, keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {'error': 'Body too large'}, keep_alive=False)
+                    break
+                raw_body = await reader.readexactly(length) if length else b''
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version != 'HTTP/1.0' or connection == 'keep-alive')
+                status, payload = await self.handle_request(method.upper(), path, headers, raw_body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Medicore service listening on {addresses}")
+        async with server:
+            await server.serve_forever()
+
+
+def _bearer_token(headers):
+    auth = headers.get('authorization', '')
+    return auth[7:].strip() if auth.lower().startswith('bearer ') else ''
+
+
+def _field(body, name, types=str, default=None):
+    """Request field of the given type(s); required unless a default is given"""
+    value = body.get(name)
+    if value is None or value == '':
+        if default is None:
+            raise ServiceError(f"Missing field: {name}")
+        return default
+    if not isinstance(value, types):
+        raise ServiceError(f"Invalid field: {name}")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Medicore HTTP/JSON service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--io-workers', type=int, default=16, help="threads for storage and login")
+    parser.add_argument('--inference-workers', type=int, default=4, help="workers for disease prediction")
+    parser.add_argument('--inference-processes', action='store_true',
+                        help="run prediction in worker processes instead of threads")
+    parser.add_argument('--session-ttl', type=int, default=SESSION_TTL,
+                        help="seconds a login token stays valid")
+    args = parser.parse_args(argv)
+
+    from model_utils import model_registry
+    model_registry.warm_up()
+
+    app = MedicoreServer(args.io_workers, args.inference_workers, args.inference_processes,
+                         args.session_ttl)
+    try:
+        asyncio.run(app.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        app.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""
+Hospital operations as plain functions
+
+Each function takes plain arguments, returns plain dicts/lists (JSON-ready)
+and raises ServiceError when a request can't be carried out (bad
+credentials, unknown doctor, appointment belonging to someone else). Nothing
+here reads input() or prints: the CLI menus (patient.py, doctor.py,
+admin.py, main.py) and the HTTP service (server.py) are thin adapters over
+these functions, which can also be called directly for bulk operations,
+load tests and per-operation timing.
+"""
+import re
+import uuid
+from datetime import datetime
+
+from storage import get_repository, frame_records
+from credentials import get_credential_index, hash_password
+from scheduling import get_scheduler, SchedulingError, SlotConflict
+from routing import get_router
+import aggregates
+
+ROLES = ('patient', 'doctor', 'admin')
+
+
+class ServiceError(Exception):
+    """A request that can't be carried out; status is the matching HTTP code"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def login(role, username, password):
+    """
+    Verify credentials for a role
+
+    Returns:
+        {'role': role, 'user_id': user_id}
+    """
+    if role not in ROLES:
+        raise ServiceError(f"Unknown role: {role}")
+    if not get_repository(f"{role}s").exists():
+        raise ServiceError(f"{role}s data not found!", status=503)
+    user_id = get_credential_index(role).authenticate(username, password)
+    if user_id is None:
+        raise ServiceError("Invalid username or password!", status=401)
+    return {'role': role, 'user_id': user_id}
+
+
+def _public(record):
+    """Record without its password hash"""
+    return {key: value for key, value in record.items() if key != 'password'}
+
+
+def get_patient(patient_id):
+    """Patient record (without password)"""
+    patient = get_repository('patients').records(patient_id=patient_id)
+    if not patient:
+        raise ServiceError("Patient record not found!", status=404)
+    return _public(patient[0])
+
+
+def get_doctor(doctor_id):
+    """Doctor record (without password)"""
+    doctor = get_repository('doctors').records(doctor_id=doctor_id)
+    if not doctor:
+        raise ServiceError(f"Doctor {doctor_id} not found!", status=404)
+    return _public(doctor[0])
+
+
+def list_doctors():
+    """All doctors (without passwords), in file order"""
+    return [_public(doctor) for doctor in get_repository('doctors').records()]
+
+
+def book_appointment(patient_id, doctor_id, date, time, reason):
+    """
+    Book an appointment for a patient with a doctor
+
+    The time must fall inside the doctor's weekly availability and not
+    overlap another appointment; the check and insert are atomic
+    (scheduling.Scheduler.book).
+
+    Returns:
+        The stored appointment record
+    """
+    get_doctor(doctor_id)
+    try:
+        with aggregates.get_aggregate_store().updating('appointments') as counters:
+            appointment = get_scheduler().book(patient_id, doctor_id, date, time, reason)
+            aggregates.record_appointment(counters, appointment)
+        return appointment
+    except SlotConflict as e:
+        raise ServiceError(str(e), status=409)
+    except SchedulingError as e:
+        raise ServiceError(str(e))
+
+
+def find_available_slots(specialization=None, date_from=None, date_to=None, limit=10):
+    """
+    Earliest free appointment slots across doctors with a specialization
+
+    Dates are 'YYYY-MM-DD' and inclusive; by default the next 30 days are
+    searched. specialization=None searches every doctor.
+
+    Returns:
+        List of {'doctor_id', 'doctor_name', 'specialization', 'date', 'time'}
+    """
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = 0
+    if limit < 1:
+        raise ServiceError("limit must be a positive integer")
+    try:
+        return get_scheduler().find_free_slots(specialization, date_from, date_to, limit)
+    except SchedulingError as e:
+        raise ServiceError(str(e))
+
+
+def specializations():
+    """Distinct doctor specializations, sorted"""
+    return sorted({doctor['specialization'] for doctor in list_doctors() if doctor.get('specialization')})
+
+
+def specialist_slots(disease, age=None, limit=5):
+    """
+    Specializations suited to a disease and their soonest free slots
+
+    Returns:
+        {'specializations': [...], 'slots': [...]} where slots are as in
+        find_available_slots(); an empty specializations list means no
+        matching specialist is on staff, so slots are with any doctor
+    """
+    router = get_router()
+    return {
+        'specializations': router.specializations_for(disease, age),
+        'slots': router.soonest_slots(disease, age, limit=limit),
+    }
+
+
+def appointment_history(patient_id):
+    """All appointments of a patient, oldest first"""
+    appointments_repo = get_repository('appointments')
+    if not appointments_repo.exists():
+        return []
+    return appointments_repo.records(patient_id=patient_id)
+
+
+def doctor_patients(doctor_id, offset=0, limit=None):
+    """
+    One page of the patients with appointments for a doctor
+
+    The whole panel is built in one pass: the doctor's appointments are
+    grouped by patient (counting total and upcoming visits). Only the
+    requested page is then left-joined to its patients' records (looked up
+    by ID) and turned into dicts, so patient IDs with no patient record show
+    up as 'Unknown' rather than failing. Patients are in order of their
+    first appointment.
+
+    Returns:
+        {'total': number of patients, 'offset': offset, 'patients': [...]}
+        where each patient record (without password) has
+        'total_appointments' and an 'upcoming' list of its Scheduled
+        appointments with the doctor
+    """
+    offset, limit = _page(offset, limit)
+    appointments_repo = get_repository('appointments')
+    if not appointments_repo.exists():
+        return {'total': 0, 'offset': offset, 'patients': []}
+    appointments = appointments_repo.find(doctor_id=doctor_id)
+    if appointments.empty:
+        return {'total': 0, 'offset': offset, 'patients': []}
+
+    scheduled = appointments['status'] == 'Scheduled'
+    panel = (appointments.groupby('patient_id', sort=False).size()
+             .rename('total_appointments').reset_index())
+    total = len(panel)
+    page = panel.iloc[offset:offset + limit if limit is not None else None]
+
+    # Only the patients on this page are looked up
+    patients = get_repository('patients').find_in('patient_id', page['patient_id'])
+    # object dtype keeps ages/contacts integral when unknown patients add NaN rows
+    patients = patients.drop(columns=['password'], errors='ignore').drop_duplicates('patient_id').astype(object)
+    page = page.merge(patients, on='patient_id', how='left', validate='one_to_one')
+    page['name'] = page['name'].fillna('Unknown')
+
+    upcoming = appointments[scheduled & appointments['patient_id'].isin(page['patient_id'])]
+    upcoming_by_patient = {patient_id: frame_records(group)
+                           for patient_id, group in upcoming.groupby('patient_id', sort=False)}
+
+    page_records = []
+    for patient in frame_records(page):
+        patient['upcoming'] = upcoming_by_patient.get(patient['patient_id'], [])
+        page_records.append(patient)
+    return {'total': total, 'offset': offset, 'patients': page_records}
+
+
+def _page(offset, limit):
+    """Validated (offset, limit); limit None means no limit"""
+    try:
+        offset = int(offset or 0)
+        limit = int(limit) if limit is not None and limit != '' else None
+    except (TypeError, ValueError):
+        raise ServiceError("offset and limit must be integers")
+    if offset < 0 or (limit is not None and limit < 1):
+        raise ServiceError("offset must be >= 0 and limit a positive integer")
+    return offset, limit
+
+
+def scheduled_appointments(doctor_id):
+    """A doctor's appointments still awaiting a diagnosis, with 'patient_name' added"""
+    appointments_repo = get_repository('appointments')
+    if not appointments_repo.exists():
+        return []
+    scheduled = appointments_repo.records(doctor_id=doctor_id, status='Scheduled')
+    patients_repo = get_repository('patients')
+    names = {}
+    for appointment in scheduled:
+        patient_id = appointment['patient_id']
+        if patient_id not in names:
+            patient = patients_repo.get(patient_id)
+            names[patient_id] = patient['name'] if patient else 'Unknown'
+        appointment['patient_name'] = names[patient_id]
+    return scheduled
+
+
+def add_diagnosis(doctor_id, appointment_id, diagnosis, prescription):
+    """
+    Record a diagnosis and prescription, completing one of the doctor's appointments
+
+    Only Scheduled appointments can be diagnosed (409 otherwise).
+
+    Returns:
+        The updated appointment record
+    """
+    appointments_repo = get_repository('appointments')
+    with aggregates.get_aggregate_store().updating('appointments') as counters:
+        appointment = appointments_repo.get(appointment_id)
+        if appointment is None or appointment['doctor_id'] != doctor_id:
+            raise ServiceError(f"Appointment {appointment_id} not found!", status=404)
+        if appointment['status'] != 'Scheduled':
+            # A completed visit keeps its diagnosis; it is never overwritten
+            raise ServiceError(f"Appointment {appointment_id} is {appointment['status']}, "
+                               f"not Scheduled", status=409)
+
+        get_scheduler().update(appointment, diagnosis=diagnosis,
+                               prescription=prescription, status='Completed')
+        aggregates.record_status_change(counters, appointment, 'Completed')
+    return appointments_repo.records(appointment_id=appointment_id)[0]
+
+
+def username_taken(role, username):
+    """True if a user of this role already has the username"""
+    users = get_repository(f"{role}s")
+    return users.exists() and not users.find(username=username).empty
+
+
+def next_doctor_id():
+    """Next consecutive doctor ID (DOC001, DOC002, ...)"""
+    max_num = 0
+    for doctor in get_repository('doctors').records():
+        # Numeric part of the ID, e.g. "DOC006" -> 6
+        match = re.search(r'\d+', str(doctor['doctor_id']))
+        if match:
+            max_num = max(max_num, int(match.group()))
+    return f"DOC{max_num + 1:03d}"
+
+
+def add_doctor(name, specialization, availability, contact, email, username, password, doctor_id=None):
+    """
+    Register a new doctor (password stored as a PBKDF2 hash)
+
+    Returns:
+        The stored doctor record (without password)
+    """
+    if not username or not password:
+        raise ServiceError("Username and password are required")
+    password_hash = hash_password(password)
+
+    with aggregates.get_aggregate_store().updating('doctors') as counters:
+        if username_taken('doctor', username):
+            raise ServiceError(f"Username {username} already exists!", status=409)
+
+        doctor = {
+            'doctor_id': doctor_id or next_doctor_id(),
+            'username': username,
+            'password': password_hash,
+            'name': name,
+            'specialization': specialization,
+            'availability': availability,
+            'contact': contact,
+            'email': email
+        }
+        get_repository('doctors').insert(doctor)
+        aggregates.record_doctor(counters, doctor)
+    return _public(doctor)
+
+
+def predict_symptoms(symptoms):
+    """
+    Predict a disease from symptoms without saving anything
+
+    symptoms is a comma-separated string or a list of names; misspellings
+    and synonyms are resolved against the model's vocabulary.
+
+    Returns:
+        Dict with the prediction, confidence, resolved symptoms, how each
+        input was matched, unresolved inputs, ambiguous inputs with their
+        candidate symptoms (left out of the prediction) and precautions
+    """
+    from model_utils import load_or_train_model, predict_from_symptoms, get_precautions
+    from symptom_resolver import get_symptom_resolver
+
+    model, encoder_data = load_or_train_model()
+    if model is None:
+        raise ServiceError("Prediction model not found!", status=503)
+
+    matches, unresolved, ambiguous = get_symptom_resolver(encoder_data).resolve(symptoms)
+    resolved = list(dict.fromkeys(symptom for _, symptom, _ in matches))
+    if not resolved:
+        if ambiguous:
+            raise ServiceError("None of the entered symptoms were recognized unambiguously "
+                               f"({_describe_ambiguous(ambiguous)}).")
+        raise ServiceError("None of the entered symptoms were recognized.")
+
+    predicted_disease, confidence = predict_from_symptoms(model, encoder_data, resolved)
+    return {
+        'predicted_disease': str(predicted_disease) if predicted_disease else None,
+        'confidence': float(confidence) if predicted_disease else 0.0,
+        'symptoms': resolved,
+        'matches': [{'input': token, 'symptom': symptom, 'score': score}
+                    for token, symptom, score in matches],
+        'unresolved': unresolved,
+        'ambiguous': [{'input': token, 'candidates': candidates} for token, candidates in ambiguous],
+        'precautions': get_precautions(predicted_disease) if predicted_disease else [],
+    }
+
+
+def _describe_ambiguous(ambiguous):
+    """'pain' could be back pain, neck pain, ..."""
+    return '; '.join(f"'{token}' could be " + ', '.join(c.replace('_', ' ') for c in candidates)
+                     for token, candidates in ambiguous)
+
+
+def save_prediction(patient_id, symptoms, predicted_disease):
+    """Store a prediction in the patient's records; returns the saved record"""
+    now = datetime.now()
+    record = {
+        # Timestamp plus a random suffix: concurrent requests in the same
+        # microsecond still get distinct keys
+        'prediction_id': f"PRED{now.strftime('%Y%m%d%H%M%S%f')}{uuid.uuid4().hex[:8].upper()}",
+        'patient_id': patient_id,
+        'symptoms': ', '.join(symptoms) if symptoms else 'Not specified',
+        'predicted_disease': predicted_disease if predicted_disease else 'Not predicted',
+        'date': now.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with aggregates.get_aggregate_store().updating('predictions') as counters:
+        get_repository('predictions').insert(record)
+        aggregates.record_prediction(counters, record)
+    return record
+
+
+def predict_disease(patient_id, symptoms):
+    """
+    Predict a disease from symptoms and save the prediction for the patient
+
+    Returns:
+        predict_symptoms() result plus the saved prediction_id and the
+        suggested specializations and soonest slots (specialist_slots())
+    """
+    patient = get_patient(patient_id)
+    result = predict_symptoms(symptoms)
+    record = save_prediction(patient_id, result['symptoms'], result['predicted_disease'])
+    result['prediction_id'] = record['prediction_id']
+    if result['predicted_disease']:
+        result.update(specialist_slots(result['predicted_disease'], patient.get('age')))
+    return result
+
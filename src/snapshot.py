@@ -0,0 +1,262 @@
+"""
+Columnar snapshot of the data tables
+
+Writes each table as a Parquet or Arrow IPC file in data/snapshot/, streamed
+chunk by chunk, with a manifest recording the source table's version()
+token, row count, columns and which text columns are low-cardinality. Those
+are read back as pandas categoricals (Parquet dictionary pages are decoded
+straight into categories), so columns like status, specialization,
+doctor_name or predicted_disease cost one small integer code per row rather
+than a Python string.
+
+Analytics readers (reports, the aggregates rebuild, the profiler and the
+trend cache) call read_chunks(), which serves only the requested columns
+from the snapshot while it is fresh, i.e. the table hasn't changed since the
+snapshot was taken, and otherwise falls back to the table itself
+(Repository.chunks). Without pyarrow installed everything reads the tables.
+
+Usage:
+    python src/snapshot.py [--format parquet|arrow] [--tables appointments predictions]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from storage import DATA_DIR, TABLES, CHUNK_ROWS, get_repository
+
+# Optional dependency - snapshots need pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshot")
+MANIFEST_FILE = "manifest.json"
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# A text column is stored as categorical when, over the whole table, at most
+# this fraction of its values are distinct (and no more than CATEGORY_MAX_VALUES)
+CATEGORY_MAX_FRACTION = 0.5
+CATEGORY_MAX_VALUES = 100_000
+
+# Never copied into the snapshot
+SKIP_COLUMNS = {'password'}
+
+
+class SnapshotError(Exception):
+    """A snapshot can't be written (pyarrow missing, incompatible column types)"""
+
+
+def write_snapshot(tables=None, fmt='parquet', chunksize=CHUNK_ROWS, directory=SNAPSHOT_DIR):
+    """
+    Snapshot tables (all by default) in the given format
+
+    Returns:
+        The updated manifest: {table: {'file', 'format', 'version', 'rows',
+        'columns', 'categorical', 'created'}}
+    """
+    if not PYARROW_AVAILABLE:
+        raise SnapshotError("pyarrow is required for snapshots. Install it with: pip install pyarrow")
+    if fmt not in FORMATS:
+        raise SnapshotError(f"Unknown format: {fmt} (use one of {', '.join(FORMATS)})")
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    for table in tables or list(TABLES):
+        repo = get_repository(table)
+        if not repo.exists():
+            manifest.pop(table, None)
+            continue
+        # Taken before reading: a write during the snapshot leaves it stale
+        version = _version_token(table)
+        entry = _write_table(table, repo, fmt, chunksize, directory)
+        entry.update(version=version, created=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        manifest[table] = entry
+
+    _save_manifest(manifest, directory)
+    return manifest
+
+
+def _write_table(table, repo, fmt, chunksize, directory):
+    file_name = table + FORMATS[fmt]
+    path = os.path.join(directory, file_name)
+    temp_path = path + '.tmp'
+    schema, cardinality, writer, rows = None, {}, None, 0
+    try:
+        for chunk in repo.chunks(chunksize=chunksize):
+            chunk = chunk.drop(columns=[c for c in chunk.columns if c in SKIP_COLUMNS])
+            if schema is None:
+                schema = _schema(chunk)
+                cardinality = {field.name: [set(), 0] for field in schema if field.type == pa.string()}
+                writer = (pq.ParquetWriter(temp_path, schema) if fmt == 'parquet'
+                          else pa.ipc.new_file(temp_path, schema))
+            batch = pa.Table.from_arrays([_column_array(table, chunk, field) for field in schema],
+                                         schema=schema)
+            writer.write_table(batch)
+            _track_cardinality(cardinality, chunk)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Table with a header but no rows
+        schema = pa.schema([(column, pa.string()) for column in TABLES[table]['columns']
+                            if column not in SKIP_COLUMNS])
+        empty = schema.empty_table()
+        if fmt == 'parquet':
+            pq.write_table(empty, temp_path)
+        else:
+            with pa.ipc.new_file(temp_path, schema) as ipc_writer:
+                ipc_writer.write_table(empty)
+    os.replace(temp_path, path)
+    categorical = [column for column, (distinct, present) in cardinality.items()
+                   if present and len(distinct) <= CATEGORY_MAX_FRACTION * present]
+    return {'file': file_name, 'format': fmt, 'rows': rows,
+            'columns': schema.names, 'categorical': categorical}
+
+
+def _schema(chunk):
+    """Arrow schema from the first chunk; all-empty columns are taken as text"""
+    fields = []
+    for column in chunk.columns:
+        values = chunk[column]
+        if values.isna().all() or not pd.api.types.is_numeric_dtype(values):
+            fields.append(pa.field(column, pa.string()))
+        elif pd.api.types.is_bool_dtype(values):
+            fields.append(pa.field(column, pa.bool_()))
+        elif pd.api.types.is_integer_dtype(values):
+            fields.append(pa.field(column, pa.int64()))
+        else:
+            fields.append(pa.field(column, pa.float64()))
+    return pa.schema(fields)
+
+
+def _track_cardinality(cardinality, chunk):
+    """
+    Add a chunk's distinct values to the {column: [distinct, present]} tally
+
+    A column is dropped once it passes CATEGORY_MAX_VALUES, so the tally
+    stays bounded however large the table is.
+    """
+    for column in list(cardinality):
+        values = chunk[column] if column in chunk.columns else pd.Series(dtype=object)
+        distinct, present = cardinality[column]
+        distinct.update(str(value) for value in values.dropna().unique())
+        if len(distinct) > CATEGORY_MAX_VALUES:
+            del cardinality[column]
+        else:
+            cardinality[column][1] = present + int(values.count())
+
+
+def _column_array(table, chunk, field):
+    """One chunk column as an Arrow array of the snapshot's type"""
+    if field.name not in chunk.columns:
+        return pa.nulls(len(chunk), field.type)
+    values = chunk[field.name]
+    if values.isna().all():
+        return pa.nulls(len(values), field.type)
+    try:
+        return pa.array(values, type=field.type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if field.type == pa.string():
+            # e.g. contact numbers in a text column
+            text = values.astype(object).where(values.notna(), None)
+            return pa.array([None if value is None else str(value) for value in text], type=pa.string())
+        raise SnapshotError(f"Column {field.name} of {table} changes type partway through; "
+                            f"snapshot it after fixing the data")
+
+
+def load_manifest(directory=SNAPSHOT_DIR):
+    """Snapshot manifest, or {} if there is no snapshot"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest, directory):
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def fresh_entry(table, directory=SNAPSHOT_DIR):
+    """Manifest entry of a table's snapshot if it matches the table, else None"""
+    if not PYARROW_AVAILABLE:
+        return None
+    entry = load_manifest(directory).get(table)
+    if entry is None or entry.get('version') != _version_token(table):
+        return None
+    if not os.path.exists(os.path.join(directory, entry['file'])):
+        return None
+    return entry
+
+
+def read_chunks(table, columns=None, chunksize=CHUNK_ROWS, directory=SNAPSHOT_DIR):
+    """
+    Iterate over a table in DataFrames of at most chunksize rows
+
+    Reads only the given columns (all if None) from the snapshot when it is
+    fresh, otherwise from the table itself.
+    """
+    entry = fresh_entry(table, directory)
+    if entry is None or (columns and any(c in SKIP_COLUMNS for c in columns)):
+        return get_repository(table).chunks(columns, chunksize)
+    return _snapshot_chunks(entry, columns, chunksize, directory)
+
+
+def _snapshot_chunks(entry, columns, chunksize, directory):
+    path = os.path.join(directory, entry['file'])
+    present = [c for c in columns if c in entry['columns']] if columns else entry['columns']
+    categorical = [c for c in entry['categorical'] if c in present]
+    if entry['format'] == 'parquet':
+        batches = pq.ParquetFile(path, read_dictionary=categorical).iter_batches(
+            batch_size=chunksize, columns=present)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        batches = (reader.get_batch(i).select(present) for i in range(reader.num_record_batches))
+    for batch in batches:
+        chunk = batch.to_pandas(categories=categorical)
+        yield chunk.reindex(columns=columns) if columns else chunk
+
+
+def _version_token(table):
+    """Table version as stored in JSON (tuples become lists)"""
+    version = get_repository(table).version()
+    return list(version) if isinstance(version, tuple) else version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a columnar snapshot of the data tables")
+    parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES), help="tables to snapshot (default: all)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help="rows read at a time")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = write_snapshot(args.tables, args.format, args.chunksize)
+    except SnapshotError as e:
+        print(f"Error: {e}")
+        return 1
+    for table, entry in manifest.items():
+        categorical = ', '.join(entry['categorical']) or 'none'
+        print(f"{table}: {entry['rows']} rows -> {os.path.join(SNAPSHOT_DIR, entry['file'])} "
+              f"(categorical: {categorical})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
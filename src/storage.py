@@ -0,0 +1,588 @@
+"""
+Storage layer for hospital records
+
+Every table (patients, doctors, admins, appointments, predictions) is accessed
+through a Repository. The repository delegates to a storage backend:
+
+- CSVStorage keeps the original flat files in data/ (default)
+- SQLiteStorage keeps the same tables in an embedded SQLite database with
+  indexes on the lookup columns, so single-row reads and writes are O(log N)
+
+Select the backend with the MEDICORE_STORAGE environment variable
+('csv' or 'sqlite'). The SQLite database is seeded from the CSV files the
+first time a table is opened, hashing any plaintext passwords on the way.
+"""
+import csv
+import io
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_DIR = "data"
+
+# Rows per chunk when streaming a table (Repository.chunks)
+CHUNK_ROWS = 500_000
+
+# Bound parameters per SQLite statement (the default limit is 999)
+SQLITE_MAX_PARAMS = 900
+
+# SQLite table holding each table's change counters (SQLiteStorage.version)
+VERSIONS_TABLE = "_versions"
+
+TABLES = {
+    'patients': {
+        'file': 'patients.csv',
+        'key': 'patient_id',
+        'columns': ['patient_id', 'username', 'password', 'name', 'age',
+                    'gender', 'contact', 'email', 'address'],
+        'indexes': ['username'],
+    },
+    'doctors': {
+        'file': 'doctors.csv',
+        'key': 'doctor_id',
+        'columns': ['doctor_id', 'username', 'password', 'name', 'specialization',
+                    'availability', 'contact', 'email'],
+        'indexes': ['username', 'specialization'],
+    },
+    'admins': {
+        'file': 'admins.csv',
+        'key': 'admin_id',
+        'columns': ['admin_id', 'username', 'password', 'name', 'contact', 'email'],
+        'indexes': ['username'],
+    },
+    'appointments': {
+        'file': 'appointments.csv',
+        'key': 'appointment_id',
+        'columns': ['appointment_id', 'patient_id', 'doctor_id', 'doctor_name',
+                    'specialization', 'date', 'time', 'reason', 'status',
+                    'diagnosis', 'prescription'],
+        'indexes': ['patient_id', 'doctor_id', 'status'],
+    },
+    'predictions': {
+        'file': 'disease_predictions.csv',
+        'key': 'prediction_id',
+        'columns': ['prediction_id', 'patient_id', 'symptoms',
+                    'predicted_disease', 'date'],
+        'indexes': ['patient_id'],
+    },
+}
+
+
+def _to_python(value):
+    """Convert pandas/NumPy scalars to plain Python values (NaN -> None)"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def frame_records(df):
+    """DataFrame rows as a list of dicts with plain Python values (NaN -> None)"""
+    return [{column: _to_python(value) for column, value in zip(df.columns, row)}
+            for row in df.itertuples(index=False, name=None)]
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive inter-process lock on path + '.lock'"""
+    lock_path = path + '.lock'
+    with open(lock_path, 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def append_csv_row(path, record, columns):
+    """
+    Append one record to a CSV file without rewriting it
+    
+    The row follows the column order of the existing header (or writes
+    `columns` as the header for a new file). The write is a single call
+    followed by fsync, under the file lock, so concurrent sessions never
+    lose each other's rows.
+    """
+    with file_lock(path):
+        with open(path, 'a+b') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            header = None
+            needs_newline = False
+            if size > 0:
+                f.seek(0)
+                header = next(csv.reader([f.readline().decode('utf-8-sig')]), None)
+                f.seek(size - 1)
+                needs_newline = f.read(1) != b'\n'
+            
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator='\n')
+            if not header:
+                header = list(columns)
+                writer.writerow(header)
+            elif needs_newline:
+                buffer.write('\n')
+            writer.writerow(['' if _to_python(record.get(col)) is None else record.get(col)
+                             for col in header])
+            
+            f.seek(0, os.SEEK_END)
+            f.write(buffer.getvalue().encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def write_csv_atomic(df, path):
+    """
+    Replace a CSV file with df in one step
+
+    The rows go to a temporary file in the same directory, which is fsynced
+    and renamed over the original, so readers that don't take the file lock
+    see either the old table or the new one, and a crash leaves the old one.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            df.to_csv(f, index=False, lineterminator='\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class CSVStorage:
+    """Backend that stores each table as a CSV file in the data directory"""
+
+    name = 'csv'
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+
+    def path(self, table):
+        return os.path.join(self.data_dir, TABLES[table]['file'])
+
+    def exists(self, table):
+        return os.path.exists(self.path(table))
+
+    def version(self, table):
+        """Token that changes whenever the table's file changes"""
+        try:
+            stat = os.stat(self.path(table))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def position(self, table):
+        """(device, inode, size) of the table's file, or None if it's missing"""
+        try:
+            stat = os.stat(self.path(table))
+        except FileNotFoundError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_size)
+
+    def appended_since(self, table, position):
+        # Appends grow the same file; update() replaces it with a new inode
+        try:
+            f = open(self.path(table), 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            stat = os.fstat(f.fileno())
+            header = f.readline()
+            if (position is None or (stat.st_dev, stat.st_ino) != position[:2]
+                    or not len(header) <= position[2] <= stat.st_size):
+                return None
+            f.seek(position[2])
+            data = f.read(stat.st_size - position[2])
+        # A row still being written is picked up next time
+        data = data[:data.rfind(b'\n') + 1]
+        rows = pd.read_csv(io.BytesIO(header + data), encoding='utf-8')
+        return rows, (stat.st_dev, stat.st_ino, position[2] + len(data))
+
+    def load(self, table):
+        if not self.exists(table):
+            return pd.DataFrame(columns=TABLES[table]['columns'])
+        return pd.read_csv(self.path(table), encoding='utf-8')
+
+    def chunks(self, table, columns=None, chunksize=CHUNK_ROWS):
+        if not self.exists(table):
+            return
+        wanted = set(columns) if columns else None
+        reader = pd.read_csv(self.path(table), encoding='utf-8', chunksize=chunksize,
+                             usecols=(lambda col: col in wanted) if wanted else None)
+        with reader:
+            for chunk in reader:
+                yield chunk.reindex(columns=columns) if columns else chunk
+
+    def find(self, table, **filters):
+        df = self.load(table)
+        for column, value in filters.items():
+            df = df[df[column] == value]
+        return df
+
+    def find_in(self, table, column, values):
+        # Streamed so only the matching rows are held in memory
+        values = set(values)
+        matches = [chunk[chunk[column].isin(values)] for chunk in self.chunks(table)]
+        if not matches:
+            return pd.DataFrame(columns=TABLES[table]['columns'])
+        return pd.concat(matches, ignore_index=True)
+
+    def get(self, table, key):
+        rows = self.find(table, **{TABLES[table]['key']: key})
+        if rows.empty:
+            return None
+        return rows.iloc[0].to_dict()
+
+    def insert(self, table, record):
+        append_csv_row(self.path(table), record, TABLES[table]['columns'])
+
+    def update(self, table, key, changes):
+        with file_lock(self.path(table)):
+            df = self.load(table)
+            mask = df[TABLES[table]['key']] == key
+            if not mask.any():
+                return False
+            for column, value in changes.items():
+                if column in df.columns and df[column].dtype != object:
+                    df[column] = df[column].astype(object)
+                df.loc[mask, column] = value
+            write_csv_atomic(df, self.path(table))
+        return True
+
+    def update_many(self, table, changes):
+        with file_lock(self.path(table)):
+            df = self.load(table)
+            keys = df[TABLES[table]['key']]
+            found = keys.isin(list(changes))
+            for column in {column for record in changes.values() for column in record}:
+                values = keys[found].map(lambda key: changes[key].get(column))
+                has_value = values.notna()
+                if column in df.columns and df[column].dtype != object:
+                    df[column] = df[column].astype(object)
+                df.loc[values[has_value].index, column] = values[has_value]
+            write_csv_atomic(df, self.path(table))
+        return int(found.sum())
+
+
+class SQLiteStorage:
+    """Backend that stores all tables in one indexed SQLite database"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path=None, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.db_path = db_path or os.path.join(data_dir, "medicore.db")
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._ready = set()
+
+    def _ensure_table(self, table):
+        """Create the table and its indexes, seeding it from CSV on first use"""
+        if table in self._ready:
+            return
+        schema = TABLES[table]
+        columns = ', '.join(f'"{col}"' for col in schema['columns'])
+        with self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+            ).fetchone()
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+            for col in [schema['key']] + schema['indexes']:
+                self._conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "idx_{table}_{col}" ON "{table}" ("{col}")'
+                )
+            csv_path = os.path.join(self.data_dir, schema['file'])
+            if not exists and os.path.exists(csv_path):
+                df = pd.read_csv(csv_path, encoding='utf-8')
+                df = df.reindex(columns=schema['columns'])
+                if 'password' in df.columns:
+                    # Imported here: credentials builds on this module
+                    from credentials import hash_plaintext
+                    df['password'] = df['password'].astype(object).map(hash_plaintext)
+                rows = [tuple(_to_python(v) for v in row)
+                        for row in df.itertuples(index=False, name=None)]
+                placeholders = ', '.join('?' for _ in schema['columns'])
+                self._conn.executemany(
+                    f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders})', rows
+                )
+            # Change counters kept in the database by triggers, so they survive
+            # restarts and count writes from every process and tool: changes
+            # counts every write, appends only the inserts
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{VERSIONS_TABLE}" '
+                               '(name TEXT PRIMARY KEY, epoch TEXT, changes INTEGER, appends INTEGER DEFAULT 0)')
+            version_columns = [row[1] for row in self._conn.execute(f'PRAGMA table_info("{VERSIONS_TABLE}")')]
+            if 'appends' not in version_columns:
+                self._conn.execute(f'ALTER TABLE "{VERSIONS_TABLE}" ADD COLUMN appends INTEGER DEFAULT 0')
+                # Older insert triggers don't count appends; recreated on open
+                for name in TABLES:
+                    self._conn.execute(f'DROP TRIGGER IF EXISTS "trg_{name}_insert"')
+            self._conn.execute(f'INSERT OR IGNORE INTO "{VERSIONS_TABLE}" VALUES (?, ?, 0, 0)',
+                               (table, uuid.uuid4().hex))
+            for event, counters in (('INSERT', 'changes = changes + 1, appends = appends + 1'),
+                                    ('UPDATE', 'changes = changes + 1'),
+                                    ('DELETE', 'changes = changes + 1')):
+                self._conn.execute(
+                    f'CREATE TRIGGER IF NOT EXISTS "trg_{table}_{event.lower()}" AFTER {event} ON "{table}" '
+                    f'BEGIN UPDATE "{VERSIONS_TABLE}" SET {counters} WHERE name = \'{table}\'; END'
+                )
+        self._ready.add(table)
+
+    def _query(self, table, where='', params=()):
+        with self._lock:
+            self._ensure_table(table)
+            return pd.read_sql_query(f'SELECT * FROM "{table}" {where}',
+                                     self._conn, params=params)
+
+    def exists(self, table):
+        with self._lock:
+            self._ensure_table(table)
+            return self._conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone() is not None
+
+    def version(self, table):
+        """
+        Token that changes on writes from this or any other connection
+
+        (epoch, changes) from the trigger-maintained counter: durable across
+        processes, and a recreated database gets a new epoch.
+        """
+        with self._lock:
+            self._ensure_table(table)
+            row = self._conn.execute(f'SELECT epoch, changes FROM "{VERSIONS_TABLE}" WHERE name = ?',
+                                     (table,)).fetchone()
+        return tuple(row)
+
+    def _counters(self, table):
+        """(epoch, writes other than inserts) for the table"""
+        return tuple(self._conn.execute(f'SELECT epoch, changes - appends FROM "{VERSIONS_TABLE}" WHERE name = ?',
+                                        (table,)).fetchone())
+
+    def position(self, table):
+        """(epoch, writes other than inserts, highest rowid) of the table"""
+        with self._lock:
+            self._ensure_table(table)
+            last = self._conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0]
+            return self._counters(table) + (last or 0,)
+
+    def appended_since(self, table, position):
+        with self._lock:
+            self._ensure_table(table)
+            counters = self._counters(table)
+            if position is None or counters != position[:2]:
+                return None
+            rows = pd.read_sql_query(f'SELECT rowid AS "_rowid", * FROM "{table}" WHERE rowid > ? ORDER BY rowid',
+                                     self._conn, params=(position[2],))
+        last = int(rows['_rowid'].iloc[-1]) if len(rows) else position[2]
+        return rows.drop(columns='_rowid'), counters + (last,)
+
+    def load(self, table):
+        return self._query(table)
+
+    def chunks(self, table, columns=None, chunksize=CHUNK_ROWS):
+        with self._lock:
+            self._ensure_table(table)
+        names = ', '.join(f'"{col}"' for col in columns) if columns else '*'
+        # A separate connection so other queries can run while the caller iterates
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield from pd.read_sql_query(f'SELECT {names} FROM "{table}"', conn, chunksize=chunksize)
+        finally:
+            conn.close()
+
+    def find(self, table, **filters):
+        if not filters:
+            return self.load(table)
+        where = 'WHERE ' + ' AND '.join(f'"{col}" = ?' for col in filters)
+        return self._query(table, where, tuple(_to_python(v) for v in filters.values()))
+
+    def find_in(self, table, column, values):
+        values = [_to_python(v) for v in dict.fromkeys(values)]
+        if not values:
+            return self._query(table, 'WHERE 0')
+        # SQLite caps the number of bound parameters per statement
+        batches = [values[i:i + SQLITE_MAX_PARAMS] for i in range(0, len(values), SQLITE_MAX_PARAMS)]
+        return pd.concat([self._query(table, f'WHERE "{column}" IN ({", ".join("?" for _ in batch)})',
+                                      tuple(batch))
+                          for batch in batches], ignore_index=True)
+
+    def get(self, table, key):
+        rows = self._query(table, f'WHERE "{TABLES[table]["key"]}" = ? LIMIT 1', (key,))
+        if rows.empty:
+            return None
+        return rows.iloc[0].to_dict()
+
+    def insert(self, table, record):
+        columns = TABLES[table]['columns']
+        placeholders = ', '.join('?' for _ in columns)
+        names = ', '.join(f'"{col}"' for col in columns)
+        values = tuple(_to_python(record.get(col)) for col in columns)
+        with self._lock:
+            self._ensure_table(table)
+            with self._conn:
+                self._conn.execute(f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})', values)
+
+    def update(self, table, key, changes):
+        assignments = ', '.join(f'"{col}" = ?' for col in changes)
+        values = tuple(_to_python(v) for v in changes.values()) + (key,)
+        with self._lock:
+            self._ensure_table(table)
+            with self._conn:
+                cursor = self._conn.execute(
+                    f'UPDATE "{table}" SET {assignments} WHERE "{TABLES[table]["key"]}" = ?', values
+                )
+        return cursor.rowcount > 0
+
+    def update_many(self, table, changes):
+        updated = 0
+        with self._lock:
+            self._ensure_table(table)
+            with self._conn:
+                for key, record in changes.items():
+                    assignments = ', '.join(f'"{col}" = ?' for col in record)
+                    cursor = self._conn.execute(
+                        f'UPDATE "{table}" SET {assignments} WHERE "{TABLES[table]["key"]}" = ?',
+                        tuple(_to_python(v) for v in record.values()) + (_to_python(key),)
+                    )
+                    updated += cursor.rowcount
+        return updated
+
+
+class Repository:
+    """Record access for a single table through the configured backend"""
+
+    def __init__(self, storage, table):
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        self.storage = storage
+        self.table = table
+        self.key = TABLES[table]['key']
+        self.columns = TABLES[table]['columns']
+
+    def exists(self):
+        """True if the table has a backing file/table with data"""
+        return self.storage.exists(self.table)
+
+    def version(self):
+        """Cheap token that changes whenever the table is modified"""
+        return self.storage.version(self.table)
+
+    def position(self):
+        """Opaque token for the current end of the table (see appended_since)"""
+        return self.storage.position(self.table)
+
+    def appended_since(self, position):
+        """
+        Records appended after a position() token, read without rescanning
+
+        Returns:
+            (DataFrame of the new records, new position), or None if the
+            table was rewritten, updated or replaced since then, in which
+            case the caller has to read it in full.
+        """
+        return self.storage.appended_since(self.table, position)
+
+    def all(self):
+        """All records as a DataFrame"""
+        return self.storage.load(self.table)
+
+    def chunks(self, columns=None, chunksize=CHUNK_ROWS):
+        """
+        Iterate over the table in DataFrames of at most chunksize rows
+
+        Only the given columns are read (all columns if None), so large
+        tables can be aggregated in bounded memory.
+        """
+        return self.storage.chunks(self.table, columns, chunksize)
+
+    def find(self, **filters):
+        """Records whose columns equal the given values, as a DataFrame"""
+        return self.storage.find(self.table, **filters)
+
+    def find_in(self, column, values):
+        """Records whose column is any of the given values, as a DataFrame"""
+        return self.storage.find_in(self.table, column, values)
+
+    def records(self, **filters):
+        """Matching records as a list of dicts with plain Python values (NaN -> None)"""
+        return frame_records(self.find(**filters) if filters else self.all())
+
+    def get(self, key):
+        """Single record by primary key as a dict, or None"""
+        return self.storage.get(self.table, key)
+
+    def insert(self, record):
+        """Add one record"""
+        self.storage.insert(self.table, record)
+
+    def update(self, key, **changes):
+        """Update columns of the record with the given key; returns True if found"""
+        return self.storage.update(self.table, key, changes)
+
+    def update_many(self, changes):
+        """
+        Apply {key: {column: value}} in one rewrite/transaction
+
+        Returns the number of records updated.
+        """
+        return self.storage.update_many(self.table, changes)
+
+
+BACKENDS = {
+    'csv': CSVStorage,
+    'sqlite': SQLiteStorage,
+}
+
+_storage = None
+
+
+def get_storage():
+    """Return the process-wide storage backend selected by MEDICORE_STORAGE"""
+    global _storage
+    if _storage is None:
+        backend = os.environ.get('MEDICORE_STORAGE', 'csv').strip().lower()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        _storage = BACKENDS[backend]()
+    return _storage
+
+
+def set_storage(storage):
+    """Replace the process-wide storage backend"""
+    global _storage
+    _storage = storage
+
+
+def get_repository(table):
+    """Return the repository for one of the tables in TABLES"""
+    return Repository(get_storage(), table)
@@ -1,13 +1,15 @@
 """
 Interactive symptom checker with chat-like interface
 """
-import pandas as pd
-from model_utils import load_or_train_model, predict_from_symptoms, get_disease_precautions
+from model_utils import load_or_train_model, predict_from_symptoms, get_precautions
+from symptom_interview import get_interview_model, MAX_QUESTIONS
+from symptom_resolver import get_symptom_resolver
 
 def interactive_symptom_checker():
     """
     Interactive chat-like symptom checker
-    Asks user about symptoms one by one with yes/no answers
+    Asks user about symptoms one by one with yes/no answers, choosing each
+    question adaptively and stopping early once the answer is clear
     """
     print("\n" + "="*60)
     print(" " * 15 + "INTERACTIVE SYMPTOM CHECKER")
@@ -26,62 +28,50 @@ def interactive_symptom_checker():
         print("Error: Could not load or train model!")
         return None, []
     
-    # Get all available symptoms
-    all_symptoms = encoder_data.get('columns', [])
-    # Filter out numeric columns and get actual symptom names
-    symptom_names = [s for s in all_symptoms if not s.replace('_', '').isdigit()]
+    # Start an adaptive interview: each question is the symptom that best
+    # separates the diseases still consistent with the answers so far
+    interview = get_interview_model().start()
     
-    # Get unique symptom names (remove duplicates from one-hot encoding artifacts)
-    unique_symptoms = []
-    seen = set()
-    for sym in symptom_names:
-        if sym not in seen and sym.lower() != 'none':
-            unique_symptoms.append(sym)
-            seen.add(sym)
-    
-    # Limit to top symptoms for better UX (you can adjust this)
-    symptoms_to_check = unique_symptoms[:50]  # Check first 50 symptoms
-    
-    user_symptoms = []
-    confirmed_symptoms = []
-    
-    print(f"\nI'll ask you about {len(symptoms_to_check)} common symptoms.")
+    print(f"\nI'll ask up to {MAX_QUESTIONS} questions and stop as soon as I'm confident.")
     print("You can stop anytime by typing 'done'\n")
     
-    symptom_num = 0
-    max_symptoms = len(symptoms_to_check)
+    question_num = 0
+    symptom = interview.next_question()
     
-    for i, symptom in enumerate(symptoms_to_check, 1):
-        symptom_num = i
-        
+    while symptom is not None and question_num < MAX_QUESTIONS:
         # Format symptom name for display (clean it up)
         display_symptom = symptom.replace('_', ' ').title()
         
-        print(f"[{i}/{max_symptoms}] Do you have: {display_symptom}?")
+        print(f"[{question_num + 1}] Do you have: {display_symptom}?")
         response = input("Your answer (yes/no/done): ").strip().lower()
         
         if response in ['done', 'd', 'exit', 'quit', 'stop']:
-            print(f"\n✓ Stopped at symptom {i}. You've answered {len(confirmed_symptoms)} symptoms.")
+            print(f"\n✓ Stopped after {question_num} questions.")
             break
         elif response in ['yes', 'y']:
-            confirmed_symptoms.append(symptom)
-            user_symptoms.append(symptom)
+            interview.answer(symptom, True)
             print(f"  ✓ Marked: {display_symptom}\n")
         elif response in ['no', 'n']:
+            interview.answer(symptom, False)
             print(f"  - Skipped: {display_symptom}\n")
         else:
-            print("  ⚠ Invalid response. Please answer 'yes', 'no', or 'done'.\n")
             # Ask again for the same symptom
-            i -= 1
+            print("  ⚠ Invalid response. Please answer 'yes', 'no', or 'done'.\n")
             continue
         
-        # If we have enough symptoms, we can optionally stop early
-        # (You can remove this if you want to ask all questions)
-        if len(confirmed_symptoms) >= 5:
-            print(f"\nYou have {len(confirmed_symptoms)} symptoms so far.")
-            continue_choice = input("Continue with more symptoms? (yes/no): ").strip().lower()
-            if continue_choice in ['no', 'n']:
-                break
+        question_num += 1
+        
+        # Live assessment from the incrementally updated posterior
+        if interview.confirmed_symptoms():
+            guesses = ', '.join(f"{disease.strip()} ({prob*100:.0f}%)" for disease, prob in interview.top(3))
+            print(f"  Current assessment: {guesses}\n")
+        
+        if interview.confirmed_symptoms() and interview.is_confident():
+            print(f"✓ That's enough to make a prediction ({question_num} questions).")
+            break
+        symptom = interview.next_question()
+    
+    user_symptoms = interview.confirmed_symptoms()
     
     if not user_symptoms:
         print("\n⚠ No symptoms selected. Please consult a doctor for proper diagnosis.")
@@ -105,18 +95,13 @@ def interactive_symptom_checker():
             print(f"  {i}. {sym.replace('_', ' ').title()}")
         
         # Get precautions
-        precautions_df = get_disease_precautions()
-        if not precautions_df.empty and 'Disease' in precautions_df.columns:
-            disease_precautions = precautions_df[precautions_df['Disease'] == predicted_disease]
-            if not disease_precautions.empty:
-                print(f"\n{'='*60}")
-                print(" RECOMMENDED PRECAUTIONS")
-                print(f"{'='*60}")
-                prec_row = disease_precautions.iloc[0]
-                prec_cols = [col for col in precautions_df.columns if 'Precaution' in col]
-                for col in prec_cols:
-                    if pd.notna(prec_row[col]):
-                        print(f"  • {prec_row[col]}")
+        precautions = get_precautions(predicted_disease)
+        if precautions:
+            print(f"\n{'='*60}")
+            print(" RECOMMENDED PRECAUTIONS")
+            print(f"{'='*60}")
+            for precaution in precautions:
+                print(f"  • {precaution}")
         
         print(f"\n{'='*60}")
         print("⚠ IMPORTANT: This is an AI prediction, not a medical diagnosis.")
@@ -149,6 +134,8 @@ def simple_symptom_checker():
         "Abdominal Pain", "Diarrhea", "Vomiting"
     ]
     
+    # Everyday names like "Fever" or "Diarrhea" map onto dataset symptoms
+    resolver = get_symptom_resolver(encoder_data)
     user_symptoms = []
     
     print("\nI'll ask you about common symptoms. Answer with 'yes' or 'no'.\n")
@@ -156,7 +143,8 @@ def simple_symptom_checker():
     for symptom in common_symptoms:
         response = input(f"Do you have {symptom}? (yes/no): ").strip().lower()
         if response in ['yes', 'y']:
-            user_symptoms.append(symptom.lower().replace(' ', '_'))
+            matches = resolver.resolve([symptom])[0]
+            user_symptoms.append(matches[0][1] if matches else symptom.lower().replace(' ', '_'))
             print(f"  ✓ Added: {symptom}\n")
         else:
             print(f"  - Skipped\n")
@@ -0,0 +1,175 @@
+"""
+Adaptive question ordering for the interactive symptom checker
+
+InterviewModel precomputes, from DiseaseAndSymptoms.csv:
+    - freq[d, s]: fraction of cases of disease d that list symptom s
+    - present bitsets: per symptom, the diseases that ever list it
+    - always bitsets: per symptom, the diseases that list it in every case
+Bitsets are NumPy-packed (np.packbits), one row per symptom.
+
+An Interview keeps the set of diseases still consistent with the answers
+(a "yes" keeps diseases that can show the symptom, a "no" drops diseases
+that always show it) and a naive-Bayes log-posterior over diseases that is
+updated in O(diseases) per answer. That gives a live top-k diagnosis after
+every answer without re-encoding symptoms or running the forest. Each next
+question is the unasked symptom with the highest expected information gain
+under the current posterior; a step is a handful of vectorized operations
+on a diseases x symptoms matrix.
+"""
+import os
+import threading
+import numpy as np
+
+from model_utils import normalize_symptom
+from training import DATASET_PATH, load_symptom_matrix
+
+# Probability bounds so a single surprising answer never zeroes a disease
+# out of the information-gain calculation
+EPSILON = 1e-3
+STOP_PROBABILITY = 0.9
+MAX_QUESTIONS = 25
+
+
+def _entropy(p, axis=None):
+    p = np.clip(p, 1e-12, 1.0)
+    return -(p * np.log2(p)).sum(axis=axis)
+
+
+class InterviewModel:
+    """Per-dataset precomputed disease x symptom statistics, shared by all sessions"""
+
+    def __init__(self, X, y, symptoms):
+        self.symptoms = list(symptoms)
+        self.symptom_index = {normalize_symptom(s): i for i, s in enumerate(self.symptoms)}
+        self.diseases, codes = np.unique(y.astype(str), return_inverse=True)
+        n_diseases = len(self.diseases)
+
+        # Case counts per disease and symptom occurrences per disease
+        case_counts = np.bincount(codes, minlength=n_diseases).astype(np.float64)
+        X = X.tocoo()
+        occurrences = np.zeros((n_diseases, len(self.symptoms)))
+        np.add.at(occurrences, (codes[X.row], X.col), 1)
+
+        self.prior = case_counts / case_counts.sum()
+        self.freq = occurrences / np.maximum(case_counts, 1)[:, None]
+        self.likelihood = np.clip(self.freq, EPSILON, 1 - EPSILON)
+        self.log_prior = np.log(self.prior)
+        self.log_yes = np.log(self.likelihood)
+        self.log_no = np.log(1 - self.likelihood)
+
+        # Bitsets: row s has bit d set when disease d ever / always shows symptom s
+        self.present_bits = np.packbits(self.freq.T > 0, axis=1)
+        self.always_bits = np.packbits(self.freq.T >= 1.0, axis=1)
+        self.all_bits = np.packbits(np.ones(n_diseases, dtype=bool))
+
+    @classmethod
+    def from_dataset(cls, path=DATASET_PATH):
+        X, y, symptoms = load_symptom_matrix(path)
+        return cls(X, y, symptoms)
+
+    def index_of(self, symptom):
+        """Column of a symptom name (any spelling), or None"""
+        return self.symptom_index.get(normalize_symptom(symptom))
+
+    def start(self):
+        """Begin a new interview session"""
+        return Interview(self)
+
+
+class Interview:
+    """State of one symptom interview"""
+
+    def __init__(self, model):
+        self.model = model
+        self.candidates = model.all_bits.copy()
+        self.asked = np.zeros(len(model.symptoms), dtype=bool)
+        self.answers = {}
+        self.log_posterior = model.log_prior.copy()
+
+    def candidate_mask(self):
+        """Boolean mask over diseases still consistent with the answers"""
+        return np.unpackbits(self.candidates, count=len(self.model.diseases)).astype(bool)
+
+    def distribution(self):
+        """Posterior probability of each disease, restricted to consistent diseases"""
+        weights = np.exp(self.log_posterior - self.log_posterior.max())
+        masked = weights * self.candidate_mask()
+        total = masked.sum()
+        if total > 0:
+            return masked / total
+        return weights / weights.sum()
+
+    def top(self, k=3):
+        """The k most likely diseases as (disease, probability) pairs"""
+        p = self.distribution()
+        order = np.argsort(-p)[:k]
+        return [(str(self.model.diseases[i]), float(p[i])) for i in order if p[i] > 0]
+
+    def answer(self, symptom, has_symptom):
+        """Record a yes/no answer, update the posterior and narrow the consistent diseases"""
+        s = self.model.index_of(symptom)
+        if s is None or self.asked[s]:
+            return
+        self.asked[s] = True
+        self.answers[self.model.symptoms[s]] = bool(has_symptom)
+        if has_symptom:
+            self.log_posterior += self.model.log_yes[:, s]
+            narrowed = self.candidates & self.model.present_bits[s]
+        else:
+            self.log_posterior += self.model.log_no[:, s]
+            narrowed = self.candidates & ~self.model.always_bits[s]
+        # Contradictory answers would rule everything out; keep the previous
+        # set rather than ending up with no candidates
+        if narrowed.any():
+            self.candidates = narrowed
+
+    def information_gain(self):
+        """Expected entropy reduction for every symptom (asked ones are -inf)"""
+        p = self.distribution()
+        active = p > 0
+        p = p[active]
+        L = self.model.likelihood[active]
+
+        p_yes = p @ L
+        joint_yes = p[:, None] * L
+        joint_no = p[:, None] * (1 - L)
+        h_yes = _entropy(joint_yes / p_yes, axis=0)
+        h_no = _entropy(joint_no / (1 - p_yes), axis=0)
+
+        gain = _entropy(p) - p_yes * h_yes - (1 - p_yes) * h_no
+        gain[self.asked] = -np.inf
+        return gain
+
+    def next_question(self):
+        """Unasked symptom with the highest expected information gain, or None"""
+        if self.asked.all():
+            return None
+        gain = self.information_gain()
+        best = int(np.argmax(gain))
+        if not np.isfinite(gain[best]) or gain[best] <= 1e-9:
+            return None
+        return self.model.symptoms[best]
+
+    def is_confident(self, threshold=STOP_PROBABILITY):
+        """True once the most likely disease reaches the threshold"""
+        return self.distribution().max() >= threshold
+
+    def confirmed_symptoms(self):
+        return [symptom for symptom, has in self.answers.items() if has]
+
+
+_model = None
+_model_stat = None
+_model_lock = threading.Lock()
+
+
+def get_interview_model(path=DATASET_PATH):
+    """Shared InterviewModel, rebuilt only if the dataset file changes"""
+    global _model, _model_stat
+    st = os.stat(path)
+    stat = (st.st_mtime_ns, st.st_size)
+    with _model_lock:
+        if _model is None or stat != _model_stat:
+            _model = InterviewModel.from_dataset(path)
+            _model_stat = stat
+        return _model
@@ -0,0 +1,219 @@
+"""
+Fuzzy symptom resolution for free-text input
+
+Quick Mode takes symptoms as typed ("stomach ache, tiredness, headach").
+SymptomResolver maps each token onto the model's symptom vocabulary:
+
+    1. exact match on the normalized name ("Skin Rash" -> skin_rash)
+    2. exact match in the SYNONYMS table ("tiredness" -> fatigue)
+    3. character-trigram similarity against every symptom name and synonym
+       phrase, scored with the Dice coefficient
+
+The trigram index is an inverted index (trigram -> NumPy array of entry ids)
+built once per vocabulary, so scoring a token is one np.bincount over the
+posting lists of its trigrams - well under a millisecond even for
+vocabularies of thousands of symptoms. Tokens that score below min_score
+against everything are reported back as unresolved, and tokens whose best
+score is shared by several symptoms ("pain" -> back_pain, neck_pain, ...)
+as ambiguous with their candidates, instead of being silently dropped or
+guessed.
+"""
+import re
+import numpy as np
+
+from model_utils import normalize_symptom
+
+# Everyday phrasing -> dataset symptom name. Entries whose target isn't in
+# the served model's vocabulary are ignored.
+SYNONYMS = {
+    'stomach ache': 'stomach_pain',
+    'stomachache': 'stomach_pain',
+    'tummy ache': 'stomach_pain',
+    'abdominal ache': 'abdominal_pain',
+    'belly ache': 'belly_pain',
+    'tired': 'fatigue',
+    'tiredness': 'fatigue',
+    'exhaustion': 'fatigue',
+    'exhausted': 'fatigue',
+    'fever': 'high_fever',
+    'temperature': 'high_fever',
+    'low grade fever': 'mild_fever',
+    'slight fever': 'mild_fever',
+    'throwing up': 'vomiting',
+    'vomit': 'vomiting',
+    'puking': 'vomiting',
+    'nauseous': 'nausea',
+    'feeling sick': 'nausea',
+    'rash': 'skin_rash',
+    'itchy': 'itching',
+    'itch': 'itching',
+    'diarrhea': 'diarrhoea',
+    'loose stools': 'diarrhoea',
+    'shortness of breath': 'breathlessness',
+    'short of breath': 'breathlessness',
+    'difficulty breathing': 'breathlessness',
+    'heartburn': 'acidity',
+    'acid reflux': 'acidity',
+    'sore throat': 'throat_irritation',
+    'stuffy nose': 'congestion',
+    'blocked nose': 'congestion',
+    'sneezing': 'continuous_sneezing',
+    'jaundice': 'yellowish_skin',
+    'yellow skin': 'yellowish_skin',
+    'yellow eyes': 'yellowing_of_eyes',
+    'dizzy': 'dizziness',
+    'feeling dizzy': 'dizziness',
+    'vertigo': 'spinning_movements',
+    'migraine': 'headache',
+    'back ache': 'back_pain',
+    'backache': 'back_pain',
+    'joint ache': 'joint_pain',
+    'muscle ache': 'muscle_pain',
+    'body ache': 'muscle_pain',
+    'sweats': 'sweating',
+    'night sweats': 'sweating',
+    'shivers': 'shivering',
+    'blurry vision': 'blurred_and_distorted_vision',
+    'blurred vision': 'blurred_and_distorted_vision',
+    'losing weight': 'weight_loss',
+    'gaining weight': 'weight_gain',
+    'no appetite': 'loss_of_appetite',
+    'frequent urination': 'polyuria',
+    'painful urination': 'burning_micturition',
+    'burning urination': 'burning_micturition',
+    'racing heart': 'fast_heart_rate',
+    'rapid heartbeat': 'fast_heart_rate',
+    'anxious': 'anxiety',
+    'depressed': 'depression',
+    'irritable': 'irritability',
+    'restless': 'restlessness',
+    'lethargic': 'lethargy',
+    'confusion': 'altered_sensorium',
+    'swollen glands': 'swelled_lymph_nodes',
+    'neck stiffness': 'stiff_neck',
+    'constipated': 'constipation',
+    'gas': 'passage_of_gases',
+    'flatulence': 'passage_of_gases',
+    'bloating': 'distention_of_abdomen',
+    'acne': 'pus_filled_pimples',
+    'pimples': 'pus_filled_pimples',
+    'cramp': 'cramps',
+    'bruises': 'bruising',
+    'swollen ankles': 'swollen_legs',
+    'dehydrated': 'dehydration',
+    'coughing': 'cough',
+    'blood in stool': 'bloody_stool',
+    'coughing blood': 'blood_in_sputum',
+    'mucus': 'phlegm',
+    'watery eyes': 'watering_from_eyes',
+    'red eyes': 'redness_of_eyes',
+}
+
+MIN_SCORE = 0.5
+_SEPARATORS = re.compile(r'[,;\n]+')
+
+
+def _trigrams(text):
+    """Character trigrams of a phrase, padded so word starts/ends count"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymptomResolver:
+    """Maps free-text symptom tokens onto a fixed symptom vocabulary"""
+
+    def __init__(self, vocabulary, synonyms=SYNONYMS, min_score=MIN_SCORE):
+        self.symptoms = list(dict.fromkeys(normalize_symptom(s) for s in vocabulary))
+        self.min_score = min_score
+        known = set(self.symptoms)
+
+        # Every searchable phrase (symptom names and synonyms) and the
+        # symptom it stands for
+        self.exact = {name: name for name in self.symptoms}
+        for phrase, target in synonyms.items():
+            target = normalize_symptom(target)
+            if target in known:
+                self.exact.setdefault(normalize_symptom(phrase), target)
+        phrases = list(self.exact)
+        targets = {name: i for i, name in enumerate(self.symptoms)}
+        self.entry_symptom = np.array([targets[self.exact[p]] for p in phrases], dtype=np.intp)
+
+        postings = {}
+        sizes = np.empty(len(phrases), dtype=np.float64)
+        for entry, key in enumerate(phrases):
+            grams = _trigrams(key.replace('_', ' '))
+            sizes[entry] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(entry)
+        self.postings = {gram: np.array(ids, dtype=np.intp) for gram, ids in postings.items()}
+        self.entry_sizes = sizes
+
+    def match(self, token, limit=3):
+        """
+        Ranked candidate symptoms for one token
+
+        Returns:
+            List of up to limit (all if None) (symptom, score) pairs, best
+            first; score is 1.0 for an exact name or synonym match, otherwise
+            the trigram Dice similarity. Empty if nothing reaches min_score.
+        """
+        key = normalize_symptom(token)
+        if not key:
+            return []
+        if key in self.exact:
+            return [(self.exact[key], 1.0)]
+
+        grams = _trigrams(key.replace('_', ' '))
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return []
+        overlap = np.bincount(np.concatenate(lists), minlength=len(self.entry_sizes))
+        scores = 2.0 * overlap / (len(grams) + self.entry_sizes)
+
+        # Best score per symptom across its name and synonym phrases
+        best = np.zeros(len(self.symptoms))
+        np.maximum.at(best, self.entry_symptom, scores)
+        candidates = np.flatnonzero(best >= self.min_score)
+        order = candidates[np.argsort(-best[candidates], kind='stable')][:limit]
+        return [(self.symptoms[i], float(best[i])) for i in order]
+
+    def resolve(self, text):
+        """
+        Resolve a comma-separated symptom string (or a list of tokens)
+
+        Returns:
+            (matches, unresolved, ambiguous): matches is a list of
+            (token, symptom, score) for each resolved token in input order,
+            unresolved the tokens that matched nothing and ambiguous a list
+            of (token, [symptoms]) for tokens whose best score is a tie
+        """
+        tokens = _SEPARATORS.split(text) if isinstance(text, str) else text
+        matches, unresolved, ambiguous = [], [], []
+        for token in tokens:
+            token = str(token).strip()
+            if not token:
+                continue
+            ranked = self.match(token, limit=None)
+            if not ranked:
+                unresolved.append(token)
+                continue
+            symptom, score = ranked[0]
+            tied = [candidate for candidate, other in ranked if np.isclose(other, score)]
+            if len(tied) > 1:
+                ambiguous.append((token, tied))
+            else:
+                matches.append((token, symptom, score))
+        return matches, unresolved, ambiguous
+
+
+_resolver_cache = {}
+
+
+def get_symptom_resolver(encoder_data):
+    """Return the SymptomResolver for the model's feature columns, building it once"""
+    columns = encoder_data['columns']
+    cached = _resolver_cache.get(id(columns))
+    if cached is None or cached[0] is not columns:
+        cached = (columns, SymptomResolver(columns))
+        _resolver_cache[id(columns)] = cached
+    return cached[1]
@@ -0,0 +1,208 @@
+"""
+Sparse training pipeline for the disease prediction model
+
+DiseaseAndSymptoms.csv lists each case's symptoms positionally in
+Symptom_1..Symptom_17 with inconsistent spacing (" skin_rash" vs
+"skin_rash"). One-hot encoding those columns directly yields one feature
+per (position, spelling) pair. This pipeline instead normalizes every
+token and builds a multi-hot scipy.sparse CSR matrix with exactly one
+column per real symptom, reading the CSV in chunks so memory grows with
+the number of symptoms present rather than rows x columns.
+"""
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Lazy import sklearn/scipy - only needed for training
+try:
+    import scipy.sparse as sp
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+from model_utils import normalize_symptom
+from compact_model import export_forest
+
+DATASET_PATH = "data/DiseaseAndSymptoms.csv"
+
+# Served model settings shared by every training path; model_search.py
+# records the settings it promotes in the compact artifact's manifest
+DEFAULT_MODEL_PARAMS = {'n_estimators': 100, 'max_depth': 20}
+
+
+def _is_symptom(token):
+    return token and token != 'none' and token != 'nan'
+
+
+def load_symptom_matrix(path=DATASET_PATH, chunk_size=100000):
+    """
+    Read the symptoms dataset into a deduplicated multi-hot sparse matrix
+
+    Returns:
+        X: scipy.sparse.csr_matrix of shape (n_cases, n_symptoms), float32
+        y: NumPy array of disease labels
+        vocabulary: list of normalized symptom names (column order of X)
+    """
+    vocabulary = {}
+    token_ids = {}
+    row_parts, col_parts, labels = [], [], []
+    n_rows = 0
+
+    for chunk in pd.read_csv(path, encoding='utf-8', chunksize=chunk_size, dtype=str):
+        symptom_cols = [col for col in chunk.columns if 'Symptom_' in col]
+        values = chunk[symptom_cols].to_numpy(dtype=object)
+
+        # Map each raw token once; the vocabulary is tiny compared to the data
+        raw_tokens = pd.unique(values.ravel())
+        for raw in raw_tokens:
+            if raw in token_ids or pd.isna(raw):
+                continue
+            name = normalize_symptom(raw)
+            if _is_symptom(name):
+                token_ids[raw] = vocabulary.setdefault(name, len(vocabulary))
+            else:
+                token_ids[raw] = -1
+
+        flat = pd.Series(values.ravel()).map(token_ids).fillna(-1).to_numpy(dtype=np.int64)
+        rows = np.repeat(np.arange(len(chunk), dtype=np.int64) + n_rows, len(symptom_cols))
+        present = flat >= 0
+        row_parts.append(rows[present])
+        col_parts.append(flat[present])
+        labels.append(chunk['Disease'].to_numpy(dtype=object))
+        n_rows += len(chunk)
+
+    rows = np.concatenate(row_parts) if row_parts else np.array([], dtype=np.int64)
+    cols = np.concatenate(col_parts) if col_parts else np.array([], dtype=np.int64)
+    X = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                      shape=(n_rows, len(vocabulary)))
+    # The same symptom listed twice in one case is still a single 1
+    X.sum_duplicates()
+    X.data[:] = 1.0
+
+    y = np.concatenate(labels) if labels else np.array([], dtype=object)
+    names = sorted(vocabulary, key=vocabulary.get)
+    return X, y, names
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def train_sparse_model(path=DATASET_PATH, n_jobs=-1, test_size=0.2, random_state=42,
+                       verbose=True, trace_memory=False, **model_params):
+    """
+    Train a RandomForestClassifier on the sparse symptom matrix
+
+    Args:
+        path: Symptoms dataset CSV
+        n_jobs: Parallel tree-building jobs (-1 = all cores)
+        test_size: Hold-out fraction for the reported accuracy
+        trace_memory: Measure peak Python allocations while encoding
+            (tracemalloc; accurate but slows encoding several times)
+        model_params: Extra RandomForestClassifier parameters
+
+    Returns:
+        (model, encoder_data, report) where report holds sizes, timings,
+        memory and accuracy
+    """
+    if not SKLEARN_AVAILABLE:
+        raise ImportError("scikit-learn is not installed (pip install scikit-learn)")
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    X, y, vocabulary = load_symptom_matrix(path)
+    encode_seconds = time.perf_counter() - start
+    encode_peak = None
+    if trace_memory:
+        encode_peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+
+    params = dict(DEFAULT_MODEL_PARAMS, random_state=random_state)
+    params.update(model_params)
+    model = RandomForestClassifier(n_jobs=n_jobs, **params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    accuracy = model.score(X_test, y_test)
+
+    sparse_bytes = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    report = {
+        'rows': X.shape[0],
+        'features': X.shape[1],
+        'nonzeros': int(X.nnz),
+        'sparse_mb': sparse_bytes / 1e6,
+        'dense_equivalent_mb': X.shape[0] * X.shape[1] * 4 / 1e6,
+        'encode_seconds': encode_seconds,
+        'encode_peak_mb': encode_peak,
+        'fit_seconds': fit_seconds,
+        'peak_rss_mb': _peak_rss_mb(),
+        'accuracy': accuracy,
+    }
+
+    encoder_data = {
+        'columns': vocabulary,
+        'feature_names': vocabulary,
+    }
+
+    if verbose:
+        print_training_report(report)
+
+    return model, encoder_data, report
+
+
+def print_training_report(report):
+    """Print the size/time/memory figures from train_sparse_model"""
+    print(f"Training data: {report['rows']} cases x {report['features']} symptoms "
+          f"({report['nonzeros']} non-zeros)")
+    print(f"Matrix memory: {report['sparse_mb']:.2f} MB sparse "
+          f"(dense float32 would be {report['dense_equivalent_mb']:.2f} MB)")
+    encoding = f"Encoding: {report['encode_seconds']:.2f}s"
+    if report['encode_peak_mb'] is not None:
+        encoding += f", peak {report['encode_peak_mb']:.1f} MB"
+    print(encoding)
+    print(f"Fit time: {report['fit_seconds']:.2f}s")
+    if report['peak_rss_mb'] is not None:
+        print(f"Peak process memory: {report['peak_rss_mb']:.0f} MB")
+    print(f"Model accuracy: {report['accuracy']:.4f}")
+
+
+def save_model_artifacts(model, encoder_data, data_dir="data", metadata=None):
+    """
+    Save a trained model as the pickles and the compact NumPy export
+
+    Returns:
+        Dict of the written paths
+    """
+    paths = {
+        'model': os.path.join(data_dir, "disease_prediction_model.pkl"),
+        'encoder': os.path.join(data_dir, "symptom_encoder.pkl"),
+        'compact_model': os.path.join(data_dir, "disease_model"),
+    }
+    with open(paths['model'], 'wb') as f:
+        pickle.dump(model, f)
+    with open(paths['encoder'], 'wb') as f:
+        pickle.dump(encoder_data, f)
+    export_forest(model, encoder_data, paths['compact_model'], metadata=metadata)
+    return paths